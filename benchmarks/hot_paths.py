@@ -0,0 +1,245 @@
+"""Бенчмарк горячих путей магазина на синтетических данных.
+
+Для каждого масштаба генерируется магазин (benchmarks.synthetic) и
+замеряются: резервирование/возврат товара, поиск покупателя по e-mail,
+сохранение снимка в JSON и XML, загрузка склада из JSON и XML и
+сериализация заказов, а также колоночный склад (ColumnarInventory)
+против обычного Inventory: резерв/возврат, стоимость склада, выборка
+по малому остатку и массовое изменение цен. Результаты пишутся в JSON;
+при заданном --baseline они сравниваются с сохранёнными, и замедление
+сверх --tolerance считается регрессией (код возврата 1). Ход прогона и
+сравнение печатаются в stderr, чтобы stdout оставался чистым JSON.
+
+Запуск:
+    python -m benchmarks.hot_paths --scales 10k 100k --output bench.json
+    python -m benchmarks.hot_paths --scales 10k --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from benchmarks.synthetic import SCALES, SyntheticStore, generate_store
+from clasess.columnar_inventory import ColumnarInventory
+from utils.serializer import (load_inventory_json, load_inventory_xml, save_inventory_json,
+                              save_inventory_xml, save_store_json, save_store_xml)
+
+# (название, функция(магазин, каталог для файлов) -> число операций)
+Benchmark = Tuple[str, Callable[[SyntheticStore, str], int]]
+
+
+def bench_reserve_release(store: SyntheticStore, tmp: str) -> int:
+    inv = store.inventory
+    rnd = random.Random(1)
+    ids = [pid for pid in inv.products if inv.products[pid].stock > 0]
+    picks = [rnd.choice(ids) for _ in range(min(len(ids), 200_000))]
+    for pid in picks:
+        inv.reserve(pid, 1)
+        inv.release(pid, 1)
+    return 2 * len(picks)
+
+
+def bench_find_customer(store: SyntheticStore, tmp: str) -> int:
+    rnd = random.Random(2)
+    n = len(store.customers)
+    emails = [f"User{rnd.randrange(n)}@Example.com" for _ in range(200_000)]
+    find = store.customers.find
+    for email in emails:
+        find(email)
+    return len(emails)
+
+
+def bench_save_json(store: SyntheticStore, tmp: str) -> int:
+    save_store_json(os.path.join(tmp, "data.json"), store.inventory.products.values(),
+                    store.customers, store.suppliers, store.orders)
+    return len(store.inventory.products) + len(store.orders)
+
+
+def bench_save_xml(store: SyntheticStore, tmp: str) -> int:
+    save_store_xml(os.path.join(tmp, "data.xml"), store.inventory.products.values(),
+                   store.customers, store.suppliers, store.orders)
+    return len(store.inventory.products) + len(store.orders)
+
+
+def bench_load_inventory_json(store: SyntheticStore, tmp: str) -> int:
+    path = os.path.join(tmp, "inventory.json")
+    if not os.path.exists(path):
+        save_inventory_json(store.inventory, path)
+    return len(load_inventory_json(path).products)
+
+
+def bench_load_inventory_xml(store: SyntheticStore, tmp: str) -> int:
+    path = os.path.join(tmp, "inventory.xml")
+    if not os.path.exists(path):
+        save_inventory_xml(store.inventory, path)
+    return len(load_inventory_xml(path).products)
+
+
+# Колоночные копии складов: строятся один раз на магазин, вне замера.
+_COLUMNAR: Dict[int, ColumnarInventory] = {}
+
+
+def _columnar(store: SyntheticStore) -> ColumnarInventory:
+    col = _COLUMNAR.get(id(store.inventory))
+    if col is None:
+        col = _COLUMNAR[id(store.inventory)] = ColumnarInventory.from_inventory(store.inventory)
+    return col
+
+
+def bench_columnar_reserve_release(store: SyntheticStore, tmp: str) -> int:
+    col = _columnar(store)
+    rnd = random.Random(1)
+    ids = [p.id for p in col.products() if p.stock > 0]
+    picks = [rnd.choice(ids) for _ in range(min(len(ids), 200_000))]
+    for pid in picks:
+        col.reserve(pid, 1)
+        col.release(pid, 1)
+    return 2 * len(picks)
+
+
+def bench_stock_value(store: SyntheticStore, tmp: str) -> int:
+    products = store.inventory.products.values()
+    sum(p.price * p.stock for p in products)
+    return len(products)
+
+
+def bench_columnar_stock_value(store: SyntheticStore, tmp: str) -> int:
+    col = _columnar(store)
+    col.total_stock_value()
+    return len(col)
+
+
+def bench_low_stock(store: SyntheticStore, tmp: str) -> int:
+    store.inventory.low_stock(50)
+    return len(store.inventory.products)
+
+
+def bench_columnar_restock_candidates(store: SyntheticStore, tmp: str) -> int:
+    col = _columnar(store)
+    col.restock_candidates(50)
+    return len(col)
+
+
+def bench_adjust_prices(store: SyntheticStore, tmp: str) -> int:
+    # Множитель 1.0: повторные прогоны не меняют данные для следующих замеров.
+    inv = store.inventory
+    for p in list(inv.products.values()):
+        inv.update_price(p.id, round(p.price * 1.0, 2))
+    return len(inv.products)
+
+
+def bench_columnar_adjust_prices(store: SyntheticStore, tmp: str) -> int:
+    return _columnar(store).adjust_prices(1.0)
+
+
+def bench_order_to_dict(store: SyntheticStore, tmp: str) -> int:
+    for o in store.orders:
+        o.to_dict()
+    return len(store.orders)
+
+
+BENCHMARKS: List[Benchmark] = [
+    ("inventory.reserve_release", bench_reserve_release),
+    ("customers.find", bench_find_customer),
+    ("store.save_json", bench_save_json),
+    ("store.save_xml", bench_save_xml),
+    ("inventory.load_json", bench_load_inventory_json),
+    ("inventory.load_xml", bench_load_inventory_xml),
+    ("order.to_dict", bench_order_to_dict),
+    # Колоночный склад против обычного на тех же данных.
+    ("columnar.reserve_release", bench_columnar_reserve_release),
+    ("inventory.stock_value", bench_stock_value),
+    ("columnar.stock_value", bench_columnar_stock_value),
+    ("inventory.low_stock", bench_low_stock),
+    ("columnar.restock_candidates", bench_columnar_restock_candidates),
+    ("inventory.adjust_prices", bench_adjust_prices),
+    ("columnar.adjust_prices", bench_columnar_adjust_prices),
+]
+
+
+def run(scales: List[str], repeat: int, seed: int, only: Optional[List[str]] = None) -> Dict:
+    """Прогоняет бенчмарки; для каждого берётся лучшее из repeat время."""
+    results = []
+    for scale in scales:
+        t0 = time.perf_counter()
+        store = generate_store(SCALES[scale], seed)
+        print(f"[{scale}] магазин сгенерирован за {time.perf_counter() - t0:.1f} с", file=sys.stderr)
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, fn in BENCHMARKS:
+                if only and name not in only:
+                    continue
+                best = float("inf")
+                ops = 0
+                for _ in range(repeat):
+                    t0 = time.perf_counter()
+                    ops = fn(store, tmp)
+                    best = min(best, time.perf_counter() - t0)
+                results.append({"scale": scale, "benchmark": name, "ops": ops, "seconds": best,
+                                "ops_per_sec": ops / best if best > 0 else 0.0})
+                print(f"[{scale}] {name}: {best:.3f} с, {ops / best:,.0f} оп/с", file=sys.stderr)
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "seed": seed, "repeat": repeat, "results": results}
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Сравнивает время на операцию с базовым прогоном.
+
+    Returns:
+        Описания регрессий (замедление больше чем в 1 + tolerance раз).
+    """
+    base = {(r["scale"], r["benchmark"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"{'масштаб':>8} {'бенчмарк':<28} {'было оп/с':>14} {'стало оп/с':>14} {'изм.':>8}",
+          file=sys.stderr)
+    for r in current["results"]:
+        b = base.get((r["scale"], r["benchmark"]))
+        if b is None or not b["ops_per_sec"]:
+            continue
+        change = r["ops_per_sec"] / b["ops_per_sec"] - 1
+        mark = ""
+        if r["ops_per_sec"] * (1 + tolerance) < b["ops_per_sec"]:
+            mark = "  РЕГРЕССИЯ"
+            regressions.append(f"{r['scale']} {r['benchmark']}: {change:+.1%}")
+        print(f"{r['scale']:>8} {r['benchmark']:<28} {b['ops_per_sec']:>14,.0f} "
+              f"{r['ops_per_sec']:>14,.0f} {change:>+8.1%}{mark}", file=sys.stderr)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=["10k"])
+    parser.add_argument("--only", nargs="+", choices=[name for name, _ in BENCHMARKS],
+                        help="запустить только указанные бенчмарки")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="куда записать результаты (JSON); по умолчанию stdout")
+    parser.add_argument("--baseline", help="JSON с результатами прошлого прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="допустимое замедление относительно базового прогона")
+    args = parser.parse_args()
+
+    current = run(args.scales, args.repeat, args.seed, args.only)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+    else:
+        json.dump(current, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        if regressions:
+            print("❌ Регрессии производительности:", file=sys.stderr)
+            for r in regressions:
+                print(f"  {r}", file=sys.stderr)
+            sys.exit(1)
+        print("✅ Регрессий нет.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
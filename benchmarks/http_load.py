@@ -0,0 +1,100 @@
+"""Нагрузочный генератор для HTTP API магазина (server.py).
+
+Открывает --connections keep-alive соединений и в каждом держит до
+--pipeline запросов «в полёте» (HTTP pipelining). Пути запросов берутся
+по кругу из --paths. Печатает запросы в секунду, задержки p50/p95/p99
+и распределение кодов ответа.
+
+Запуск (сервер должен уже работать):
+    python server.py --port 8080 &
+    python -m benchmarks.http_load --port 8080 --duration 10 --connections 16 --pipeline 8
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, List
+from clasess.order_pipeline import percentile
+
+DEFAULT_PATHS = ["/products", "/products?limit=50&offset=20", "/categories",
+                 "/products?min_price=10&max_price=100"]
+
+
+async def _read_response(reader: asyncio.StreamReader) -> int:
+    """Читает один ответ и возвращает его код."""
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _connection(host: str, port: int, requests: List[bytes], pipeline: int, deadline: float,
+                      offset: int, latencies: List[float], statuses: Counter) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    sent: Deque[float] = deque()
+    i = offset
+
+    async def send() -> None:
+        nonlocal i
+        while len(sent) < pipeline and time.perf_counter() < deadline:
+            writer.write(requests[i % len(requests)])
+            sent.append(time.perf_counter())
+            i += 1
+        await writer.drain()
+
+    try:
+        await send()
+        while sent:
+            status = await _read_response(reader)
+            latencies.append(time.perf_counter() - sent.popleft())
+            statuses[status] += 1
+            await send()
+    finally:
+        writer.close()
+
+
+async def run(args: argparse.Namespace) -> Dict[str, object]:
+    paths = args.paths or DEFAULT_PATHS
+    requests = [f"GET {p} HTTP/1.1\r\nHost: {args.host}\r\n\r\n".encode("ascii") for p in paths]
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    t0 = time.perf_counter()
+    deadline = t0 + args.duration
+    await asyncio.gather(*(
+        _connection(args.host, args.port, requests, args.pipeline, deadline, n, latencies, statuses)
+        for n in range(args.connections)))
+    elapsed = time.perf_counter() - t0
+    ms = [x * 1000 for x in latencies]
+    return {
+        "connections": args.connections,
+        "pipeline": args.pipeline,
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {"p50": round(percentile(ms, 50), 3), "p95": round(percentile(ms, 95), 3),
+                       "p99": round(percentile(ms, 99), 3), "max": round(max(ms, default=0.0), 3)},
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Нагрузочный генератор для HTTP API магазина")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--duration", type=float, default=10.0, help="длительность прогона (сек)")
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--pipeline", type=int, default=1, help="запросов в полёте на соединение")
+    parser.add_argument("--paths", nargs="*", help="пути GET-запросов (по умолчанию — каталог)")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Многопоточный стресс-тест Inventory.reserve/release.
+
+Несколько потоков одновременно раскупают товары. После прогона
+проверяется, что продано ровно столько, сколько было на складе (нет
+overselling), и остатки не ушли в минус. Для каждого числа потоков
+печатается пропускная способность.
+
+Запуск:
+    python -m benchmarks.inventory_threads --products 1000 --stock 200
+"""
+import argparse
+import random
+import threading
+import time
+from typing import Dict, List
+from clasess.inventory import Inventory
+from clasess.product import Product
+from exceptions.store_exceptions import OutOfStockError
+
+
+def build_inventory(products: int, stock: int) -> Inventory:
+    inv = Inventory()
+    for i in range(products):
+        inv.add_product(Product(f"p{i}", f"Товар {i}", "", 10.0, stock, "bench"))
+    return inv
+
+
+def run(threads: int, products: int, stock: int, release_ratio: float, seed: int) -> Dict[str, float]:
+    """Раскупает весь склад в threads потоков и возвращает статистику."""
+    inv = build_inventory(products, stock)
+    ids = list(inv.products)
+    sold: List[int] = [0] * threads
+    ops: List[int] = [0] * threads
+    start_barrier = threading.Barrier(threads + 1)
+
+    def worker(n: int) -> None:
+        rnd = random.Random(seed + n)
+        remaining = ids[:]
+        start_barrier.wait()
+        while remaining:
+            i = rnd.randrange(len(remaining))
+            pid = remaining[i]
+            try:
+                inv.reserve(pid, 1)
+                sold[n] += 1
+                if rnd.random() < release_ratio:
+                    inv.release(pid, 1)
+                    sold[n] -= 1
+                    ops[n] += 1
+            except OutOfStockError:
+                remaining[i] = remaining[-1]
+                remaining.pop()
+            ops[n] += 1
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool:
+        t.start()
+    start_barrier.wait()
+    t0 = time.perf_counter()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    total_sold = sum(sold)
+    expected = products * stock
+    negative = [p.id for p in inv.products.values() if p.stock < 0]
+    left = sum(p.stock for p in inv.products.values())
+    if total_sold != expected or negative or left:
+        raise AssertionError(f"overselling: продано {total_sold} из {expected}, "
+                             f"остаток {left}, отрицательных {len(negative)}")
+    return {"threads": threads, "ops": sum(ops), "seconds": elapsed,
+            "ops_per_sec": sum(ops) / elapsed if elapsed else float("inf")}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--release-ratio", type=float, default=0.2,
+                        help="доля резервов, которые сразу возвращаются на склад")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'потоков':>8} {'операций':>10} {'сек':>8} {'оп/сек':>12}")
+    for n in args.threads:
+        r = run(n, args.products, args.stock, args.release_ratio, args.seed)
+        print(f"{r['threads']:>8} {r['ops']:>10} {r['seconds']:>8.3f} {r['ops_per_sec']:>12.0f}")
+    print("✅ Overselling не обнаружен.")
+
+
+if __name__ == "__main__":
+    main()
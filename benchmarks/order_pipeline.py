@@ -0,0 +1,66 @@
+"""Нагрузочный прогон асинхронного конвейера заказов с имитатором шлюза.
+
+Для каждого уровня параллельности оплаты печатаются пропускная
+способность и задержки p50/p99, что позволяет подобрать настройки
+конвейера под задержку реального шлюза.
+
+Запуск:
+    python -m benchmarks.order_pipeline --orders 2000 --latency 0.02
+"""
+import argparse
+import asyncio
+import random
+from clasess.customer import Customer
+from clasess.inventory import Inventory
+from clasess.order_pipeline import OrderPipeline, OrderRequest
+from clasess.payment_gateway import FakePaymentGateway
+from clasess.product import Product
+
+
+def build_requests(orders: int, products: int, customers: int, seed: int):
+    rnd = random.Random(seed)
+    inv = Inventory()
+    for i in range(products):
+        inv.add_product(Product(f"p{i}", f"Товар {i}", "", float(rnd.randint(1, 100)), 10 ** 6))
+    people = [Customer(f"user{i}@example.com", f"User {i}", 10.0 ** 9) for i in range(customers)]
+    requests = []
+    for _ in range(orders):
+        lines = {f"p{rnd.randrange(products)}": rnd.randint(1, 3) for _ in range(rnd.randint(1, 4))}
+        requests.append(OrderRequest(rnd.choice(people), lines))
+    return inv, requests
+
+
+async def run_once(args: argparse.Namespace, concurrency: int) -> dict:
+    inv, requests = build_requests(args.orders, args.products, args.customers, args.seed)
+    gateway = FakePaymentGateway(args.latency, args.jitter, args.failure_rate, seed=args.seed)
+    pipeline = OrderPipeline(inv, gateway, workers=max(concurrency * 2, 1),
+                             payment_concurrency=concurrency, queue_size=args.queue_size,
+                             payment_timeout=args.timeout, retries=args.retries)
+    await pipeline.run(requests)
+    return pipeline.stats()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--customers", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--latency", type=float, default=0.02, help="средняя задержка шлюза, сек")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--failure-rate", type=float, default=0.01)
+    parser.add_argument("--timeout", type=float, default=0.5)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--queue-size", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'оплат':>6} {'заказов':>8} {'успешно':>8} {'зак/сек':>9} {'p50 мс':>8} {'p99 мс':>8}")
+    for c in args.concurrency:
+        st = asyncio.run(run_once(args, c))
+        print(f"{c:>6} {st['orders']:>8} {st['ok']:>8} {st['orders_per_sec']:>9.0f} "
+              f"{st['p50_ms']:>8.1f} {st['p99_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
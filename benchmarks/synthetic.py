@@ -0,0 +1,65 @@
+"""Детерминированный генератор синтетического магазина для бенчмарков.
+
+При одинаковых scale и seed получается один и тот же магазин: товары,
+покупатели, поставщики и заказы с позициями. Размер задаётся числом
+товаров; остальные разделы масштабируются пропорционально.
+"""
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List
+from clasess.customer import Customer
+from clasess.customer_registry import CustomerRegistry
+from clasess.inventory import Inventory
+from clasess.order import Order
+from clasess.order_item import OrderItem
+from clasess.product import Product
+from clasess.supplier import Supplier
+
+SCALES: Dict[str, int] = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+CATEGORIES = ["Смартфоны", "Ноутбуки", "Планшеты", "Аудио", "ТВ", "Фото", "Аксессуары", "Игры"]
+_WORDS = ["Pro", "Max", "Mini", "Ultra", "Lite", "Air", "Plus", "Neo", "X", "S"]
+_EPOCH = datetime(2026, 1, 1)
+
+
+@dataclass
+class SyntheticStore:
+    inventory: Inventory
+    customers: CustomerRegistry
+    suppliers: List[Supplier]
+    orders: List[Order]
+
+
+def generate_store(products: int, seed: int = 42, customers: int = 0,
+                   suppliers: int = 0, orders: int = 0) -> SyntheticStore:
+    """Генерирует магазин из products товаров.
+
+    По умолчанию покупателей — products // 10, поставщиков —
+    products // 1000, заказов — столько же, сколько товаров.
+    """
+    rnd = random.Random(seed)
+    customers = customers or max(products // 10, 1)
+    suppliers = suppliers or max(products // 1000, 1)
+    orders = orders or products
+
+    inv = Inventory()
+    inv.merge_products([
+        Product(f"p{i}", f"{rnd.choice(CATEGORIES)} {rnd.choice(_WORDS)} {i}",
+                f"Синтетический товар номер {i}", round(rnd.uniform(100, 200000), 2),
+                rnd.randint(0, 500), rnd.choice(CATEGORIES))
+        for i in range(products)])
+    registry = CustomerRegistry(
+        Customer(f"user{i}@example.com", f"Покупатель {i}", round(rnd.uniform(0, 10 ** 6), 2))
+        for i in range(customers))
+    supplier_list = [Supplier(f"Поставщик {i}", f"supplier{i}@example.com") for i in range(suppliers)]
+    order_list = []
+    for i in range(orders):
+        items = [OrderItem(f"p{rnd.randrange(products)}", rnd.randint(1, 3),
+                           round(rnd.uniform(100, 200000), 2))
+                 for _ in range(rnd.randint(1, 4))]
+        created = _EPOCH + timedelta(seconds=rnd.randrange(365 * 24 * 3600))
+        order_list.append(Order(f"o{i}", f"user{rnd.randrange(customers)}@example.com", items,
+                                rnd.choice(["created", "created", "paid", "shipped"]),
+                                created.isoformat()))
+    return SyntheticStore(inv, registry, supplier_list, order_list)
@@ -9,6 +9,8 @@ class Cart:
     """Корзина содержит набор CartItem, индексированных по product_id."""
     owner_id: str
     items: Dict[str, CartItem] = field(default_factory=dict)
+    # Удержание товаров корзины на складе (см. StockHolds.hold_cart).
+    hold_id: Optional[str] = None
 
     def add(self, product_id: str, quantity: int = 1) -> None:
         """Добавляет товар в корзину или увеличивает количество.
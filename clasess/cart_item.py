@@ -1,12 +1,16 @@
 """Позиция в корзине."""
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from typing import Dict, Any
 
-@dataclass
+@dataclass(slots=True)
 class CartItem:
     product_id: str
     quantity: int
 
     def to_dict(self) -> Dict[str, Any]:
         """Возвращает словарь для сериализации позиции корзины."""
-        return asdict(self)
+        return {"product_id": self.product_id, "quantity": self.quantity}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CartItem":
+        return cls(data["product_id"], data["quantity"])
@@ -1,8 +1,8 @@
 """Модель категории товаров."""
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from typing import Dict, Any
 
-@dataclass
+@dataclass(slots=True)
 class Category:
     """Категория товара.
 
@@ -17,4 +17,9 @@ class Category:
 
     def to_dict(self) -> Dict[str, Any]:
         """Преобразует объект в словарь для сериализации."""
-        return asdict(self)
+        return {"id": self.id, "name": self.name, "description": self.description}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Category":
+        """Создаёт категорию из словаря формата to_dict()."""
+        return cls(data["id"], data["name"], data.get("description", ""))
@@ -0,0 +1,59 @@
+"""Оформление заказа из корзины одной атомарной операцией."""
+from typing import Dict, Optional
+from exceptions.store_exceptions import StoreError, PaymentError
+from utils.helpers import generate_id
+from .cart import Cart
+from .customer import Customer
+from .inventory import Inventory
+from .order import Order
+from .order_item import OrderItem
+from .payment import Payment
+from .stock_holds import StockHolds
+
+
+def checkout(cart: Cart, customer: Customer, inventory: Inventory,
+             method: str = "balance", holds: Optional[StockHolds] = None) -> Order:
+    """Оформляет все позиции корзины в один заказ по принципу «всё или ничего».
+
+    Шаги: резервирование всех позиций одним вызовом Inventory.reserve_many
+    (цены фиксируются там же), проверка баланса, проведение Payment,
+    списание средств и создание Order со всеми OrderItem. Если любой шаг
+    завершился ошибкой, резерв возвращается на склад, а баланс покупателя
+    остаётся прежним. При успехе корзина очищается.
+
+    Если передан holds, резервирование засчитывает удержание корзины
+    (StockHolds.reserve_cart), и удержанный товар гарантированно
+    достаётся этому покупателю. Удержание снимается только после
+    оплаты; при ошибке оно восстанавливается.
+
+    Raises:
+        StoreError: если корзина пуста или товар не найден.
+        OutOfStockError: если какой-то позиции не хватает на складе.
+        PaymentError: если не хватает средств или платёж не прошёл.
+    """
+    lines: Dict[str, int] = {pid: ci.quantity for pid, ci in cart.items.items()}
+    if not lines:
+        raise StoreError("Корзина пуста")
+
+    prices = holds.reserve_cart(cart) if holds is not None else inventory.reserve_many(lines)
+    try:
+        items = [OrderItem(pid, qty, prices[pid]) for pid, qty in lines.items()]
+        order = Order(generate_id("o"), customer.email, items)
+        total = order.total()
+        if not customer.can_afford(total):
+            raise PaymentError(f"Недостаточно средств: требуется {total}, на балансе {customer.balance}")
+        Payment(generate_id("pay"), order.id, total, method).process()
+        if not customer.pay(total):
+            raise PaymentError("Не удалось списать средства")
+    except Exception:
+        if holds is not None:
+            holds.restore_cart(cart)
+        else:
+            inventory.release_many(lines)
+        raise
+
+    if holds is not None:
+        holds.confirm_cart(cart)
+    customer.add_order(order)
+    cart.items.clear()
+    return order
@@ -0,0 +1,262 @@
+"""Колоночное представление склада для аналитики по всему каталогу.
+
+Цены, остатки и коды категорий хранятся в непрерывных буферах array
+(а не в отдельных объектах Product), поэтому агрегаты, выборки по
+порогу и массовое изменение цен выполняются векторно. Если установлен
+NumPy, буферы оборачиваются в ndarray без копирования; без него
+используются те же буферы и циклы на встроенных функциях.
+"""
+import threading
+from array import array
+from operator import mul
+from typing import Any, Dict, Iterable, List, Optional
+from exceptions.store_exceptions import StoreError, OutOfStockError, InvalidQuantityError
+from utils.striped_lock import StripedLock
+from .product import Product
+
+try:
+    import numpy as np
+except ImportError:  # NumPy — необязательная зависимость
+    np = None
+
+
+class ColumnarInventory:
+    """Склад в колоночном виде с API find/reserve/release как у Inventory.
+
+    find() возвращает новый объект Product, собранный из колонок, —
+    изменения этого объекта на склад не влияют; менять данные нужно
+    методами склада.
+    """
+
+    def __init__(self, lock_stripes: int = 64) -> None:
+        self.locks = StripedLock(lock_stripes)
+        # Защищает состав колонок (добавление/удаление строк) и векторные
+        # операции: пока на буфер array смотрит ndarray, его нельзя расширять.
+        self._struct_lock = threading.RLock()
+        self._clear()
+
+    def _clear(self) -> None:
+        self._ids: List[str] = []
+        self._pos: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._descriptions: List[str] = []
+        self._prices = array("d")
+        self._stocks = array("q")
+        self._cat_codes = array("l")
+        self._categories: List[Optional[str]] = []
+        self._cat_code: Dict[Optional[str], int] = {}
+
+    # ---------------------- служебное ----------------------
+    def _code(self, category: Optional[str]) -> int:
+        code = self._cat_code.get(category)
+        if code is None:
+            code = self._cat_code[category] = len(self._categories)
+            self._categories.append(category)
+        return code
+
+    def _slot(self, product_id: str) -> int:
+        i = self._pos.get(product_id)
+        if i is None:
+            raise StoreError(f"Продукт {product_id} не найден")
+        return i
+
+    # ---------------------- изменения ----------------------
+    def add_product(self, product: Product) -> None:
+        """Добавляет товар.
+
+        Raises:
+            StoreError: если продукт с таким id уже существует.
+        """
+        with self._struct_lock, self.locks.lock_for(product.id):
+            if product.id in self._pos:
+                raise StoreError(f"Продукт с id {product.id} уже существует")
+            self._pos[product.id] = len(self._ids)
+            self._ids.append(product.id)
+            self._names.append(product.name)
+            self._descriptions.append(product.description)
+            self._prices.append(product.price)
+            self._stocks.append(product.stock)
+            self._cat_codes.append(self._code(product.category))
+
+    def remove_product(self, product_id: str) -> Product:
+        """Удаляет товар за O(1): на его место переносится последний."""
+        with self._struct_lock:
+            p = self.find(product_id)
+            if p is None:
+                raise StoreError(f"Продукт {product_id} не найден")
+            # Перенос последней строки меняет её позицию — блокируем обе.
+            with self.locks.locked(product_id, self._ids[-1]):
+                self._remove_row(self._pos.pop(product_id))
+            return p
+
+    def _remove_row(self, i: int) -> None:
+        last = len(self._ids) - 1
+        columns = (self._ids, self._names, self._descriptions,
+                   self._prices, self._stocks, self._cat_codes)
+        if i != last:
+            for col in columns:
+                col[i] = col[last]
+            self._pos[self._ids[i]] = i
+        for col in columns:
+            col.pop()
+
+    def find(self, product_id: str) -> Optional[Product]:
+        """Собирает Product по id или возвращает None."""
+        i = self._pos.get(product_id)
+        if i is None:
+            return None
+        return Product(self._ids[i], self._names[i], self._descriptions[i],
+                       self._prices[i], self._stocks[i], self._categories[self._cat_codes[i]])
+
+    def update_stock(self, product_id: str, new_stock: int) -> None:
+        if new_stock < 0:
+            raise InvalidQuantityError("stock не может быть отрицательным")
+        with self.locks.lock_for(product_id):
+            self._stocks[self._slot(product_id)] = new_stock
+
+    def update_price(self, product_id: str, new_price: float) -> None:
+        if new_price < 0:
+            raise StoreError("Цена не может быть отрицательной")
+        with self.locks.lock_for(product_id):
+            self._prices[self._slot(product_id)] = new_price
+
+    def reserve(self, product_id: str, qty: int) -> None:
+        """Резервирует qty единиц товара (уменьшает stock).
+
+        Raises:
+            InvalidQuantityError: если qty <= 0
+            StoreError: если товар не найден
+            OutOfStockError: если недостаточно на складе
+        """
+        if qty <= 0:
+            raise InvalidQuantityError("Количество должно быть > 0")
+        with self.locks.lock_for(product_id):
+            i = self._slot(product_id)
+            if self._stocks[i] < qty:
+                raise OutOfStockError(f"На складе {self._stocks[i]}, требуется {qty}")
+            self._stocks[i] -= qty
+
+    def release(self, product_id: str, qty: int) -> None:
+        """Возвращает в запас ранее зарезервированные qty единиц."""
+        if qty <= 0:
+            raise InvalidQuantityError("Количество должно быть > 0")
+        with self.locks.lock_for(product_id):
+            self._stocks[self._slot(product_id)] += qty
+
+    def restock(self, product_id: str, qty: int) -> None:
+        """Увеличивает остаток на qty единиц (поставка от поставщика).
+
+        Supplier.supply_product меняет остаток через этот метод: сам
+        объект из find() — копия, и его изменение склад не затронуло бы.
+        """
+        self.release(product_id, qty)
+
+    # ---------------------- векторные операции ----------------------
+    def total_stock(self) -> int:
+        """Суммарное количество единиц на складе."""
+        with self._struct_lock:
+            if np is not None and self._stocks:
+                return int(np.frombuffer(self._stocks, dtype=np.int64).sum())
+            return sum(self._stocks)
+
+    def total_stock_value(self) -> float:
+        """Стоимость склада: сумма price * stock по всем товарам."""
+        with self._struct_lock:
+            if np is not None and self._prices:
+                prices = np.frombuffer(self._prices, dtype=np.float64)
+                stocks = np.frombuffer(self._stocks, dtype=np.int64)
+                return float(prices @ stocks)
+            return sum(map(mul, self._prices, self._stocks))
+
+    def average_price(self) -> float:
+        """Средняя цена товара (0.0 для пустого склада)."""
+        with self._struct_lock:
+            if not self._prices:
+                return 0.0
+            if np is not None:
+                return float(np.frombuffer(self._prices, dtype=np.float64).mean())
+            return sum(self._prices) / len(self._prices)
+
+    def restock_candidates(self, threshold: int) -> List[str]:
+        """id товаров с остатком <= threshold (кандидаты на пополнение)."""
+        with self._struct_lock:
+            if np is not None and self._stocks:
+                stocks = np.frombuffer(self._stocks, dtype=np.int64)
+                return [self._ids[i] for i in np.flatnonzero(stocks <= threshold)]
+            return [self._ids[i] for i, s in enumerate(self._stocks) if s <= threshold]
+
+    def adjust_prices(self, factor: float, category: Optional[str] = None,
+                      ndigits: Optional[int] = 2) -> int:
+        """Умножает цены на factor (все или только в категории).
+
+        Args:
+            factor: множитель, например 1.1 для подорожания на 10%.
+            category: если задана, меняются только товары этой категории.
+            ndigits: до скольки знаков округлять (None — без округления).
+
+        Returns:
+            Количество изменённых цен.
+        """
+        if factor < 0:
+            raise StoreError("Множитель цены не может быть отрицательным")
+        code = self._cat_code.get(category) if category is not None else None
+        if category is not None and code is None:
+            return 0
+        # Все полосы: массовая операция не пересекается с одиночными изменениями.
+        with self._struct_lock, self.locks.locked_all():
+            if np is not None and self._prices:
+                prices = np.frombuffer(self._prices, dtype=np.float64)
+                mask = (np.frombuffer(self._cat_codes, dtype=self._cat_codes.typecode) == code
+                        if code is not None else slice(None))
+                new = prices[mask] * factor
+                prices[mask] = np.round(new, ndigits) if ndigits is not None else new
+                return int(np.count_nonzero(mask)) if code is not None else len(prices)
+            changed = 0
+            for i, c in enumerate(self._cat_codes):
+                if code is None or c == code:
+                    v = self._prices[i] * factor
+                    self._prices[i] = round(v, ndigits) if ndigits is not None else v
+                    changed += 1
+            return changed
+
+    # ---------------------- преобразования ----------------------
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, product_id: object) -> bool:
+        return product_id in self._pos
+
+    def products(self) -> Iterable[Product]:
+        """Лениво собирает все товары в порядке хранения."""
+        for pid in list(self._ids):
+            p = self.find(pid)
+            if p is not None:
+                yield p
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"products": [p.to_dict() for p in self.products()]}
+
+    def from_dict(self, data: Dict[str, Any]) -> None:
+        with self._struct_lock:
+            self._clear()
+        for p in data.get("products", []):
+            self.add_product(Product.from_dict(p))
+
+    @classmethod
+    def from_inventory(cls, inventory: Any) -> "ColumnarInventory":
+        """Строит колоночный склад из согласованного среза обычного Inventory.
+
+        Срез включает и товары, ещё лежащие в подключённом снимке.
+        """
+        col = cls()
+        with inventory.snapshot() as view:
+            for p in view:
+                col.add_product(p)
+        return col
+
+    def to_inventory(self) -> Any:
+        """Возвращает обычный Inventory с теми же товарами."""
+        from .inventory import Inventory
+        inv = Inventory()
+        inv.load_products(self.products())
+        return inv
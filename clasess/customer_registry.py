@@ -0,0 +1,77 @@
+"""Реестр покупателей с хеш-индексом по e-mail."""
+from typing import Dict, Iterable, Iterator, List, Optional
+from exceptions.store_exceptions import DuplicateCustomerError
+from .customer import Customer
+
+
+class CustomerRegistry:
+    """Хранит покупателей и ищет их по e-mail за O(1).
+
+    E-mail нормализуется (обрезка пробелов + casefold), поэтому
+    Alice@Example.com и alice@example.com считаются одним адресом.
+    Итерация идёт в порядке регистрации — это порядок сериализации.
+    """
+
+    def __init__(self, customers: Iterable[Customer] = ()) -> None:
+        self._by_email: Dict[str, Customer] = {}
+        self.extend(customers)
+
+    @staticmethod
+    def normalize_email(email: str) -> str:
+        """Возвращает ключ индекса для e-mail."""
+        return email.strip().casefold()
+
+    def add(self, customer: Customer) -> None:
+        """Регистрирует покупателя.
+
+        Raises:
+            DuplicateCustomerError: если e-mail уже занят.
+        """
+        key = self.normalize_email(customer.email)
+        if key in self._by_email:
+            raise DuplicateCustomerError(f"Покупатель с e-mail {customer.email} уже зарегистрирован")
+        self._by_email[key] = customer
+
+    def extend(self, customers: Iterable[Customer]) -> None:
+        """Массово добавляет покупателей по принципу «всё или ничего».
+
+        Raises:
+            DuplicateCustomerError: если хотя бы один e-mail занят или
+                повторяется внутри пачки; тогда реестр не меняется.
+        """
+        batch: Dict[str, Customer] = {}
+        for c in customers:
+            key = self.normalize_email(c.email)
+            if key in self._by_email or key in batch:
+                raise DuplicateCustomerError(f"Покупатель с e-mail {c.email} уже зарегистрирован")
+            batch[key] = c
+        self._by_email.update(batch)
+
+    def find(self, email: str) -> Optional[Customer]:
+        """Возвращает покупателя по e-mail или None."""
+        return self._by_email.get(self.normalize_email(email))
+
+    def remove(self, email: str) -> Optional[Customer]:
+        """Удаляет покупателя и возвращает его (или None, если не найден)."""
+        return self._by_email.pop(self.normalize_email(email), None)
+
+    def snapshot(self) -> List[Customer]:
+        """Копии покупателей (e-mail, имя, баланс) на момент вызова.
+
+        Баланс меняется прямо в объектах Customer (оплата, пополнение),
+        без обращения к реестру, поэтому срез снимается копированием:
+        записи небольшие, и покупателей на порядок меньше, чем товаров.
+        """
+        return [Customer(c.email, c.name, c.balance) for c in list(self._by_email.values())]
+
+    def __contains__(self, email: object) -> bool:
+        return isinstance(email, str) and self.normalize_email(email) in self._by_email
+
+    def __len__(self) -> int:
+        return len(self._by_email)
+
+    def __iter__(self) -> Iterator[Customer]:
+        return iter(self._by_email.values())
+
+    def __repr__(self) -> str:
+        return f"<CustomerRegistry customers={len(self)}>"
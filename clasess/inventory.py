@@ -1,38 +1,505 @@
-from typing import Dict, Optional, Any
+import heapq
+import threading
+import weakref
+from itertools import islice
+from typing import (TYPE_CHECKING, Callable, Dict, FrozenSet, Hashable, Optional, Any, Iterable,
+                    Iterator, List, Set, Tuple, TypeVar, Union)
 from exceptions.store_exceptions import StoreError, OutOfStockError, InvalidQuantityError
+from utils.sorted_index import SortedIndex
+from utils.journal import Journal
+from utils.metrics import instrument
+from utils.striped_lock import StripedLock
+from utils.version_cache import VersionedCache
 from .product import Product
+from .product_search import ProductSearchIndex
+
+if TYPE_CHECKING:
+    from utils.binary_snapshot import BinarySnapshot
+    from utils.sqlite_storage import ProductTable, SqliteReader
+
+T = TypeVar("T")
+# Источник товаров, из которого склад читает их лениво (attach_snapshot).
+ProductSource = Union["BinarySnapshot", "ProductTable"]
+
+
+def _copy(p: Product) -> Product:
+    return Product(p.id, p.name, p.description, p.price, p.stock, p.category)
+
+
+class InventoryView:
+    """Неизменяемый срез склада на версию version (см. Inventory.snapshot).
+
+    Товары отдаются копиями в том состоянии, в каком они были в момент
+    открытия среза, сколько бы их ни меняли после. Срез не держит
+    блокировок; открытый срез лишь заставляет склад хранить прежние
+    состояния изменяемых товаров, поэтому его нужно закрывать.
+    """
+
+    def __init__(self, inventory: "Inventory", version: int, ids: Dict[str, None],
+                 source: Union["BinarySnapshot", "SqliteReader", None],
+                 source_removed: FrozenSet[str], reader: Optional["SqliteReader"] = None) -> None:
+        self.version = version
+        self._inventory = inventory
+        self._ids = ids  # товары, уже лежавшие в памяти склада
+        # Неизменная версия источника товаров: сам бинарный снимок или
+        # срез базы (reader), который закрывается вместе с этим срезом.
+        self._source = source
+        self._source_removed = source_removed
+        self._len: Optional[int] = None
+        self._finalizer = weakref.finalize(self, inventory._release_reader, version, reader)
+
+    def get(self, product_id: str) -> Optional[Product]:
+        """Товар в версии среза или None, если его тогда не было."""
+        if product_id in self._ids:
+            return self._inventory._at_version(product_id, self.version)
+        if self._source is not None and product_id not in self._source_removed:
+            return self._source.get(product_id)
+        return None
+
+    def __contains__(self, product_id: object) -> bool:
+        return isinstance(product_id, str) and self.get(product_id) is not None
+
+    def __iter__(self) -> Iterator[Product]:
+        """Товары среза в порядке Inventory.iter_products()."""
+        at_version = self._inventory._at_version
+        if self._source is None:
+            for pid in self._ids:
+                yield at_version(pid, self.version)  # type: ignore[misc]
+            return
+        rest = dict(self._ids)
+        for p in self._source.iter_products():
+            if p.id in rest:
+                del rest[p.id]
+                yield at_version(p.id, self.version)  # type: ignore[misc]
+            elif p.id not in self._source_removed:
+                yield p
+        for pid in rest:
+            yield at_version(pid, self.version)  # type: ignore[misc]
+
+    def page(self, start: int, stop: int) -> List[Product]:
+        """Товары с номерами [start, stop) — без копирования пропущенных."""
+        if self._source is None:
+            return [self._inventory._at_version(pid, self.version)  # type: ignore[misc]
+                    for pid in islice(self._ids, start, stop)]
+        return list(islice(self, start, stop))
+
+    def __len__(self) -> int:
+        if self._source is None:
+            return len(self._ids)
+        if self._len is None:
+            self._len = sum(1 for _ in self)
+        return self._len
+
+    def close(self) -> None:
+        """Закрывает срез; повторный вызов ничего не делает."""
+        self._finalizer()
+
+    def __enter__(self) -> "InventoryView":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
 
 class Inventory:
+    """Склад товаров с вторичными индексами.
+
+    Помимо словаря products (id -> Product) поддерживаются индексы по
+    категории, цене и остатку, а также полнотекстовый search_index.
+    Они обновляются всеми методами Inventory, поэтому менять поля товара
+    нужно через них (или вызывать refresh() после изменения объекта
+    Product напрямую).
+
+    Методы потокобезопасны: изменения товара выполняются под блокировкой
+    его полосы (lock striping по product_id), так что операции с разными
+    товарами идут параллельно. Общие индексы защищены отдельной короткой
+    блокировкой.
+
+    Каждое изменение увеличивает version. Производные представления
+    (сериализованные снимки, страницы каталога) кэшируются через cached()
+    и строятся заново только после изменения склада.
+
+    К складу можно подключить источник товаров (attach_snapshot) —
+    бинарный снимок или таблицу товаров SQLite: тогда find() достаёт
+    товары из него по одному при первом обращении. Целиком источник
+    разбирается только при обращении к products, к поиску или — если
+    источник не умеет запросов сам (бинарный снимок) — к запросам по
+    индексам. Запросы к таблице SQLite идут в индексы базы, а уже
+    загруженные в память товары берутся из индексов склада.
+
+    Часть остатка может быть удержана корзинами (hold_many, см.
+    clasess.stock_holds): удержанные единицы остаются в stock, но
+    reserve/reserve_many продают только available() — остаток за вычетом
+    удержанного. Удержания живут только в памяти и не пишутся в журнал.
+
+    snapshot() открывает согласованный срез товаров на текущую версию
+    (InventoryView). Пока открыт хоть один срез, изменение товара сначала
+    сохраняет его прежнее состояние в истории версий (не чаще одного раза
+    на товар для всех открытых срезов), так что читатели не блокируют
+    запись, а запись не портит чтение. История удаляется, когда закрыт
+    последний срез, которому она нужна.
+    """
+
+    def __init__(self, lock_stripes: int = 64, cache_size: int = 64) -> None:
+        self._products: Dict[str, Product] = {}
+        # Подключённый источник товаров и id удалённых из него товаров.
+        self._snapshot: Optional[ProductSource] = None
+        self._snapshot_removed: Set[str] = set()
+        self._by_category: Dict[Optional[str], Dict[str, None]] = {}
+        self._by_price = SortedIndex()
+        self._by_stock = SortedIndex()
+        self.search_index = ProductSearchIndex()
+        # Значения price/stock, под которыми товар сейчас лежит в индексах.
+        self._indexed: Dict[str, tuple] = {}
+        # Если задан, каждое изменение записывается в журнал (см. apply()).
+        self.journal: Optional[Journal] = None
+        self.locks = StripedLock(lock_stripes)
+        self._index_lock = threading.RLock()
+        # Растёт при каждом изменении; меняется только под _index_lock.
+        self.version = 0
+        self.cache = VersionedCache(cache_size)
+        # Изменённые и удалённые с последнего take_changes() товары.
+        self._dirty: Dict[str, None] = {}
+        self._removed: Dict[str, None] = {}
+        self._all_dirty = False
+        # Удержанные корзинами единицы: product_id -> количество (> 0).
+        self._held: Dict[str, int] = {}
+        # Открытые срезы (версия -> число читателей) и прежние состояния
+        # товаров: id -> [(версия изменения, копия до него или None)].
+        self._readers: Dict[int, int] = {}
+        self._newest_reader = -1
+        self._history: Dict[str, List[Tuple[int, Optional[Product]]]] = {}
+        # Отключённые источники, которые ещё читают открытые срезы.
+        self._retired: List[ProductSource] = []
+
+    @property
+    def products(self) -> Dict[str, Product]:
+        """Все товары (id -> Product); разбирает подключённый снимок целиком."""
+        self._ensure_loaded()
+        return self._products
+
+    # ---------------------- источник товаров ----------------------
+    def attach_snapshot(self, snapshot: ProductSource) -> None:
+        """Подключает снимок (или таблицу SQLite) как источник товаров, не
+        разбирая его.
+
+        Склад должен быть пуст. Товары источника не считаются изменёнными:
+        источник должен меняться только сохранением изменений склада.
+        """
+        with self._index_lock:
+            if self._products or self._snapshot is not None:
+                raise StoreError("Снимок можно подключить только к пустому складу")
+            self._snapshot = snapshot
+            self._snapshot_removed = set()
+            self.version += 1
+
+    def _detach_snapshot(self) -> None:
+        if self._snapshot is not None:
+            if self._readers:
+                self._retired.append(self._snapshot)
+            else:
+                self._snapshot.close()
+            self._snapshot = None
+            self._snapshot_removed = set()
+
+    def _materialize(self, product_id: str) -> Optional[Product]:
+        with self._index_lock:
+            p = self._products.get(product_id)
+            if p is not None or self._snapshot is None or product_id in self._snapshot_removed:
+                return p
+            p = self._snapshot.get(product_id)
+            if p is not None:
+                self._products[product_id] = p
+                self._index(p)
+                self._dirty.pop(product_id, None)
+            return p
+
+    def _ensure_loaded(self) -> None:
+        if self._snapshot is None:
+            return
+        with self._index_lock:
+            if self._snapshot is None:
+                return
+            for p in self._snapshot.iter_products():
+                if p.id not in self._products and p.id not in self._snapshot_removed:
+                    self._products[p.id] = p
+            self._detach_snapshot()
+            all_dirty = self._all_dirty
+            self.rebuild_indexes()
+            self._all_dirty = all_dirty
 
-    def __init__(self) -> None:
-        self.products: Dict[str, Product] = {}
+    def iter_products(self) -> Iterator[Product]:
+        """Перебирает все товары, не разбирая снимок в память склада.
 
+        Товары, ещё не тронутые с момента подключения снимка, декодируются
+        на лету и в индексы не попадают — так можно сохранить склад, не
+        теряя ленивой загрузки.
+        """
+        with self._index_lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                products = list(self._products.values())
+            else:
+                products = dict(self._products)
+                removed = set(self._snapshot_removed)
+        if snapshot is None:
+            yield from products
+            return
+        for p in snapshot.iter_products():
+            if p.id not in removed:
+                yield products.pop(p.id, p)
+        yield from products.values()
+
+    # ---------------------- срезы (MVCC) ----------------------
+    def snapshot(self) -> "InventoryView":
+        """Открывает согласованный срез товаров на текущую версию.
+
+        Срез нужно закрыть (close() или with), иначе история версий
+        освободится только при сборке мусора.
+        """
+        with self._index_lock:
+            version = self.version
+            # Таблица SQLite меняется при сохранении, поэтому срез читает
+            # её через собственную читающую транзакцию.
+            source = self._snapshot
+            reader = source.reader() if source is not None and hasattr(source, "reader") else None
+            self._readers[version] = self._readers.get(version, 0) + 1
+            self._newest_reader = max(self._newest_reader, version)
+            return InventoryView(self, version, dict.fromkeys(self._products),
+                                 source if reader is None else reader,
+                                 frozenset(self._snapshot_removed), reader)
+
+    def _release_reader(self, version: int, reader: Optional["SqliteReader"] = None) -> None:
+        if reader is not None:
+            reader.close()
+        with self._index_lock:
+            left = self._readers.pop(version) - 1
+            if left:
+                self._readers[version] = left
+            if not self._readers:
+                self._newest_reader = -1
+                self._history = {}
+                for snapshot in self._retired:
+                    snapshot.close()
+                self._retired.clear()
+                return
+            # Читателю версии v нужны только записи, сделанные после v.
+            oldest = min(self._readers)
+            self._newest_reader = max(self._readers)
+            history: Dict[str, List[Tuple[int, Optional[Product]]]] = {}
+            for pid, entries in self._history.items():
+                kept = [e for e in entries if e[0] > oldest]
+                if kept:
+                    history[pid] = kept
+            self._history = history
+
+    def _preserve(self, product_id: str) -> None:
+        """Сохраняет состояние товара перед изменением (под _index_lock).
+
+        Ничего не делает, если срезов нет или для всех открытых срезов
+        прежнее состояние уже сохранено.
+        """
+        if not self._readers:
+            return
+        entries = self._history.get(product_id)
+        if entries and entries[-1][0] > self._newest_reader:
+            return
+        if self.version <= self._newest_reader:
+            self.version += 1
+        p = self._products.get(product_id)
+        entry = (self.version, None if p is None else _copy(p))
+        if entries is None:
+            self._history[product_id] = [entry]
+        else:
+            entries.append(entry)
+
+    def _at_version(self, product_id: str, version: int) -> Optional[Product]:
+        """Копия товара, каким он был в версии version (для InventoryView)."""
+        # Сначала копия живого объекта, потом проверка истории: писатель
+        # сохраняет прежнее состояние до изменения, поэтому если копия
+        # успела увидеть изменение, история его уже покрывает.
+        p = self._products.get(product_id)
+        current = None if p is None else _copy(p)
+        for changed_at, old in self._history.get(product_id, ()):
+            if changed_at > version:
+                return None if old is None else _copy(old)
+        return current
+
+    def _log(self, op: str, **fields: Any) -> None:
+        if self.journal is not None:
+            self.journal.append(op, **fields)
+
+    def take_changes(self) -> Tuple[Dict[str, Optional[Product]], bool]:
+        """Забирает накопленные изменения и начинает отсчёт заново.
+
+        Returns:
+            (id -> Product или None для удалённых, full). full=True, если
+            склад перестраивался целиком и поштучного списка недостаточно.
+        """
+        with self._index_lock:
+            changes: Dict[str, Optional[Product]] = dict.fromkeys(self._removed)
+            for pid in self._dirty:
+                changes[pid] = self._products.get(pid)
+            full = self._all_dirty
+            self._dirty = {}
+            self._removed = {}
+            self._all_dirty = False
+        return changes, full
+
+    def cached(self, key: Hashable, build: Callable[[], T]) -> T:
+        """Возвращает результат build() для текущей версии склада.
+
+        Пока склад не меняется, повторные вызовы с тем же key отдают
+        сохранённое значение без вызова build().
+        """
+        return self.cache.get_or_build(key, self.version, build)
+
+    # ---------------------- индексы ----------------------
+    def _index(self, p: Product) -> None:
+        with self._index_lock:
+            self.version += 1
+            self._dirty[p.id] = None
+            self._removed.pop(p.id, None)
+            self._by_category.setdefault(p.category, {})[p.id] = None
+            self._by_price.add(p.price, p.id)
+            self._by_stock.add(p.stock, p.id)
+            self._indexed[p.id] = (p.category, p.price, p.stock)
+            self.search_index.add(p)
+
+    def _unindex(self, product_id: str) -> None:
+        with self._index_lock:
+            entry = self._indexed.pop(product_id, None)
+            if entry is None:
+                return
+            self.version += 1
+            self._removed[product_id] = None
+            self._dirty.pop(product_id, None)
+            category, price, stock = entry
+            ids = self._by_category.get(category)
+            if ids is not None:
+                ids.pop(product_id, None)
+                if not ids:
+                    del self._by_category[category]
+            self._by_price.discard(price, product_id)
+            self._by_stock.discard(stock, product_id)
+            self.search_index.remove(product_id)
+
+    def _reindex_stock(self, p: Product) -> None:
+        with self._index_lock:
+            category, price, stock = self._indexed[p.id]
+            if stock != p.stock:
+                self.version += 1
+                self._dirty[p.id] = None
+                self._by_stock.discard(stock, p.id)
+                self._by_stock.add(p.stock, p.id)
+                self._indexed[p.id] = (category, price, p.stock)
+
+    def _reindex_price(self, p: Product) -> None:
+        with self._index_lock:
+            category, price, stock = self._indexed[p.id]
+            if price != p.price:
+                self.version += 1
+                self._dirty[p.id] = None
+                self._by_price.discard(price, p.id)
+                self._by_price.add(p.price, p.id)
+                self._indexed[p.id] = (category, p.price, stock)
+
+    def refresh(self, product_id: str) -> None:
+        """Пересчитывает индексы товара после прямого изменения его полей.
+
+        Прямое изменение не сохраняет прежнюю версию для открытых срезов
+        (snapshot) — их читатели могут увидеть новое значение.
+        """
+        with self.locks.lock_for(product_id):
+            p = self.find(product_id)
+            if not p:
+                raise StoreError(f"Продукт {product_id} не найден")
+            with self._index_lock:
+                self._unindex(product_id)
+                self._index(p)
+
+    # ---------------------- изменения ----------------------
+    @instrument("inventory.add_product")
     def add_product(self, product: Product) -> None:
         """Добавляет новый товар в инвентарь.
 
         Raises:
             StoreError: если продукт с таким id уже существует.
         """
-        if product.id in self.products:
-            raise StoreError(f"Продукт с id {product.id} уже существует")
-        self.products[product.id] = product
+        with self.locks.lock_for(product.id):
+            if self.find(product.id) is not None:
+                raise StoreError(f"Продукт с id {product.id} уже существует")
+            with self._index_lock:
+                self._preserve(product.id)
+                self._products[product.id] = product
+                self._index(product)
+            self._log("add_product", product=product.to_dict())
+
+    @instrument("inventory.remove_product")
+    def remove_product(self, product_id: str) -> Product:
+        """Удаляет товар из инвентаря и возвращает его.
+
+        Raises:
+            StoreError: если товар не найден.
+        """
+        with self.locks.lock_for(product_id):
+            if self.find(product_id) is None:
+                raise StoreError(f"Продукт {product_id} не найден")
+            with self._index_lock:
+                self._preserve(product_id)
+                p = self._products.pop(product_id)
+                if self._snapshot is not None:
+                    self._snapshot_removed.add(product_id)
+                self._unindex(product_id)
+            self._log("remove_product", id=product_id)
+            return p
 
     def find(self, product_id: str) -> Optional[Product]:
         """Возвращает объект Product по id или None, если не найден."""
-        return self.products.get(product_id)
+        p = self._products.get(product_id)
+        if p is None and self._snapshot is not None:
+            return self._materialize(product_id)
+        return p
 
-    def update_stock(self, product_id: str, new_stock: int) -> None:
-        """Обновляет количество товара на складе (переустановка)."""
+    def _get(self, product_id: str) -> Product:
         p = self.find(product_id)
         if not p:
             raise StoreError(f"Продукт {product_id} не найден")
+        return p
+
+    @instrument("inventory.update_stock")
+    def update_stock(self, product_id: str, new_stock: int) -> None:
+        """Обновляет количество товара на складе (переустановка)."""
         if new_stock < 0:
             raise InvalidQuantityError("stock не может быть отрицательным")
-        p.stock = new_stock
+        with self.locks.lock_for(product_id):
+            p = self._get(product_id)
+            with self._index_lock:
+                self._preserve(product_id)
+                p.stock = new_stock
+                self._reindex_stock(p)
+            self._log("set_stock", id=product_id, stock=new_stock)
+
+    @instrument("inventory.update_price")
+    def update_price(self, product_id: str, new_price: float) -> None:
+        """Устанавливает новую цену товара."""
+        if new_price < 0:
+            raise StoreError("Цена не может быть отрицательной")
+        with self.locks.lock_for(product_id):
+            p = self._get(product_id)
+            with self._index_lock:
+                self._preserve(product_id)
+                p.price = new_price
+                self._reindex_price(p)
+            self._log("set_price", id=product_id, price=new_price)
 
+    @instrument("inventory.reserve")
     def reserve(self, product_id: str, qty: int) -> None:
         """Резервирует qty единиц товара (уменьшает stock).
 
+        Проверка остатка и списание выполняются под одной блокировкой,
+        поэтому параллельные покупки не могут продать больше, чем есть.
+
         Raises:
             InvalidQuantityError: если qty <= 0
             StoreError: если товар не найден
@@ -40,27 +507,357 @@ class Inventory:
         """
         if qty <= 0:
             raise InvalidQuantityError("Количество должно быть > 0")
-        p = self.find(product_id)
-        if not p:
-            raise StoreError(f"Продукт {product_id} не найден")
-        if p.stock < qty:
-            raise OutOfStockError(f"На складе {p.stock}, требуется {qty}")
-        p.change_stock(-qty)
+        with self.locks.lock_for(product_id):
+            p = self._get(product_id)
+            available = p.stock - self._held.get(product_id, 0)
+            if available < qty:
+                raise OutOfStockError(f"На складе {max(available, 0)}, требуется {qty}")
+            with self._index_lock:
+                self._preserve(product_id)
+                p.change_stock(-qty)
+                self._reindex_stock(p)
+            self._log("reserve", id=product_id, qty=qty)
 
+    @instrument("inventory.release")
     def release(self, product_id: str, qty: int) -> None:
         """Возвращает в запас ранее зарезервированные qty единиц."""
         if qty <= 0:
             raise InvalidQuantityError("Количество должно быть > 0")
-        p = self.find(product_id)
-        if not p:
-            raise StoreError(f"Продукт {product_id} не найден")
-        p.change_stock(qty)
+        with self.locks.lock_for(product_id):
+            p = self._get(product_id)
+            with self._index_lock:
+                self._preserve(product_id)
+                p.change_stock(qty)
+                self._reindex_stock(p)
+            self._log("release", id=product_id, qty=qty)
+
+    @instrument("inventory.reserve_many")
+    def reserve_many(self, items: Dict[str, int],
+                     held: Optional[Dict[str, int]] = None) -> Dict[str, float]:
+        """Атомарно резервирует несколько товаров сразу («всё или ничего»).
+
+        Блокировки всех затронутых товаров берутся один раз в едином
+        порядке, затем проверяются все позиции и только после этого
+        списываются остатки. Если хоть одной позиции не хватает, склад
+        не меняется.
+
+        Args:
+            items: product_id -> количество.
+            held: удержание покупателя (hold_many), которое превращается
+                в резерв: эти единицы доступны ему сверх available() и
+                снимаются с удержания вместе с резервированием.
+
+        Returns:
+            Цены товаров (product_id -> price) на момент резервирования.
+
+        Raises:
+            InvalidQuantityError: если какое-то количество <= 0
+            StoreError: если товар не найден
+            OutOfStockError: если какой-то позиции недостаточно на складе
+        """
+        for qty in items.values():
+            if qty <= 0:
+                raise InvalidQuantityError("Количество должно быть > 0")
+        held = held or {}
+        with self.locks.locked(*items, *held):
+            found = {pid: self._get(pid) for pid in items}
+            for pid, qty in items.items():
+                available = found[pid].stock - self._held.get(pid, 0) + held.get(pid, 0)
+                if available < qty:
+                    raise OutOfStockError(
+                        f"Товар {pid}: на складе {max(available, 0)}, требуется {qty}")
+            for pid, qty in held.items():
+                self._unhold(pid, qty)
+            with self._index_lock:
+                for pid, qty in items.items():
+                    self._preserve(pid)
+                    found[pid].change_stock(-qty)
+                    self._reindex_stock(found[pid])
+            self._log("reserve_many", items=dict(items))
+            return {pid: p.price for pid, p in found.items()}
+
+    @instrument("inventory.release_many")
+    def release_many(self, items: Dict[str, int],
+                     held: Optional[Dict[str, int]] = None) -> None:
+        """Возвращает на склад несколько позиций (откат reserve_many).
+
+        Args:
+            items: product_id -> количество.
+            held: удержание, переданное в reserve_many: эти единицы
+                возвращаются в удержание той же операцией, так что никто
+                не успеет купить их между возвратом и удержанием.
+        """
+        for qty in items.values():
+            if qty <= 0:
+                raise InvalidQuantityError("Количество должно быть > 0")
+        held = held or {}
+        with self.locks.locked(*items, *held):
+            found = {pid: self._get(pid) for pid in items}
+            with self._index_lock:
+                for pid, qty in items.items():
+                    self._preserve(pid)
+                    found[pid].change_stock(qty)
+                    self._reindex_stock(found[pid])
+            for pid, qty in held.items():
+                self._held[pid] = self._held.get(pid, 0) + qty
+            self._log("release_many", items=dict(items))
+
+    def _unhold(self, product_id: str, qty: int) -> None:
+        left = self._held.get(product_id, 0) - qty
+        if left > 0:
+            self._held[product_id] = left
+        else:
+            self._held.pop(product_id, None)
+
+    @instrument("inventory.hold_many")
+    def hold_many(self, items: Dict[str, int]) -> None:
+        """Удерживает товары для корзины («всё или ничего»), не меняя stock.
+
+        Raises:
+            InvalidQuantityError: если какое-то количество <= 0
+            StoreError: если товар не найден
+            OutOfStockError: если какой-то позиции не хватает свободного остатка
+        """
+        for qty in items.values():
+            if qty <= 0:
+                raise InvalidQuantityError("Количество должно быть > 0")
+        with self.locks.locked(*items):
+            found = {pid: self._get(pid) for pid in items}
+            for pid, qty in items.items():
+                available = found[pid].stock - self._held.get(pid, 0)
+                if available < qty:
+                    raise OutOfStockError(
+                        f"Товар {pid}: доступно {max(available, 0)}, требуется {qty}")
+            for pid, qty in items.items():
+                self._held[pid] = self._held.get(pid, 0) + qty
+
+    def unhold_many(self, items: Dict[str, int]) -> None:
+        """Снимает удержание (товар мог быть уже удалён — это не ошибка)."""
+        with self.locks.locked(*items):
+            for pid, qty in items.items():
+                self._unhold(pid, qty)
+
+    def held(self, product_id: str) -> int:
+        """Сколько единиц товара удержано корзинами."""
+        return self._held.get(product_id, 0)
+
+    def available(self, product_id: str) -> int:
+        """Свободный остаток: stock за вычетом удержанного.
 
+        Raises:
+            StoreError: если товар не найден.
+        """
+        return max(self._get(product_id).stock - self._held.get(product_id, 0), 0)
+
+    def held_products(self) -> Dict[str, int]:
+        """Копия удержаний: product_id -> количество (только товары с удержанием)."""
+        return dict(self._held)
+
+    def restock(self, product_id: str, qty: int) -> None:
+        """Увеличивает остаток на qty единиц (поставка от поставщика)."""
+        self.release(product_id, qty)
+
+    INVENTORY_OPS = ("add_product", "remove_product", "set_stock", "set_price", "reserve", "release",
+                     "reserve_many", "release_many")
+
+    def apply(self, record: Dict[str, Any]) -> None:
+        """Повторно применяет запись журнала (без повторной записи в журнал)."""
+        journal, self.journal = self.journal, None
+        try:
+            op = record["op"]
+            if op == "add_product":
+                self.add_product(Product.from_dict(record["product"]))
+            elif op == "remove_product":
+                self.remove_product(record["id"])
+            elif op == "set_stock":
+                self.update_stock(record["id"], record["stock"])
+            elif op == "set_price":
+                self.update_price(record["id"], record["price"])
+            elif op == "reserve":
+                self.reserve(record["id"], record["qty"])
+            elif op == "release":
+                self.release(record["id"], record["qty"])
+            elif op == "reserve_many":
+                self.reserve_many(record["items"])
+            elif op == "release_many":
+                self.release_many(record["items"])
+            else:
+                raise StoreError(f"Неизвестная операция журнала: {op}")
+        finally:
+            self.journal = journal
+
+    # ---------------------- запросы ----------------------
+    def _query_source(self, name: str, *args: Any) -> Optional[Tuple[ProductSource, List[Product]]]:
+        """Выполняет запрос name у подключённого источника, если тот его умеет.
+
+        Иначе (источника нет или он без запросов) разбирает источник в
+        память и возвращает None — тогда отвечают индексы склада.
+        """
+        source = self._snapshot
+        query = getattr(source, name, None)
+        if query is None:
+            self._ensure_loaded()
+            return None
+        return source, list(query(*args))
+
+    def _untouched(self, source: ProductSource, rows: Iterable[Product]) -> List[Product]:
+        """Товары из ответа источника, которых нет в памяти склада (под _index_lock).
+
+        Загруженные и удалённые товары могли измениться — за них отвечают
+        индексы склада, а остальные в источнике совпадают со складом.
+        """
+        if self._snapshot is not source:
+            return []  # источник уже разобран в память целиком
+        return [p for p in rows if p.id not in self._products and p.id not in self._snapshot_removed]
+
+    def categories(self) -> List[Optional[str]]:
+        """Возвращает список категорий, в которых есть товары."""
+        found = self._query_source("categories")
+        with self._index_lock:
+            result = list(self._by_category)
+        if found is None:
+            return result
+        source, categories = found
+        known = set(result)
+        for category in categories:
+            if category in known:
+                continue
+            # Категория могла остаться только у изменённых в памяти товаров.
+            for p in source.by_category(category):  # type: ignore[union-attr]
+                with self._index_lock:
+                    if self._untouched(source, [p]):
+                        result.append(category)
+                        break
+        return result
+
+    def by_category(self, category: Optional[str]) -> List[Product]:
+        """Возвращает товары категории за O(k)."""
+        found = self._query_source("by_category", category)
+        with self._index_lock:
+            result = [self._products[pid] for pid in self._by_category.get(category, ())]
+            if found is not None:
+                result.extend(self._untouched(*found))
+        return result
+
+    @instrument("inventory.price_range")
+    def price_range(self, min_price: Optional[float] = None, max_price: Optional[float] = None,
+                    category: Optional[str] = None) -> List[Product]:
+        """Возвращает товары с ценой в [min_price, max_price] по возрастанию цены.
+
+        Если задана category, выбираются только товары этой категории.
+        """
+        found = self._query_source("price_range", min_price, max_price, category)
+        result = []
+        with self._index_lock:
+            for pid in self._by_price.irange(min_price, max_price):
+                p = self._products[pid]
+                if category is None or p.category == category:
+                    result.append(p)
+            if found is None:
+                return result
+            fresh = self._untouched(*found)
+        return list(heapq.merge(result, fresh, key=lambda p: (p.price, p.id)))
+
+    @instrument("inventory.low_stock")
+    def low_stock(self, threshold: int) -> List[Product]:
+        """Возвращает товары с остатком <= threshold по возрастанию остатка."""
+        found = self._query_source("low_stock", threshold)
+        with self._index_lock:
+            result = [self._products[pid] for pid in self._by_stock.irange(None, threshold)]
+            if found is None:
+                return result
+            fresh = self._untouched(*found)
+        return list(heapq.merge(result, fresh, key=lambda p: (p.stock, p.id)))
+
+    @instrument("inventory.search")
+    def search(self, query: str, limit: int = 20) -> List[Product]:
+        """Полнотекстовый поиск по названию и описанию, лучшие совпадения первыми."""
+        self._ensure_loaded()
+        with self._index_lock:
+            return [self._products[pid] for pid, _ in self.search_index.search(query, limit)]
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[str]:
+        """Подсказки слов для автодополнения поискового запроса."""
+        self._ensure_loaded()
+        with self._index_lock:
+            return self.search_index.suggest(prefix, limit)
+
+    # ---------------------- сериализация ----------------------
     def to_dict(self) -> Dict[str, Any]:
-        return {"products": [p.to_dict() for p in self.products.values()]}
+        """Словарь склада по согласованному срезу (не блокирует запись)."""
+        with self.snapshot() as view:
+            return {"products": [p.to_dict() for p in view]}
 
     def from_dict(self, data: Dict[str, Any]) -> None:
-        self.products.clear()
-        for p in data.get("products", []):
-            prod = Product(**p)
-            self.products[prod.id] = prod
+        with self._index_lock:
+            if self._readers:
+                for pid in self._products:
+                    self._preserve(pid)
+            self.version += 1
+            self._all_dirty = True
+            self._detach_snapshot()
+            self._products.clear()
+            self._by_category.clear()
+            self._by_price.clear()
+            self._by_stock.clear()
+            self._indexed.clear()
+            self.search_index.clear()
+        self.load_products(data.get("products", []))
+
+    @instrument("inventory.merge_products")
+    def merge_products(self, products: Iterable[Product]) -> int:
+        """Массово добавляет или заменяет товары с одной перестройкой индексов.
+
+        Предназначен для больших импортов: вместо обновления индексов по
+        одному товару они пересобираются целиком в конце. Изменения не
+        пишутся в журнал — после импорта нужен полный снимок.
+
+        Returns:
+            Количество объединённых товаров.
+        """
+        count = 0
+        self._ensure_loaded()
+        with self._index_lock:
+            for p in products:
+                self._preserve(p.id)
+                self._products[p.id] = p
+                count += 1
+            self.rebuild_indexes()
+        return count
+
+    def rebuild_indexes(self) -> None:
+        """Пересобирает все вторичные индексы по текущему содержимому products."""
+        with self._index_lock:
+            self.version += 1
+            self._all_dirty = True
+            self._by_category.clear()
+            self._indexed.clear()
+            self.search_index.clear()
+            for p in self._products.values():
+                self._by_category.setdefault(p.category, {})[p.id] = None
+                self._indexed[p.id] = (p.category, p.price, p.stock)
+                self.search_index.add(p)
+            self._by_price.rebuild((p.price, p.id) for p in self._products.values())
+            self._by_stock.rebuild((p.stock, p.id) for p in self._products.values())
+
+    @instrument("inventory.load_products")
+    def load_products(self, records: Iterable[Union[Dict[str, Any], Product]]) -> int:
+        """Добавляет товары из последовательности словарей или объектов Product
+        (в т.ч. из генератора).
+
+        Записи с уже существующим id перезаписывают старые, как и в from_dict.
+
+        Returns:
+            Количество загруженных записей.
+        """
+        self._ensure_loaded()
+        count = 0
+        for p in records:
+            prod = p if isinstance(p, Product) else Product.from_dict(p)
+            with self.locks.lock_for(prod.id), self._index_lock:
+                self._preserve(prod.id)
+                self._unindex(prod.id)
+                self._products[prod.id] = prod
+                self._index(prod)
+            count += 1
+        return count
@@ -3,7 +3,7 @@ from typing import List, Dict, Any
 from datetime import datetime
 from .order_item import OrderItem
 
-@dataclass
+@dataclass(slots=True)
 class Order:
     id: str
     customer_id: str
@@ -16,12 +16,28 @@ class Order:
         return sum(i.subtotal() for i in self.items)
 
     def to_dict(self) -> Dict[str, Any]:
-        """Преобразует заказ в словарь, пригодный для вывода/сохранения."""
+        """Преобразует заказ в словарь, пригодный для вывода/сохранения.
+
+        Позиции сериализуются и суммируются за один проход.
+        """
+        items = []
+        total = 0.0
+        for i in self.items:
+            total += i.quantity * i.price
+            items.append({"product_id": i.product_id, "quantity": i.quantity, "price": i.price})
         return {
             "id": self.id,
             "customer_id": self.customer_id,
-            "items": [i.to_dict() for i in self.items],
+            "items": items,
             "status": self.status,
             "created_at": self.created_at,
-            "total": self.total()
+            "total": total
         }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Order":
+        """Создаёт заказ из словаря формата to_dict() (поле total игнорируется)."""
+        return cls(data["id"], data["customer_id"],
+                   [OrderItem(i["product_id"], i["quantity"], i["price"]) for i in data["items"]],
+                   data.get("status", "created"),
+                   data.get("created_at") or datetime.utcnow().isoformat())
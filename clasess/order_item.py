@@ -1,8 +1,8 @@
 """Позиция в заказе (в момент оформления фиксируется цена)."""
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from typing import Dict, Any
 
-@dataclass
+@dataclass(slots=True)
 class OrderItem:
     product_id: str
     quantity: int
@@ -13,4 +13,8 @@ class OrderItem:
         return self.quantity * self.price
 
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        return {"product_id": self.product_id, "quantity": self.quantity, "price": self.price}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "OrderItem":
+        return cls(data["product_id"], data["quantity"], data["price"])
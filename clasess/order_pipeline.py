@@ -0,0 +1,280 @@
+"""Асинхронный конвейер обработки заказов.
+
+Заказ проходит стадии очередь → проверка → резервирование → оплата →
+подтверждение. Очередь ограничена, поэтому при перегрузке submit()
+ждёт (backpressure). Оплата — самая медленная стадия (сетевой вызов
+шлюза) — выполняется с ограничением параллельности, таймаутом и
+повторами с экспоненциальной задержкой.
+
+Синхронные стадии (проверка с резервированием и подтверждение) могут
+выполняться в отдельном executor, чтобы запись журнала или чтение базы
+не останавливали цикл событий (так делает server.py).
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple, TypeVar
+from exceptions.store_exceptions import StoreError, InvalidQuantityError, PaymentError
+from utils.helpers import generate_id
+from .cart import Cart
+from .customer import Customer
+from .inventory import Inventory
+from .order import Order
+from .order_item import OrderItem
+from .payment import Payment, PaymentGateway
+from .stock_holds import StockHolds
+
+T = TypeVar("T")
+
+
+@dataclass
+class OrderRequest:
+    """Заявка на заказ: покупатель и позиции product_id -> количество.
+
+    hold_id — удержание корзины (StockHolds), которое засчитывается при
+    резервировании, если у конвейера есть holds.
+    """
+    customer: Customer
+    items: Dict[str, int]
+    method: str = "card"
+    submitted_at: float = field(default_factory=time.perf_counter)
+    hold_id: Optional[str] = None
+
+
+@dataclass
+class OrderResult:
+    """Итог обработки заявки."""
+    request: OrderRequest
+    order: Optional[Order] = None
+    error: Optional[StoreError] = None
+    attempts: int = 0
+    latency: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.order is not None
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Возвращает q-й перцентиль (0..100) методом ближайшего ранга."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+
+class OrderPipeline:
+    """Конвейер заказов поверх Inventory и асинхронного платёжного шлюза.
+
+    Args:
+        inventory: склад, на котором резервируются товары.
+        gateway: платёжный шлюз (None — мгновенная локальная оплата).
+        workers: число одновременно обрабатываемых заявок.
+        payment_concurrency: максимум одновременных обращений к шлюзу.
+        queue_size: ёмкость входной очереди (0 — без ограничения).
+        payment_timeout: таймаут одного обращения к шлюзу (сек).
+        retries: сколько раз повторять неудавшийся платёж.
+        backoff: базовая задержка перед повтором (удваивается каждый раз).
+        on_order: вызывается для каждого подтверждённого заказа (например,
+            чтобы записать его в журнал и OrderStore). Если он бросает
+            исключение, товар и деньги возвращаются, а заявка завершается
+            ошибкой.
+        holds: удержания корзин, засчитываемые по OrderRequest.hold_id.
+        executor: где выполнять синхронные стадии (None — в цикле событий).
+        max_results: сколько последних результатов хранить для stats()
+            (None — все; долгоживущему конвейеру нужен предел).
+    """
+
+    def __init__(self, inventory: Inventory, gateway: Optional[PaymentGateway] = None,
+                 workers: int = 32, payment_concurrency: int = 8, queue_size: int = 1000,
+                 payment_timeout: Optional[float] = 1.0, retries: int = 3, backoff: float = 0.05,
+                 on_order: Optional[Callable[[Order], None]] = None,
+                 holds: Optional[StockHolds] = None, executor: Optional[Executor] = None,
+                 max_results: Optional[int] = None) -> None:
+        self.inventory = inventory
+        self.gateway = gateway
+        self.workers = workers
+        self.payment_concurrency = payment_concurrency
+        self.queue_size = queue_size
+        self.payment_timeout = payment_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.on_order = on_order
+        self.holds = holds
+        self.executor = executor
+        self.results: Deque[OrderResult] = deque(maxlen=max_results)
+        self._queue: Optional[asyncio.Queue] = None
+        self._payment_slots: Optional[asyncio.Semaphore] = None
+        self._tasks: List[asyncio.Task] = []
+        self._started_at = 0.0
+        self._finished_at = 0.0
+
+    # ---------------------- жизненный цикл ----------------------
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(self.queue_size)
+        self._payment_slots = asyncio.Semaphore(self.payment_concurrency)
+        self._started_at = time.perf_counter()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def submit(self, request: OrderRequest) -> "asyncio.Future[OrderResult]":
+        """Ставит заявку в очередь; ждёт, если очередь заполнена.
+
+        Задержка заявки считается с этого вызова, включая ожидание места
+        в очереди. Конвейер запускается при первой заявке, если start()
+        ещё не вызывали.
+        """
+        if self._queue is None:
+            await self.start()
+        future = asyncio.get_running_loop().create_future()
+        request.submitted_at = time.perf_counter()
+        await self._queue.put((request, future))
+        return future
+
+    async def close(self) -> None:
+        """Дожидается обработки всех заявок и останавливает обработчики."""
+        if self._queue is None:
+            return
+        await self._queue.join()
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._finished_at = time.perf_counter()
+
+    async def run(self, requests: Iterable[OrderRequest]) -> List[OrderResult]:
+        """Прогоняет все заявки через конвейер и возвращает их результаты."""
+        await self.start()
+        futures = [await self.submit(r) for r in requests]
+        results = await asyncio.gather(*futures)
+        await self.close()
+        return list(results)
+
+    # ---------------------- стадии ----------------------
+    async def _worker(self) -> None:
+        while True:
+            request, future = await self._queue.get()
+            try:
+                result = await self._process(request)
+                self.results.append(result)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    def _validate(self, request: OrderRequest) -> None:
+        if not request.items:
+            raise StoreError("Заказ без позиций")
+        for pid, qty in request.items.items():
+            if qty <= 0:
+                raise InvalidQuantityError(f"Некорректное количество {qty} для {pid}")
+            if self.inventory.find(pid) is None:
+                raise StoreError(f"Продукт {pid} не найден")
+
+    async def _pay(self, payment: Payment, result: OrderResult) -> None:
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            result.attempts = attempt + 1
+            try:
+                async with self._payment_slots:
+                    await payment.process_async(self.gateway, self.payment_timeout)
+                return
+            except PaymentError:
+                if attempt == self.retries:
+                    raise
+            await asyncio.sleep(delay * (1 + random.random()))
+            delay *= 2
+
+    async def _call(self, fn: Callable[..., T], *args: Any) -> T:
+        if self.executor is None:
+            return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def _cart(self, request: OrderRequest) -> Optional[Cart]:
+        """Корзина заявки с удержанием или None, если удержание не засчитывается."""
+        if self.holds is None or request.hold_id is None:
+            return None
+        cart = Cart(owner_id=request.customer.email, hold_id=request.hold_id)
+        for pid, qty in request.items.items():
+            cart.add(pid, qty)
+        return cart
+
+    def _reserve(self, request: OrderRequest) -> Tuple[Order, float, Optional[Cart]]:
+        """Проверка, резервирование и списание средств с баланса."""
+        self._validate(request)
+        cart = self._cart(request)
+        if cart is not None:
+            prices = self.holds.reserve_cart(cart)  # type: ignore[union-attr]
+        else:
+            prices = self.inventory.reserve_many(request.items)
+        items = [OrderItem(pid, qty, prices[pid]) for pid, qty in request.items.items()]
+        order = Order(generate_id("o"), request.customer.email, items)
+        total = order.total()
+        # Средства списываются до обращения к шлюзу: параллельные заказы
+        # одного покупателя не смогут потратить один и тот же баланс.
+        if not request.customer.pay(total):
+            self._release(request, cart)
+            raise PaymentError(f"Недостаточно средств: требуется {total}")
+        return order, total, cart
+
+    def _release(self, request: OrderRequest, cart: Optional[Cart]) -> None:
+        if cart is not None:
+            self.holds.restore_cart(cart)  # type: ignore[union-attr]
+        else:
+            self.inventory.release_many(request.items)
+
+    def _refund(self, request: OrderRequest, cart: Optional[Cart], total: float) -> None:
+        request.customer.balance += total
+        self._release(request, cart)
+
+    def _confirm(self, request: OrderRequest, order: Order, cart: Optional[Cart]) -> None:
+        # Сначала фиксация заказа: если on_order упадёт, _refund вернёт
+        # товар, деньги и удержание корзины, а у покупателя заказа не будет.
+        if self.on_order:
+            self.on_order(order)
+        request.customer.add_order(order)
+        if cart is not None:
+            self.holds.confirm_cart(cart)  # type: ignore[union-attr]
+
+    async def _process(self, request: OrderRequest) -> OrderResult:
+        result = OrderResult(request)
+        try:
+            order, total, cart = await self._call(self._reserve, request)
+            try:
+                await self._pay(Payment(generate_id("pay"), order.id, total, request.method), result)
+                await self._call(self._confirm, request, order, cart)
+            except BaseException:
+                await self._call(self._refund, request, cart, total)
+                raise
+            result.order = order
+        except StoreError as e:
+            result.error = e
+        except Exception as e:
+            # Например, OSError записи журнала или файла заказов в on_order:
+            # товар и деньги уже возвращены, заявка просто не прошла.
+            result.error = StoreError(f"Не удалось зафиксировать заказ: {e}")
+        result.latency = time.perf_counter() - request.submitted_at
+        return result
+
+    # ---------------------- статистика ----------------------
+    def stats(self) -> Dict[str, float]:
+        """Пропускная способность и задержки по обработанным заявкам."""
+        latencies = [r.latency for r in self.results]
+        elapsed = (self._finished_at or time.perf_counter()) - self._started_at
+        ok = sum(1 for r in self.results if r.ok)
+        return {
+            "orders": len(self.results),
+            "ok": ok,
+            "failed": len(self.results) - ok,
+            "seconds": elapsed,
+            "orders_per_sec": len(self.results) / elapsed if elapsed > 0 else 0.0,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+        }
@@ -0,0 +1,475 @@
+"""Хранилище заказов с ленивой загрузкой и курсорной пагинацией."""
+import io
+import json
+import os
+import threading
+import weakref
+from array import array
+from collections import OrderedDict
+from itertools import islice
+from dataclasses import dataclass
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from exceptions.store_exceptions import SerializationError, StoreError
+from utils.sorted_index import SortedIndex
+from .customer import Customer
+from .customer_registry import CustomerRegistry
+from .order import Order
+
+
+TimeBound = Union[str, datetime, None]
+
+
+def _time_key(value: TimeBound) -> Optional[str]:
+    """Граница диапазона в формате Order.created_at (ISO-строка)."""
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+@dataclass(slots=True)
+class _OrderRef:
+    """То, что хранится в памяти для каждого заказа, — без позиций."""
+    record: int  # номер актуальной записи в файле
+    customer: str  # нормализованный e-mail
+    created_at: str
+    status: str
+
+
+@dataclass(slots=True)
+class OrderPage:
+    """Страница выборки; next_cursor = None, если страница последняя."""
+    orders: List[Order]
+    next_cursor: Optional[str] = None
+
+
+class OrderStore:
+    """Заказы в файле-журнале, в памяти — только индексы.
+
+    Каждая запись файла — строка «id, e-mail, created_at, status, JSON
+    заказа», разделённые табуляцией; изменение статуса дописывает новую
+    запись. При открытии читаются только первые четыре поля, поэтому
+    память занимают лишь индексы по id, покупателю и created_at, а сами
+    Order с позициями декодируются по требованию.
+
+    Записи сгруппированы в страницы по page_size подряд идущих; в памяти
+    держится не больше max_pages недавно использованных страниц (LRU).
+
+    Файл только дописывается, поэтому срез на момент времени — это просто
+    его первые n записей (snapshot()); пока срезы открыты, compact() не
+    переписывает файл.
+
+    Args:
+        filepath: путь к файлу заказов; None — хранить в памяти.
+        page_size: записей на странице.
+        max_pages: сколько страниц держать декодированными.
+
+    Raises:
+        SerializationError: если файл не удалось открыть или записать.
+    """
+
+    def __init__(self, filepath: Optional[str] = None, page_size: int = 256,
+                 max_pages: int = 16) -> None:
+        self.filepath = filepath
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._lock = threading.RLock()
+        self._refs: Dict[str, _OrderRef] = {}
+        self._by_created = SortedIndex()
+        self._by_customer: Dict[str, SortedIndex] = {}
+        # Смещение каждой записи в файле; _end — конец последней.
+        self._offsets = array("q")
+        self._end = 0
+        self._pages: "OrderedDict[int, Dict[str, Order]]" = OrderedDict()
+        self.page_loads = 0
+        self._views = 0  # открытые срезы snapshot()
+        self._file = self._open()
+
+    # ---------------------- файл ----------------------
+    def _open(self) -> BinaryIO:
+        if self.filepath is None:
+            return io.BytesIO()
+        try:
+            f = open(self.filepath, "a+b")
+            f.seek(0)
+            offset = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Недописанная при сбое запись.
+                    f.truncate(offset)
+                    break
+                self._index_record(line, offset)
+                offset += len(line)
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            raise SerializationError(f"{self.filepath}: {e}")
+        self._end = offset
+        return f
+
+    def _index_record(self, line: bytes, offset: int) -> None:
+        order_id, customer, created_at, status = (
+            part.decode("utf-8") for part in line.split(b"\t", 4)[:4])
+        n = len(self._offsets)
+        self._offsets.append(offset)
+        ref = self._refs.get(order_id)
+        if ref is None:
+            self._refs[order_id] = _OrderRef(n, customer, created_at, status)
+            self._by_created.add(created_at, order_id)
+            index = self._by_customer.get(customer)
+            if index is None:
+                index = self._by_customer[customer] = SortedIndex(load=64)
+            index.add(created_at, order_id)
+        else:
+            ref.record = n
+            ref.status = status
+
+    def _append(self, order: Order, customer: str) -> bytes:
+        fields = (order.id, customer, order.created_at, order.status)
+        if any("\t" in f or "\n" in f for f in fields):
+            raise StoreError(f"Заказ {order.id}: недопустимые символы в id, e-mail, дате или статусе")
+        line = "\t".join(fields + (json.dumps(order.to_dict(), ensure_ascii=False),)) + "\n"
+        data = line.encode("utf-8")
+        try:
+            self._file.seek(self._end)
+            self._file.write(data)
+            self._file.flush()
+        except OSError as e:
+            raise SerializationError(f"{self.filepath}: {e}")
+        return data
+
+    def _read(self, start: int, end: int) -> bytes:
+        self._file.seek(self._offsets[start])
+        stop = self._offsets[end] if end < len(self._offsets) else self._end
+        return self._file.read(stop - self._offsets[start])
+
+    def sync(self) -> None:
+        """Сбрасывает записанное на диск (fsync)."""
+        with self._lock:
+            if self.filepath is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+            self._pages.clear()
+
+    # ---------------------- страницы ----------------------
+    def _decode_page(self, page: int) -> Dict[str, Order]:
+        start = page * self.page_size
+        end = min(start + self.page_size, len(self._offsets))
+        orders: Dict[str, Order] = {}
+        for n, line in enumerate(self._read(start, end).split(b"\n")[:-1], start):
+            order_id = line[:line.index(b"\t")].decode("utf-8")
+            ref = self._refs.get(order_id)
+            if ref is not None and ref.record == n:
+                orders[order_id] = Order.from_dict(json.loads(line.split(b"\t", 4)[4]))
+        return orders
+
+    def _page(self, page: int) -> Dict[str, Order]:
+        orders = self._pages.get(page)
+        if orders is not None:
+            self._pages.move_to_end(page)
+            return orders
+        orders = self._decode_page(page)
+        self.page_loads += 1
+        self._pages[page] = orders
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return orders
+
+    # ---------------------- изменения ----------------------
+    def save(self, order: Order) -> None:
+        """Добавляет заказ или записывает изменение его статуса.
+
+        Повторное сохранение неизменённого заказа ничего не пишет, поэтому
+        безопасно при повторе журнала.
+        """
+        with self._lock:
+            ref = self._refs.get(order.id)
+            if ref is not None and ref.status == order.status:
+                return
+            customer = CustomerRegistry.normalize_email(order.customer_id)
+            data = self._append(order, customer)
+            if ref is not None:
+                old = self._pages.get(ref.record // self.page_size)
+                if old is not None:
+                    old.pop(order.id, None)
+            n = len(self._offsets)
+            self._index_record(data, self._end)
+            self._end += len(data)
+            page = self._pages.get(n // self.page_size)
+            if page is not None:
+                page[order.id] = order
+
+    def set_status(self, order_id: str, status: str) -> Order:
+        """Меняет статус заказа и возвращает его.
+
+        Raises:
+            StoreError: если заказ не найден.
+        """
+        with self._lock:
+            order = self.get(order_id)
+            if order is None:
+                raise StoreError(f"Заказ {order_id} не найден")
+            order.status = status
+            self.save(order)
+            return order
+
+    @property
+    def garbage(self) -> int:
+        """Число устаревших записей в файле (заменённых новыми статусами)."""
+        return len(self._offsets) - len(self._refs)
+
+    def compact(self) -> None:
+        """Переписывает файл, оставляя только актуальные записи."""
+        with self._lock:
+            if self.filepath is None or not self.garbage or self._views:
+                return
+            tmp_path = self.filepath + ".tmp"
+            try:
+                with open(tmp_path, "wb") as out:
+                    for page in range(0, len(self._offsets), self.page_size):
+                        end = min(page + self.page_size, len(self._offsets))
+                        for n, line in enumerate(self._read(page, end).split(b"\n")[:-1], page):
+                            ref = self._refs[line[:line.index(b"\t")].decode("utf-8")]
+                            if ref.record == n:
+                                out.write(line + b"\n")
+                    out.flush()
+                    os.fsync(out.fileno())
+                self._file.close()
+                os.replace(tmp_path, self.filepath)
+            except OSError as e:
+                raise SerializationError(f"{self.filepath}: {e}")
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self._refs.clear()
+            self._by_created.clear()
+            self._by_customer.clear()
+            self._offsets = array("q")
+            self._pages.clear()
+            self._file = self._open()
+
+    def maybe_compact(self) -> None:
+        """Вызывает compact(), если устаревших записей больше, чем актуальных."""
+        if self.garbage > max(1024, len(self._refs)):
+            self.compact()
+
+    # ---------------------- чтение ----------------------
+    def get(self, order_id: str) -> Optional[Order]:
+        """Возвращает заказ по id (декодируя его страницу) или None."""
+        with self._lock:
+            ref = self._refs.get(order_id)
+            if ref is None:
+                return None
+            return self._page(ref.record // self.page_size)[order_id]
+
+    def __contains__(self, order_id: object) -> bool:
+        return order_id in self._refs
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+    def __iter__(self) -> Iterator[Order]:
+        """Все заказы в порядке записи в файл.
+
+        Полный обход не вытесняет недавно использованные страницы.
+        """
+        for page in range((len(self._offsets) + self.page_size - 1) // self.page_size):
+            with self._lock:
+                orders = self._pages.get(page)
+                orders = list((orders or self._decode_page(page)).values())
+            yield from orders
+
+    def count(self, customer: Optional[str] = None) -> int:
+        """Число заказов всего или одного покупателя."""
+        if customer is None:
+            return len(self._refs)
+        index = self._by_customer.get(CustomerRegistry.normalize_email(customer))
+        return len(index) if index is not None else 0
+
+    def _index(self, customer: Optional[str]) -> Optional[SortedIndex]:
+        if customer is None:
+            return self._by_created
+        return self._by_customer.get(CustomerRegistry.normalize_email(customer))
+
+    def page(self, cursor: Optional[str] = None, limit: int = 20, customer: Optional[str] = None,
+             status: Union[str, Iterable[str], None] = None, start: TimeBound = None,
+             end: TimeBound = None, newest_first: bool = True) -> OrderPage:
+        """Возвращает страницу заказов, упорядоченных по created_at.
+
+        Args:
+            cursor: next_cursor предыдущей страницы; None — с начала.
+            limit: размер страницы.
+            customer: только заказы покупателя с этим e-mail.
+            status: статус или набор статусов; фильтр не декодирует заказы.
+            start, end: полуинтервал [start, end) по created_at — строки
+                вроде ("2024-01-01", "2024-02-01") или datetime.
+            newest_first: сначала новые (по умолчанию) или сначала старые.
+
+        Raises:
+            StoreError: если курсор некорректен.
+        """
+        statuses = None if status is None else {status} if isinstance(status, str) else set(status)
+        start, end = _time_key(start), _time_key(end)
+        with self._lock:
+            index = self._index(customer)
+            if index is None:
+                return OrderPage([])
+            if cursor is not None:
+                after = self._decode_cursor(cursor)
+            elif newest_first:
+                after = None if end is None else (end,)
+            else:
+                after = None if start is None else (start,)
+            ids: List[str] = []
+            next_cursor = None
+            for created_at, order_id in index.iter_entries(after, reverse=newest_first):
+                if (start is not None and created_at < start) or (end is not None and created_at >= end):
+                    break
+                if statuses is not None and self._refs[order_id].status not in statuses:
+                    continue
+                if len(ids) == limit:
+                    last = ids[-1]
+                    next_cursor = json.dumps([self._refs[last].created_at, last])
+                    break
+                ids.append(order_id)
+            return OrderPage([self.get(order_id) for order_id in ids], next_cursor)
+
+    def between(self, start: TimeBound, end: TimeBound, customer: Optional[str] = None,
+                limit: Optional[int] = None) -> List[Order]:
+        """Заказы с created_at в [start, end), от старых к новым.
+
+        Обход индекса начинается сразу с start и останавливается на end —
+        O(log n + k), без сортировки всех заказов. None — без границы.
+        """
+        start, end = _time_key(start), _time_key(end)
+        with self._lock:
+            index = self._index(customer)
+            if index is None:
+                return []
+            ids: List[str] = []
+            for created_at, order_id in index.iter_entries(None if start is None else (start,)):
+                if (end is not None and created_at >= end) or len(ids) == limit:
+                    break
+                ids.append(order_id)
+            return [self.get(order_id) for order_id in ids]
+
+    def latest(self, n: int, customer: Optional[str] = None) -> List[Order]:
+        """Последние n заказов (всего или покупателя), от новых к старым."""
+        with self._lock:
+            index = self._index(customer)
+            if index is None:
+                return []
+            return [self.get(order_id) for _, order_id in islice(index.iter_entries(reverse=True), n)]
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[str, str]:
+        try:
+            created_at, order_id = json.loads(cursor)
+        except (ValueError, TypeError):
+            raise StoreError(f"Некорректный курсор: {cursor!r}")
+        return created_at, order_id
+
+    def for_customer(self, email: str) -> List[Order]:
+        """Все заказы покупателя, от старых к новым."""
+        with self._lock:
+            index = self._by_customer.get(CustomerRegistry.normalize_email(email))
+            if index is None:
+                return []
+            return [self.get(order_id) for _, order_id in index.iter_entries()]
+
+    def snapshot(self) -> "OrderStoreView":
+        """Открывает срез заказов на текущий момент (закрыть — close() или with)."""
+        with self._lock:
+            self._views += 1
+            return OrderStoreView(self, len(self._offsets), len(self._refs))
+
+    def _close_view(self) -> None:
+        with self._lock:
+            self._views -= 1
+
+    def link(self, customer: Customer) -> None:
+        """Подменяет customer.orders представлением заказов из хранилища.
+
+        Заказы, уже лежавшие в списке покупателя, сохраняются в хранилище.
+        Новые заказы (Customer.add_order) в хранилище не пишутся — их
+        сохраняет через save() тот, кто фиксирует заказ.
+        """
+        for order in customer.orders:
+            self.save(order)
+        customer.orders = CustomerOrders(self, customer.email)
+
+
+class OrderStoreView:
+    """Заказы в том виде, в каком они были при открытии среза.
+
+    Читает первые records записей файла: для каждого заказа берётся
+    последняя из них, поэтому новые заказы и изменения статусов после
+    открытия среза не видны. Заказы декодируются из файла заново —
+    это собственные объекты читателя.
+    """
+
+    def __init__(self, store: OrderStore, records: int, count: int) -> None:
+        self._store = store
+        self._records = records
+        self._count = count
+        self._finalizer = weakref.finalize(self, store._close_view)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Order]:
+        """Заказы среза; изменённые после открытия идут в конце."""
+        store = self._store
+        changed: Dict[str, bytes] = {}
+        for page in range(0, self._records, store.page_size):
+            end = min(page + store.page_size, self._records)
+            with store._lock:
+                lines = store._read(page, end).split(b"\n")[:-1]
+                refs = store._refs
+                latest = []
+                for n, line in enumerate(lines, page):
+                    order_id = line[:line.index(b"\t")].decode("utf-8")
+                    record = refs[order_id].record
+                    if record >= self._records:
+                        changed[order_id] = line  # последняя версия до среза
+                    elif record == n:
+                        latest.append(line)
+            for line in latest:
+                yield Order.from_dict(json.loads(line.split(b"\t", 4)[4]))
+        for line in changed.values():
+            yield Order.from_dict(json.loads(line.split(b"\t", 4)[4]))
+
+    def close(self) -> None:
+        self._finalizer()
+
+    def __enter__(self) -> "OrderStoreView":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class CustomerOrders:
+    """Заказы одного покупателя — ленивая замена списка Customer.orders."""
+
+    def __init__(self, store: OrderStore, email: str) -> None:
+        self._store = store
+        self._email = email
+
+    def append(self, order: Order) -> None:
+        """Ничего не пишет: Customer.add_order вызывается при оформлении
+        заказа раньше, чем изменения остатков и баланса попали в журнал.
+        В файл заказ записывает OrderStore.save (в приложении — только
+        main.record_order, после сброса журнала)."""
+
+    def __len__(self) -> int:
+        return self._store.count(self._email)
+
+    def __iter__(self) -> Iterator[Order]:
+        return iter(self._store.for_customer(self._email))
+
+    def __getitem__(self, i: int) -> Order:
+        return self._store.for_customer(self._email)[i]
+
+    def __repr__(self) -> str:
+        return f"<CustomerOrders {self._email} orders={len(self)}>"
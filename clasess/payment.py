@@ -1,9 +1,19 @@
 """Модуль обработки платежей (симуляция)."""
+import asyncio
 from dataclasses import dataclass
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Protocol
 from exceptions.store_exceptions import PaymentError
+from utils.metrics import instrument
 
-@dataclass
+
+class PaymentGateway(Protocol):
+    """Асинхронный платёжный шлюз."""
+
+    async def charge(self, payment: "Payment") -> None:
+        """Проводит платёж; при отказе выбрасывает PaymentError."""
+        ...
+
+@dataclass(slots=True)
 class Payment:
     id: str
     order_id: str
@@ -11,6 +21,7 @@ class Payment:
     method: str
     status: str = "pending"
 
+    @instrument("payment.process")
     def process(self) -> bool:
         """Обрабатывает платёж. Возвращает True при успехе.
 
@@ -26,6 +37,34 @@ class Payment:
         self.status = "completed"
         return True
 
+    @instrument("payment.process_async")
+    async def process_async(self, gateway: Optional[PaymentGateway] = None,
+                            timeout: Optional[float] = None) -> bool:
+        """Асинхронный вариант process(): не блокирует цикл событий.
+
+        Args:
+            gateway: шлюз, через который проводится платёж; без него
+                поведение совпадает с process().
+            timeout: предельное время ожидания ответа шлюза (сек).
+
+        Raises:
+            PaymentError: если amount <= 0, шлюз отказал или не ответил вовремя.
+        """
+        if self.amount <= 0:
+            self.status = "failed"
+            raise PaymentError("Сумма платежа должна быть > 0")
+        if gateway is not None:
+            try:
+                await asyncio.wait_for(gateway.charge(self), timeout)
+            except asyncio.TimeoutError:
+                self.status = "failed"
+                raise PaymentError(f"Платёжный шлюз не ответил за {timeout} с")
+            except PaymentError:
+                self.status = "failed"
+                raise
+        self.status = "completed"
+        return True
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             "id": self.id,
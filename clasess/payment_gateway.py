@@ -0,0 +1,34 @@
+"""Локальный имитатор платёжного шлюза для нагрузочных прогонов."""
+import asyncio
+import random
+from typing import Optional
+from exceptions.store_exceptions import PaymentError
+from .payment import Payment
+
+
+class FakePaymentGateway:
+    """Шлюз с настраиваемой задержкой и долей отказов.
+
+    Args:
+        latency: средняя задержка ответа (сек).
+        jitter: разброс задержки (сек), равномерный в [-jitter, +jitter].
+        failure_rate: доля платежей, завершающихся временной ошибкой.
+        seed: зерно генератора для воспроизводимых прогонов.
+    """
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02,
+                 failure_rate: float = 0.0, seed: Optional[int] = None) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._rnd = random.Random(seed)
+        self.calls = 0
+        self.failures = 0
+
+    async def charge(self, payment: Payment) -> None:
+        self.calls += 1
+        delay = max(0.0, self.latency + self._rnd.uniform(-self.jitter, self.jitter))
+        await asyncio.sleep(delay)
+        if self._rnd.random() < self.failure_rate:
+            self.failures += 1
+            raise PaymentError(f"Шлюз отклонил платёж {payment.id}")
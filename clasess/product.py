@@ -1,9 +1,9 @@
 """Модель товара."""
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from typing import Dict, Any, Optional
 from exceptions.store_exceptions import OutOfStockError
 
-@dataclass
+@dataclass(slots=True)
 class Product:
     """Представляет товар в магазине.
 
@@ -24,7 +24,14 @@ class Product:
 
     def to_dict(self) -> Dict[str, Any]:
         """Возвращает словарь, пригодный для JSON/XML сериализации."""
-        return asdict(self)
+        return {"id": self.id, "name": self.name, "description": self.description,
+                "price": self.price, "stock": self.stock, "category": self.category}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Product":
+        """Создаёт товар из словаря формата to_dict()."""
+        return cls(data["id"], data["name"], data["description"],
+                   data["price"], data["stock"], data.get("category"))
 
     def change_stock(self, delta: int) -> None:
         """Изменяет количество товара на складе.
@@ -0,0 +1,118 @@
+"""Полнотекстовый поиск товаров по названию и описанию."""
+import re
+from heapq import nlargest
+from typing import Dict, Iterable, List, Optional, Tuple
+from utils.sorted_index import SortedIndex
+from .product import Product
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Совпадение в названии весит больше, чем в описании.
+NAME_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 1.0
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Разбивает текст на нормализованные слова.
+
+    Регистр снимается через casefold, «ё» приводится к «е», так что
+    «Ёлка», «ЁЛКА» и «елка» дают один и тот же токен. Работает для
+    кириллицы и латиницы одинаково.
+    """
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.casefold().replace("ё", "е"))
+
+
+class ProductSearchIndex:
+    """Инвертированный индекс: слово -> {product_id: вес}.
+
+    Индекс обновляется по одному товару (add/remove), без перестройки.
+    Отдельно хранится отсортированный словарь слов для поиска по префиксу.
+    """
+
+    def __init__(self) -> None:
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+        self._terms = SortedIndex()
+
+    def add(self, product: Product) -> None:
+        """Индексирует товар (повторный вызов заменяет старые данные)."""
+        self.remove(product.id)
+        terms: Dict[str, float] = {}
+        for token in tokenize(product.name):
+            terms[token] = terms.get(token, 0.0) + NAME_WEIGHT
+        for token in tokenize(product.description):
+            terms[token] = terms.get(token, 0.0) + DESCRIPTION_WEIGHT
+        for token, weight in terms.items():
+            docs = self._postings.get(token)
+            if docs is None:
+                docs = self._postings[token] = {}
+                self._terms.add(token, token)
+            docs[product.id] = weight
+        self._doc_terms[product.id] = terms
+
+    def remove(self, product_id: str) -> None:
+        """Убирает товар из индекса (если он там есть)."""
+        terms = self._doc_terms.pop(product_id, None)
+        if not terms:
+            return
+        for token in terms:
+            docs = self._postings[token]
+            docs.pop(product_id, None)
+            if not docs:
+                del self._postings[token]
+                self._terms.discard(token, token)
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._doc_terms.clear()
+        self._terms.clear()
+
+    def _terms_with_prefix(self, prefix: str) -> Iterable[str]:
+        return self._terms.irange(prefix, prefix + "\U0010ffff")
+
+    def _matches(self, token: str, as_prefix: bool) -> Dict[str, float]:
+        if not as_prefix:
+            return self._postings.get(token, {})
+        merged: Dict[str, float] = {}
+        for term in self._terms_with_prefix(token):
+            # Точное совпадение слова ценится выше, чем совпадение по префиксу.
+            factor = 1.0 if term == token else 0.5
+            for pid, weight in self._postings[term].items():
+                merged[pid] = max(merged.get(pid, 0.0), weight * factor)
+        return merged
+
+    def search(self, query: str, limit: int = 20, prefix: bool = True) -> List[Tuple[str, float]]:
+        """Ищет товары, содержащие все слова запроса.
+
+        Последнее слово запроса при prefix=True ищется как префикс
+        (поиск по мере ввода). Результаты ранжируются по сумме весов.
+
+        Returns:
+            Список пар (product_id, score) по убыванию score.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        # Начинаем с самого редкого слова, чтобы пересечение было дешёвым.
+        postings = [self._matches(t, prefix and i == len(tokens) - 1) for i, t in enumerate(tokens)]
+        postings.sort(key=len)
+        scores = dict(postings[0])
+        for docs in postings[1:]:
+            scores = {pid: s + docs[pid] for pid, s in scores.items() if pid in docs}
+            if not scores:
+                return []
+        return nlargest(limit, scores.items(), key=lambda kv: kv[1])
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[str]:
+        """Подсказки для автодополнения: слова с данным префиксом,
+        упорядоченные по числу товаров, в которых они встречаются."""
+        tokens = tokenize(prefix)
+        if not tokens:
+            return []
+        return nlargest(limit, self._terms_with_prefix(tokens[-1]),
+                        key=lambda t: len(self._postings[t]))
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
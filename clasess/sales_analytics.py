@@ -0,0 +1,198 @@
+"""Накопительная аналитика продаж: выручка и количество по разрезам.
+
+Агрегаты обновляются при каждом новом заказе и смене его статуса, поэтому
+отчёты не обходят список заказов: значение по ключу — O(1), топ-k по
+выручке — O(log n + k) благодаря упорядоченным индексам.
+"""
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from utils.sorted_index import SortedIndex
+from .customer_registry import CustomerRegistry
+from .order import Order
+
+# Заказы в этих статусах не учитываются в выручке.
+EXCLUDED_STATUSES = frozenset({"cancelled", "refunded"})
+
+
+@dataclass(slots=True)
+class SalesTotals:
+    """Выручка, проданные единицы и число заказов в одном разрезе."""
+    revenue: float = 0.0
+    units: int = 0
+    orders: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"revenue": self.revenue, "units": self.units, "orders": self.orders}
+
+
+# Вклад заказа в агрегаты: (product_id, category, units, revenue) по позициям.
+# Товары без категории учитываются под пустой строкой.
+_Line = Tuple[str, str, int, float]
+
+
+class _Dimension:
+    """Агрегаты одного разреза плюс индекс ключей по убыванию выручки."""
+
+    def __init__(self) -> None:
+        self.totals: Dict[Any, SalesTotals] = {}
+        self._by_revenue = SortedIndex()
+
+    def add(self, key: Any, revenue: float, units: int, orders: int) -> None:
+        t = self.totals.get(key)
+        if t is None:
+            t = self.totals[key] = SalesTotals()
+        else:
+            self._by_revenue.discard(-t.revenue, key)
+        t.revenue += revenue
+        t.units += units
+        t.orders += orders
+        if t.orders > 0:
+            self._by_revenue.add(-t.revenue, key)
+        else:
+            del self.totals[key]
+
+    def top(self, k: int) -> List[Tuple[Any, SalesTotals]]:
+        result = []
+        for key in self._by_revenue.irange():
+            if len(result) == k:
+                break
+            result.append((key, self.totals[key]))
+        return result
+
+    def clear(self) -> None:
+        self.totals.clear()
+        self._by_revenue.clear()
+
+
+class SalesAnalytics:
+    """Агрегаты продаж по товарам, категориям, покупателям и дням.
+
+    Args:
+        category_of: возвращает категорию товара по id. Категория
+            фиксируется в момент учёта заказа, как цена в OrderItem.
+    """
+
+    def __init__(self, category_of: Optional[Callable[[str], Optional[str]]] = None) -> None:
+        self.category_of = category_of or (lambda product_id: None)
+        self.products = _Dimension()
+        self.categories = _Dimension()
+        self.customers = _Dimension()
+        self.days = _Dimension()
+        self._day_index = SortedIndex()
+        self.total = SalesTotals()
+        # order_id -> (покупатель, день, позиции); нужен, чтобы снять
+        # вклад заказа при отмене даже после смены цены или категории товара.
+        self._counted: Dict[str, Tuple[str, str, List[_Line]]] = {}
+        self._lock = threading.Lock()
+
+    # ---------------------- обновление ----------------------
+    def _apply(self, customer: str, day: str, lines: List[_Line], sign: int) -> None:
+        units = sum(u for _, _, u, _ in lines)
+        revenue = sum(r for _, _, _, r in lines)
+        by_category: Dict[str, Tuple[float, int]] = {}
+        for pid, cat, u, r in lines:
+            self.products.add(pid, sign * r, sign * u, sign)
+            cr, cu = by_category.get(cat, (0.0, 0))
+            by_category[cat] = (cr + r, cu + u)
+        for cat, (r, u) in by_category.items():
+            self.categories.add(cat, sign * r, sign * u, sign)
+        self.customers.add(customer, sign * revenue, sign * units, sign)
+        if day not in self.days.totals:
+            self._day_index.add(day, day)
+        self.days.add(day, sign * revenue, sign * units, sign)
+        if day not in self.days.totals:
+            self._day_index.discard(day, day)
+        self.total.revenue += sign * revenue
+        self.total.units += sign * units
+        self.total.orders += sign
+
+    def record(self, order: Order) -> None:
+        """Учитывает новый заказ (если его статус не исключён)."""
+        if order.status in EXCLUDED_STATUSES:
+            return
+        with self._lock:
+            if order.id in self._counted:
+                return
+            lines = [(i.product_id, self.category_of(i.product_id) or "", i.quantity, i.quantity * i.price)
+                     for i in order.items]
+            entry = (CustomerRegistry.normalize_email(order.customer_id), order.created_at[:10], lines)
+            self._counted[order.id] = entry
+            self._apply(*entry, 1)
+
+    def set_status(self, order: Order, status: str) -> None:
+        """Меняет статус заказа и пересчитывает агрегаты.
+
+        Переход в EXCLUDED_STATUSES снимает вклад заказа, обратный
+        переход возвращает его.
+        """
+        order.status = status
+        if status in EXCLUDED_STATUSES:
+            with self._lock:
+                entry = self._counted.pop(order.id, None)
+                if entry is not None:
+                    self._apply(*entry, -1)
+        else:
+            self.record(order)
+
+    def clear(self) -> None:
+        with self._lock:
+            for dim in (self.products, self.categories, self.customers, self.days):
+                dim.clear()
+            self._day_index.clear()
+            self._counted.clear()
+            self.total = SalesTotals()
+
+    def rebuild(self, orders: Iterable[Order]) -> None:
+        """Пересчитывает агрегаты заново по истории заказов."""
+        self.clear()
+        for order in orders:
+            self.record(order)
+
+    @classmethod
+    def from_store(cls, records: Iterable[Tuple[str, Any]]) -> "SalesAnalytics":
+        """Строит аналитику по потоку пар (раздел, объект) снимка магазина.
+
+        Подходит вывод iter_store_json / iter_store_xml /
+        SqliteStorage.iter_store: товары в снимке идут раньше заказов,
+        поэтому для категорий достаточно словаря id -> категория.
+        """
+        categories: Dict[str, Optional[str]] = {}
+        analytics = cls(categories.get)
+        for section, obj in records:
+            if section == "inventory":
+                categories[obj.id] = obj.category
+            elif section == "orders":
+                analytics.record(obj)
+        return analytics
+
+    # ---------------------- запросы ----------------------
+    def product(self, product_id: str) -> SalesTotals:
+        return self.products.totals.get(product_id) or SalesTotals()
+
+    def category(self, category: Optional[str]) -> SalesTotals:
+        return self.categories.totals.get(category or "") or SalesTotals()
+
+    def customer(self, email: str) -> SalesTotals:
+        return self.customers.totals.get(CustomerRegistry.normalize_email(email)) or SalesTotals()
+
+    def day(self, day: str) -> SalesTotals:
+        """Итоги за день в формате YYYY-MM-DD."""
+        return self.days.totals.get(day) or SalesTotals()
+
+    def revenue_by_category(self) -> Dict[str, float]:
+        return {cat: t.revenue for cat, t in self.categories.totals.items()}
+
+    def top_products(self, k: int = 10) -> List[Tuple[str, SalesTotals]]:
+        return self.products.top(k)
+
+    def top_categories(self, k: int = 10) -> List[Tuple[str, SalesTotals]]:
+        return self.categories.top(k)
+
+    def top_customers(self, k: int = 10) -> List[Tuple[str, SalesTotals]]:
+        return self.customers.top(k)
+
+    def daily(self, start: Optional[str] = None, end: Optional[str] = None) -> Iterator[Tuple[str, SalesTotals]]:
+        """Итоги по дням в диапазоне [start, end] по возрастанию даты."""
+        for day in self._day_index.irange(start, end):
+            yield day, self.days.totals[day]
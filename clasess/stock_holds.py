@@ -0,0 +1,278 @@
+"""Удержание товара корзинами на ограниченное время."""
+import heapq
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from exceptions.store_exceptions import StoreError
+from utils import metrics
+from utils.helpers import generate_id
+from utils.metrics import instrument
+from .cart import Cart
+from .inventory import Inventory
+
+DEFAULT_TTL = 15 * 60.0
+
+
+@dataclass(slots=True)
+class Hold:
+    """Удержание: товары корзины owner, отложенные до expires_at (по clock)."""
+    id: str
+    owner: str
+    items: Dict[str, int]
+    expires_at: float
+
+
+class StockHolds:
+    """Удержания товара с истечением срока.
+
+    Удержание не меняет stock, а уменьшает свободный остаток склада
+    (Inventory.hold_many), поэтому товар из корзины не продадут другому
+    покупателю, пока удержание живо. Сроки всех удержаний лежат в одной
+    куче (min-heap): поставить, продлить или снять удержание стоит
+    O(log n), а sweep() снимает только истёкшие, не просматривая
+    остальные. Продление не ищет старую запись в куче — оно добавляет
+    новую, а устаревшие отбрасываются при извлечении.
+
+    Истёкшие удержания снимает sweep() — вручную или фоновым потоком
+    start(), который спит до ближайшего срока.
+
+    Args:
+        inventory: склад.
+        ttl: срок удержания по умолчанию, секунды.
+        clock: источник времени (монотонные секунды).
+    """
+
+    def __init__(self, inventory: Inventory, ttl: float = DEFAULT_TTL,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.inventory = inventory
+        self.ttl = ttl
+        self.clock = clock
+        self._holds: Dict[str, Hold] = {}
+        # Удержания корзин, которые сейчас оформляются (reserve_cart).
+        self._reserved: Dict[str, Hold] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.expired = 0  # сколько удержаний снято по сроку
+
+    # ---------------------- удержания ----------------------
+    def _schedule(self, hold: Hold) -> None:
+        heapq.heappush(self._heap, (hold.expires_at, hold.id))
+        if self._heap[0][1] == hold.id:
+            self._cond.notify()  # срок раньше, чем тот, до которого спит поток
+        if len(self._heap) > 2 * len(self._holds) + 1024:
+            self._heap = [(h.expires_at, h.id) for h in self._holds.values()]
+            heapq.heapify(self._heap)
+
+    def _live(self, hold_id: str) -> Hold:
+        hold = self._holds.get(hold_id)
+        if hold is None or hold.expires_at <= self.clock():
+            raise StoreError(f"Удержание {hold_id} не найдено или истекло")
+        return hold
+
+    @instrument("holds.hold")
+    def hold(self, owner: str, items: Dict[str, int], ttl: Optional[float] = None) -> Hold:
+        """Удерживает товары на ttl секунд.
+
+        Raises:
+            InvalidQuantityError, StoreError, OutOfStockError: как у
+                Inventory.hold_many; тогда ничего не удерживается.
+        """
+        items = dict(items)
+        with self._cond:
+            self.inventory.hold_many(items)
+            hold = Hold(generate_id("h"), owner, items, self.clock() + (self.ttl if ttl is None else ttl))
+            self._holds[hold.id] = hold
+            self._schedule(hold)
+            return hold
+
+    @instrument("holds.update")
+    def update(self, hold_id: str, items: Dict[str, int], ttl: Optional[float] = None) -> Hold:
+        """Приводит удержание к новому составу items и продлевает срок.
+
+        Дополнительно удерживается только прирост количеств, излишек
+        возвращается в свободный остаток.
+
+        Raises:
+            StoreError: если удержания нет или оно истекло.
+            OutOfStockError: если на прирост не хватает свободного остатка
+                (удержание тогда остаётся прежним).
+        """
+        with self._cond:
+            hold = self._live(hold_id)
+            more = {pid: qty - hold.items.get(pid, 0) for pid, qty in items.items()
+                    if qty > hold.items.get(pid, 0)}
+            less = {pid: qty - items.get(pid, 0) for pid, qty in hold.items.items()
+                    if qty > items.get(pid, 0)}
+            if more:
+                self.inventory.hold_many(more)
+            if less:
+                self.inventory.unhold_many(less)
+            hold.items = {pid: qty for pid, qty in items.items() if qty > 0}
+            hold.expires_at = self.clock() + (self.ttl if ttl is None else ttl)
+            self._schedule(hold)
+            return hold
+
+    def extend(self, hold_id: str, ttl: Optional[float] = None) -> Hold:
+        """Продлевает удержание на ttl секунд от текущего момента.
+
+        Raises:
+            StoreError: если удержания нет или оно истекло.
+        """
+        with self._cond:
+            hold = self._live(hold_id)
+            return self.update(hold_id, hold.items, ttl)
+
+    def release(self, hold_id: str) -> bool:
+        """Снимает удержание; False, если его уже нет."""
+        with self._cond:
+            hold = self._holds.pop(hold_id, None)
+            if hold is None:
+                return False
+            self.inventory.unhold_many(hold.items)
+            return True
+
+    def get(self, hold_id: str) -> Optional[Hold]:
+        with self._cond:
+            hold = self._holds.get(hold_id)
+            return hold if hold is not None and hold.expires_at > self.clock() else None
+
+    def __len__(self) -> int:
+        return len(self._holds)
+
+    # ---------------------- корзины ----------------------
+    def hold_cart(self, cart: Cart, ttl: Optional[float] = None) -> Optional[Hold]:
+        """Удерживает содержимое корзины (или обновляет её удержание).
+
+        Вызывается после каждого изменения корзины; пустая корзина
+        снимает удержание. Если прежнее удержание истекло, создаётся новое.
+        """
+        items = {pid: ci.quantity for pid, ci in cart.items.items()}
+        with self._cond:
+            if cart.hold_id is not None and self.get(cart.hold_id) is None:
+                self.release(cart.hold_id)
+                cart.hold_id = None
+            if not items:
+                if cart.hold_id is not None:
+                    self.release(cart.hold_id)
+                    cart.hold_id = None
+                return None
+            if cart.hold_id is None:
+                hold = self.hold(cart.owner_id, items, ttl)
+                cart.hold_id = hold.id
+                return hold
+            return self.update(cart.hold_id, items, ttl)
+
+    @instrument("holds.reserve_cart")
+    def reserve_cart(self, cart: Cart) -> Dict[str, float]:
+        """Резервирует позиции корзины, засчитывая её живое удержание.
+
+        Удержание превращается в резерв одной операцией склада, но не
+        снимается окончательно: до confirm_cart() (оплата прошла) или
+        restore_cart() (отказ) оно не истекает и не меняется. Без
+        удержания (или если оно уже снято по сроку) работает как обычный
+        Inventory.reserve_many. При ошибке удержание остаётся в силе.
+
+        Returns:
+            Цены товаров на момент резервирования.
+        """
+        lines = {pid: ci.quantity for pid, ci in cart.items.items()}
+        with self._cond:
+            # Истёкшее, но ещё не снятое удержание тоже засчитывается:
+            # эти единицы пока никому не продавались.
+            hold = self._holds.get(cart.hold_id) if cart.hold_id is not None else None
+            if hold is None:
+                return self.inventory.reserve_many(lines)
+            prices = self.inventory.reserve_many(lines, held=hold.items)
+            del self._holds[hold.id]
+            self._reserved[hold.id] = hold
+            return prices
+
+    def confirm_cart(self, cart: Cart) -> None:
+        """Завершает оформление после reserve_cart: удержание больше не нужно."""
+        with self._cond:
+            if cart.hold_id is not None and self._reserved.pop(cart.hold_id, None) is not None:
+                cart.hold_id = None
+
+    def restore_cart(self, cart: Cart) -> None:
+        """Откатывает reserve_cart: резерв возвращается на склад, а удержание
+        корзины — в прежнем составе и с прежним сроком."""
+        lines = {pid: ci.quantity for pid, ci in cart.items.items()}
+        with self._cond:
+            hold = self._reserved.pop(cart.hold_id, None) if cart.hold_id is not None else None
+            if hold is None:
+                self.inventory.release_many(lines)
+                return
+            self.inventory.release_many(lines, held=hold.items)
+            self._holds[hold.id] = hold
+            self._schedule(hold)
+
+    # ---------------------- истечение ----------------------
+    def sweep(self) -> int:
+        """Снимает все истёкшие удержания и возвращает их число; O(k log n)."""
+        released = 0
+        with self._cond:
+            now = self.clock()
+            while self._heap and self._heap[0][0] <= now:
+                expires_at, hold_id = heapq.heappop(self._heap)
+                hold = self._holds.get(hold_id)
+                if hold is None or hold.expires_at != expires_at:
+                    continue  # снято раньше или продлено
+                del self._holds[hold_id]
+                self.inventory.unhold_many(hold.items)
+                released += 1
+            self.expired += released
+        return released
+
+    def _run(self) -> None:
+        with self._cond:
+            while not self._stopping:
+                timeout = self._heap[0][0] - self.clock() if self._heap else None
+                if timeout is None or timeout > 0:
+                    self._cond.wait(timeout)
+                else:
+                    self.sweep()
+
+    def start(self) -> None:
+        """Запускает фоновый поток, снимающий удержания по сроку."""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="stock-holds", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        with self._cond:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+            self._cond.notify()
+        if thread is not None:
+            thread.join()
+
+    # ---------------------- метрики ----------------------
+    def stock_levels(self) -> Dict[str, Dict[str, int]]:
+        """Остаток, удержанное и свободное по товарам с удержаниями.
+
+        Обходит только удерживаемые товары, а не весь склад.
+        """
+        levels: Dict[str, Dict[str, int]] = {}
+        for pid, held in self.inventory.held_products().items():
+            p = self.inventory.find(pid)
+            if p is not None:
+                levels[pid] = {"stock": p.stock, "held": held, "available": max(p.stock - held, 0)}
+        return levels
+
+    def register_metrics(self) -> None:
+        """Публикует удержания как gauge-метрики utils.metrics."""
+        metrics.register_gauge("store_holds_active", "Active cart holds.",
+                               lambda: {"": len(self._holds)})
+        metrics.register_gauge(
+            "store_stock_held", "Units held by carts per product.",
+            lambda: {pid: level["held"] for pid, level in self.stock_levels().items()}, "product")
+        metrics.register_gauge(
+            "store_stock_available", "Stock not held by carts, for products with holds.",
+            lambda: {pid: level["available"] for pid, level in self.stock_levels().items()},
+            "product")
@@ -1,18 +1,34 @@
 from __future__ import annotations
-from typing import List
+from typing import List, Optional, Set, TYPE_CHECKING
 from clasess.product import Product
 
+if TYPE_CHECKING:
+    from clasess.inventory import Inventory
+
 class Supplier:
     """Класс, описывающий поставщика."""
     def __init__(self, name: str, contact: str):
         self.name: str = name
         self.contact: str = contact
         self.products_supplied: List[Product] = []
+        # id товаров из products_supplied — проверка повтора за O(1).
+        self._supplied_ids: Set[str] = set()
+
+    def supply_product(self, product: Product, quantity: int,
+                       inventory: Optional[Inventory] = None) -> None:
+        """Добавляет товар к списку поставляемых и увеличивает остаток.
 
-    def supply_product(self, product: Product, quantity: int) -> None:
-        """Добавляет товар к списку поставляемых и увеличивает остаток."""
-        product.stock += quantity
-        if product not in self.products_supplied:
+        Если передан inventory, остаток увеличивается через него — под
+        блокировкой товара и с обновлением индексов склада. Без inventory
+        остаток меняется напрямую, что допустимо только для товаров, ещё не
+        добавленных на склад.
+        """
+        if inventory is not None:
+            inventory.restock(product.id, quantity)
+        else:
+            product.change_stock(quantity)
+        if product.id not in self._supplied_ids:
+            self._supplied_ids.add(product.id)
             self.products_supplied.append(product)
 
     def __repr__(self) -> str:
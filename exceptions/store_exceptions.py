@@ -23,3 +23,13 @@ class SerializationError(StoreError):
 class InvalidEmailError(Exception):
     """Ошибка при вводе некорректного e-mail"""
     pass
+
+class DuplicateCustomerError(StoreError):
+    """Ошибка регистрации покупателя с уже занятым e-mail."""
+    pass
+
+class FeedRowError(SerializationError):
+    """Ошибка в отдельной строке фида товаров (line — номер строки в файле)."""
+    def __init__(self, line: int, message: str):
+        super().__init__(f"строка {line}: {message}")
+        self.line = line
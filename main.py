@@ -1,20 +1,34 @@
 """Интерактивная точка входа для интернет-магазина электроники."""
-from typing import List, Optional
-import json
-import xml.etree.ElementTree as ET
+import os
+from contextlib import contextmanager
 from datetime import datetime
-from clasess.inventory import Inventory
+from typing import Any, Callable, Iterable, Iterator, List, Optional, TextIO, Tuple
+from clasess.inventory import Inventory, ProductSource
 from clasess.product import Product
-from clasess.order_item import OrderItem
 from clasess.order import Order
 from clasess.customer import Customer
 from clasess.supplier import Supplier
-from utils.helpers import generate_id
-from exceptions.store_exceptions import StoreError, SerializationError
+from clasess.customer_registry import CustomerRegistry
+from clasess.cart import Cart
+from clasess.stock_holds import StockHolds
+from clasess.checkout import checkout
+from clasess.sales_analytics import SalesAnalytics
+from clasess.order_store import OrderStore
+from utils.serializer import STORE_SECTIONS, iter_store_xml, order_from_dict, save_store_xml
+from utils.journal import Journal
+from utils.delta_store import ChangeSet, DeltaStore
+from utils.binary_snapshot import BinarySnapshot, save_binary_snapshot
+from utils.sqlite_storage import SqliteStorage
+from utils.feed_import import import_feed
+from utils.batch_commands import (BatchEngine, BatchReport, CommandResult, DEFAULT_BATCH_SIZE,
+                                  write_results)
+from utils import metrics
+from utils.metrics import instrument
+from exceptions.store_exceptions import StoreError
 import re
 from clasess.customer import Customer
 from clasess.customer import Customer
-from exceptions.store_exceptions import InvalidEmailError
+from exceptions.store_exceptions import InvalidEmailError, DuplicateCustomerError
 
 def register_customer():
     """Регистрация нового покупателя с проверкой e-mail"""
@@ -31,176 +45,708 @@ def register_customer():
 
 # ---------------------- Глобальные данные ----------------------
 inventory: Inventory = Inventory()
-customers: List[Customer] = []
+customers: CustomerRegistry = CustomerRegistry()
 suppliers: List[Supplier] = []
-orders: List[Order] = []
+# Заказы лежат в файле заказов хранилища (orders_file) и читаются
+# постранично; до загрузки — в памяти.
+orders: OrderStore = OrderStore()
 
 JSON_FILE = "data.json"
 XML_FILE = "data.xml"
+DB_FILE = "data.db"
+BIN_FILE = "data.snap"
+ORDERS_PAGE_SIZE = 10
+METRICS_FILE = "metrics.prom"
+CATALOG_PAGE_SIZE = 20
+
+# Если выбрано хранилище SQLite, снимки сохраняются в него, а не в JSON/XML.
+storage: Optional[SqliteStorage] = None
+
+# Журнал изменений; seq последней записи, учтённой в загруженном снимке.
+journal: Optional[Journal] = None
+snapshot_seq: int = 0
+
+# Файл хранилища, из которого загружен магазин (JSON_FILE, XML_FILE, DB_FILE
+# или BIN_FILE): снимки при checkpoint журнала пишутся в тот же формат,
+# иначе журнал обрезался бы без сохранения изменений в загруженное хранилище.
+# В режиме бинарного снимка товары при запуске не разбираются: они читаются
+# из отображённого в память файла по мере обращения к ним.
+store_file = JSON_FILE
+
+# В режиме дельта-сохранений снимок JSON дописывается файлами с изменениями
+# (см. utils.delta_store), а XML пишется целиком только при выходе.
+DELTA_SAVES = True
+delta_store = DeltaStore(JSON_FILE)
+# Изменения покупателей, поставщиков и заказов с прошлого сохранения;
+# изменения товаров отслеживает сам Inventory.
+pending_changes = ChangeSet()
+
+# Удержания товара корзинами консоли; создаются после загрузки склада.
+holds: Optional[StockHolds] = None
 
 # ---------------------- Вспомогательные функции ----------------------
 def find_product_by_id(pid: str) -> Optional[Product]:
     return inventory.find(pid)
 
 
+def find_order_by_id(order_id: str) -> Optional[Order]:
+    return orders.get(order_id)
+
+
+def _category_of(pid: str) -> Optional[str]:
+    p = inventory.find(pid)
+    return p.category if p else None
+
+
+# Агрегаты продаж; пересчитываются после загрузки и обновляются по заказам.
+analytics: SalesAnalytics = SalesAnalytics(_category_of)
+
+
 def find_customer_by_email(email: str) -> Optional[Customer]:
-    return next((c for c in customers if c.email == email), None)
+    return customers.find(email)
 
 
 # ---------------------- Загрузка / сохранение ----------------------
-def load_from_json() -> None:
-    global inventory, customers, suppliers, orders
+ALL_SECTIONS = STORE_SECTIONS
+
+
+def orders_file(store_file: str) -> str:
+    """Файл заказов хранилища store_file (JSON_FILE, XML_FILE, DB_FILE, BIN_FILE).
+
+    У каждого формата свой файл: заказы, записанные при работе с одним
+    хранилищем, не подмешиваются к снимку другого.
+    """
+    return store_file + ".orders"
+
+
+def journal_file(store_file: str) -> str:
+    """Журнал изменений хранилища store_file.
+
+    Журнал повторяется поверх снимка своего хранилища, поэтому, как и
+    файл заказов, он у каждого формата свой.
+    """
+    return store_file + ".journal"
+
+
+def _load_store(records: Iterator[Tuple[str, Any]], orders_path: str,
+                snapshot: Optional[ProductSource] = None) -> None:
+    """Заполняет глобальные данные из потока пар (раздел, объект).
+
+    Если передан snapshot (бинарный снимок или таблица товаров SQLite),
+    товары не загружаются, а читаются из него лениво.
+    Заказы из снимка импортируются в orders_path, только если он пуст.
+    """
+    global inventory, customers, suppliers, orders, snapshot_seq, pending_changes
+    inventory = Inventory()
+    if snapshot is not None:
+        inventory.attach_snapshot(snapshot)
+    customers = CustomerRegistry()
+    suppliers = []
+    orders.close()
+    orders = OrderStore(orders_path)
+    import_orders = not orders
+    snapshot_seq = 0
     try:
-        with open(JSON_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        for section, obj in records:
+            if section == "journal_seq":
+                snapshot_seq = obj
+            elif section == "inventory":
+                inventory.load_products([obj])
+            elif section == "customers":
+                customers.add(obj)
+            elif section == "suppliers":
+                suppliers.append(obj)
+            elif import_orders:
+                orders.save(obj)
     except FileNotFoundError:
-        inventory = Inventory()
-        customers = []
-        suppliers = []
-        orders = []
+        pass
+    for customer in customers:
+        orders.link(customer)
+    # Загруженное уже лежит в снимке — сохранять его заново не нужно.
+    inventory.take_changes()
+    pending_changes = ChangeSet()
+
+
+def _snapshot_sections(sections: Iterable[str], orders_path: str) -> List[str]:
+    """Разделы, которые нужно читать из снимка.
+
+    Если заказы уже лежат в orders_path, раздел orders снимка не разбирается.
+    """
+    has_orders = os.path.exists(orders_path) and os.path.getsize(orders_path) > 0
+    return [name for name in sections if not (has_orders and name == "orders")]
+
+
+@instrument("main.load_from_json")
+def load_from_json(sections: Iterable[str] = ALL_SECTIONS) -> None:
+    """Потоково загружает данные магазина из JSON_FILE и его дельт.
+
+    Записи разбираются по одной и сразу превращаются в объекты, поэтому
+    весь документ никогда не держится в памяти целиком.
+
+    Args:
+        sections: какие разделы загружать ("inventory", "customers",
+            "suppliers", "orders"). Незапрошенные разделы пропускаются
+            при чтении и остаются пустыми.
+    """
+    global store_file
+    store_file = JSON_FILE
+    _load_json(sections, orders_file(JSON_FILE))
+
+
+def _load_json(sections: Iterable[str], orders_path: str) -> None:
+    """Загружает JSON_FILE с дельтами; заказы хранятся в orders_path."""
+    _load_store(delta_store.iter_store(_snapshot_sections(sections, orders_path)), orders_path)
+
+
+@instrument("main.load_from_xml")
+def load_from_xml(sections: Iterable[str] = ALL_SECTIONS) -> None:
+    """Загружает данные магазина из XML_FILE через iterparse.
+
+    Каждая запись удаляется из дерева сразу после превращения в объект,
+    так что память не растёт с размером файла. Аргумент sections — как
+    у load_from_json.
+    """
+    global store_file
+    store_file = XML_FILE
+    orders_path = orders_file(XML_FILE)
+    _load_store(iter_store_xml(XML_FILE, _snapshot_sections(sections, orders_path)), orders_path)
+
+
+@instrument("main.load_from_sqlite")
+def load_from_sqlite() -> None:
+    """Открывает базу DB_FILE как основное хранилище.
+
+    Товары в память не загружаются: склад читает их из базы по первому
+    обращению, а запросы по цене, остатку и категории уходят в индексы
+    базы. Покупатели и поставщики загружаются целиком.
+
+    Если база ещё не инициализирована (новая или импорт прервался), а
+    JSON_FILE существует, он импортируется в неё одной транзакцией.
+    """
+    global storage, store_file
+    store_file = DB_FILE
+    storage = SqliteStorage(DB_FILE)
+    if not storage.initialized and os.path.exists(JSON_FILE):
+        delta_store.compact()
+        storage.import_json(JSON_FILE)
+    orders_path = orders_file(DB_FILE)
+    _load_store(storage.iter_store(_snapshot_sections(("customers", "suppliers", "orders"), orders_path)),
+                orders_path, storage.products())
+
+
+@instrument("main.load_from_binary")
+def load_from_binary() -> None:
+    """Открывает бинарный снимок BIN_FILE за O(1) от числа товаров.
+
+    Товары декодируются из отображённого файла при первом обращении.
+    Если снимка ещё нет, данные загружаются из JSON_FILE, а снимок
+    будет записан при первом сохранении.
+    """
+    global store_file
+    store_file = BIN_FILE
+    orders_path = orders_file(BIN_FILE)
+    if not os.path.exists(BIN_FILE):
+        _load_json(ALL_SECTIONS, orders_path)
         return
+    snapshot = BinarySnapshot(BIN_FILE)
+    _load_store(snapshot.iter_others(_snapshot_sections(("customers", "suppliers", "orders"),
+                                                        orders_path)),
+                orders_path, snapshot)
+
+
+@contextmanager
+def _store_view() -> Iterator[Tuple[Iterable[Product], List[Customer], List[Supplier], Iterable[Order]]]:
+    """Согласованные срезы товаров, покупателей, поставщиков и заказов.
+
+    Сохранение идёт по срезам, поэтому покупки во время долгой записи
+    снимка не ждут её и не попадают в снимок наполовину.
+    """
+    with inventory.snapshot() as products, orders.snapshot() as order_view:
+        yield products, customers.snapshot(), list(suppliers), order_view
+
+
+def _journal_seq() -> int:
+    """seq, до которого изменения учтены в сохраняемом снимке.
+
+    Проверка именно на None: len(journal) после обрезки равен нулю.
+    """
+    return journal.seq if journal is not None else snapshot_seq
 
-    inventory = Inventory()
-    inventory.from_dict(data.get("inventory", {"products": []}))
-
-    customers = [
-        Customer(c["email"], c["name"], c.get("balance", 0.0))
-        for c in data.get("customers", [])
-    ]
-    suppliers = [
-        Supplier(s["name"], s["contact"])
-        for s in data.get("suppliers", [])
-    ]
-
-    orders = []
-    for o in data.get("orders", []):
-        items = [OrderItem(i["product_id"], i["quantity"], i["price"]) for i in o["items"]]
-        orders.append(
-            Order(
-                id=o["id"],
-                customer_id=o["customer_id"],
-                items=items,
-                status=o.get("status", "created"),
-                created_at=o.get("created_at", datetime.utcnow().isoformat())
-            )
-        )
 
+@instrument("main.save_to_binary")
+def save_to_binary() -> None:
+    """Сохраняет магазин в новое поколение снимка BIN_FILE.
 
+    Нетронутые товары копируются из текущего снимка без загрузки в склад;
+    открытый снимок остаётся отображённым, пока склад читает из него.
+    """
+    _discard_changes()
+    with _store_view() as (products, custs, sups, ords):
+        save_binary_snapshot(BIN_FILE, products, custs, sups, ords,
+                             _journal_seq())
+
+
+@instrument("main.save_to_sqlite")
+def save_to_sqlite() -> None:
+    """Записывает в базу изменения с прошлого сохранения одной транзакцией.
+
+    Изменённые товары, покупатели и заказы вставляются или обновляются,
+    удалённые товары удаляются. Базу целиком переписывают, только если
+    изменения не отслеживались поштучно (импорт фида, пакет команд).
+    """
+    changes = _take_changes()
+    seq = _journal_seq()
+    try:
+        if changes.full:
+            with _store_view() as (products, custs, sups, ords):
+                storage.save_store(products, custs, sups, ords, seq)
+        else:
+            storage.save_changes(changes.products, changes.customers.values(),
+                                 changes.orders.values(),
+                                 list(suppliers) if changes.suppliers else None, seq)
+    except Exception:
+        _keep_changes(changes)
+        raise
+
+
+def _take_changes() -> ChangeSet:
+    """Забирает изменения магазина с прошлого сохранения, включая товары."""
+    global pending_changes
+    products, full = inventory.take_changes()
+    changes, pending_changes = pending_changes, ChangeSet()
+    changes.products.update(products)
+    changes.full = changes.full or full
+    return changes
+
+
+def _keep_changes(changes: ChangeSet) -> None:
+    """Возвращает несохранённые изменения: они попадут в следующее сохранение."""
+    global pending_changes
+    changes.update(pending_changes)
+    pending_changes = changes
+
+
+def _discard_changes() -> None:
+    global pending_changes
+    inventory.take_changes()
+    pending_changes = ChangeSet()
+
+
+@instrument("main.save_to_json")
 def save_to_json() -> None:
-    data = {
-        "inventory": inventory.to_dict(),
-        "customers": [
-            {"email": c.email, "name": c.name, "balance": c.balance} for c in customers
-        ],
-        "suppliers": [
-            {"name": s.name, "contact": s.contact} for s in suppliers
-        ],
-        "orders": [
-            {
-                "id": o.id,
-                "customer_id": o.customer_id,
-                "items": [
-                    {"product_id": it.product_id, "quantity": it.quantity, "price": it.price}
-                    for it in o.items
-                ],
-                "status": o.status,
-                "created_at": o.created_at
-            } for o in orders
-        ]
-    }
-    with open(JSON_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    """Сохраняет магазин в JSON_FILE целиком (через временный файл и атомарную замену).
+
+    Накопленные дельты при этом становятся не нужны и удаляются.
+    """
+    _discard_changes()
+    with _store_view() as (products, custs, sups, ords):
+        delta_store.save_full(products, custs, sups, ords, _journal_seq())
+
 
+@instrument("main.save_delta")
+def save_delta() -> None:
+    """Сохраняет в дельта-файл только изменения с прошлого сохранения.
+
+    Время записи пропорционально числу изменённых записей. Если базового
+    снимка ещё нет или склад перестраивался целиком, выполняется полное
+    сохранение. Когда дельт накапливается много, они в фоне сливаются
+    с базовым снимком.
+    """
+    changes = _take_changes()
+    if changes.full or not os.path.exists(JSON_FILE):
+        save_to_json()
+        return
+    try:
+        delta_store.write(changes, _journal_seq())
+    except Exception:
+        _keep_changes(changes)
+        raise
+    delta_store.maybe_compact()
 
+
+@instrument("main.save_to_xml")
 def save_to_xml() -> None:
-    root = ET.Element("StoreData")
-
-    inv_el = ET.SubElement(root, "Inventory")
-    prods_el = ET.SubElement(inv_el, "Products")
-    for p in inventory.products.values():
-        p_el = ET.SubElement(prods_el, "Product", {"id": p.id})
-        ET.SubElement(p_el, "Name").text = p.name
-        ET.SubElement(p_el, "Description").text = p.description
-        ET.SubElement(p_el, "Price").text = str(p.price)
-        ET.SubElement(p_el, "Stock").text = str(p.stock)
-        ET.SubElement(p_el, "Category").text = p.category or ""
-
-    custs_el = ET.SubElement(root, "Customers")
-    for c in customers:
-        c_el = ET.SubElement(custs_el, "Customer")
-        ET.SubElement(c_el, "Email").text = c.email
-        ET.SubElement(c_el, "Name").text = c.name
-        ET.SubElement(c_el, "Balance").text = str(c.balance)
-
-    sups_el = ET.SubElement(root, "Suppliers")
-    for s in suppliers:
-        s_el = ET.SubElement(sups_el, "Supplier")
-        ET.SubElement(s_el, "Name").text = s.name
-        ET.SubElement(s_el, "Contact").text = s.contact
-
-    orders_el = ET.SubElement(root, "Orders")
-    for o in orders:
-        o_el = ET.SubElement(orders_el, "Order")
-        ET.SubElement(o_el, "Id").text = o.id
-        ET.SubElement(o_el, "CustomerEmail").text = o.customer_id
-        items_el = ET.SubElement(o_el, "Items")
-        for it in o.items:
-            it_el = ET.SubElement(items_el, "Item")
-            ET.SubElement(it_el, "ProductId").text = it.product_id
-            ET.SubElement(it_el, "Quantity").text = str(it.quantity)
-            ET.SubElement(it_el, "Price").text = str(it.price)
-        ET.SubElement(o_el, "CreatedAt").text = o.created_at
-
-    tree = ET.ElementTree(root)
-    ET.indent(tree, space="  ", level=0)
-    tree.write(XML_FILE, encoding="utf-8", xml_declaration=True)
+    """Сохраняет магазин в XML_FILE, записывая элементы в файл по одному.
+
+    XML пишется только целиком, поэтому накопленные изменения после
+    него не нужны.
+    """
+    _discard_changes()
+    with _store_view() as (products, custs, sups, ords):
+        save_store_xml(XML_FILE, products, custs, sups, ords, _journal_seq())
+
+# ---------------------- Журнал изменений ----------------------
+def _log(op: str, **fields) -> None:
+    """Записывает изменение в журнал, если он открыт."""
+    if journal is not None:
+        journal.append(op, **fields)
+
+
+def _sync_log() -> None:
+    """Сбрасывает журнал на диск (fsync), если он открыт.
+
+    Вызывается перед записью в OrderStore: заказ попадает в файл заказов
+    сразу, поэтому связанные с ним изменения остатков и баланса должны
+    быть на диске раньше него.
+    """
+    if journal is not None:
+        journal.sync()
+
+
+def _apply_journal_record(rec: dict) -> None:
+    """Повторяет одну запись журнала над загруженным состоянием."""
+    op = rec["op"]
+    if op in Inventory.INVENTORY_OPS:
+        inventory.apply(rec)
+    elif op == "register":
+        customer = Customer(rec["email"], rec["name"], rec["balance"])
+        customers.add(customer)
+        orders.link(customer)
+        pending_changes.customer(customer)
+    elif op == "balance":
+        customer = customers.find(rec["email"])
+        if customer:
+            customer.balance = rec["balance"]
+            pending_changes.customer(customer)
+    elif op == "order":
+        order = order_from_dict(rec["order"])
+        if order.id not in orders:
+            orders.save(order)
+        pending_changes.order(orders.get(order.id))
+    elif op == "order_status":
+        if rec["order_id"] in orders:
+            pending_changes.order(orders.set_status(rec["order_id"], rec["status"]))
+    elif op == "add_supplier":
+        supplier = Supplier(rec["name"], rec["contact"])
+        suppliers.append(supplier)
+        pending_changes.supplier(supplier)
+    else:
+        raise StoreError(f"Неизвестная операция журнала: {op}")
+
+
+def _snapshot() -> None:
+    """Сохраняет снимок в формат загруженного хранилища (store_file).
+
+    После этого журнал обрезается, поэтому снимок должен попасть именно
+    в то хранилище, из которого магазин будет загружен в следующий раз.
+    """
+    orders.sync()
+    orders.maybe_compact()
+    if store_file == DB_FILE:
+        save_to_sqlite()
+    elif store_file == BIN_FILE:
+        save_to_binary()
+    elif store_file == XML_FILE:
+        save_to_xml()
+    elif DELTA_SAVES:
+        save_delta()
+    else:
+        save_to_json()
+        save_to_xml()
+
+
+def open_journal() -> int:
+    """Повторяет изменения из журнала поверх снимка и начинает запись.
+
+    Returns:
+        Количество применённых записей.
+    """
+    global journal
+    journal = Journal(journal_file(store_file), on_snapshot=_snapshot)
+    replayed = 0
+    for rec in journal.replay(snapshot_seq):
+        _apply_journal_record(rec)
+        replayed += 1
+    journal.open()
+    inventory.journal = journal
+    analytics.rebuild(orders)
+    return replayed
+
+
+def close_journal(save: bool) -> None:
+    """Закрывает журнал; при save=True сначала делает полный снимок."""
+    global journal
+    if journal is None:
+        return
+    if save:
+        journal.checkpoint()
+    journal.close()
+    inventory.journal = None
+    journal = None
+
 
 # ---------------------- Меню ----------------------
+_CATALOG_FORMATS = {
+    "customer": "{p.id}: {p.name} ({p.category}) — {p.price}₽, в наличии {p.stock}",
+    "manager": "{p.id}: {p.name} ({p.category}) — {p.price}₽, {p.stock} шт.",
+}
+
+
+def _catalog_page(view: str, page: int) -> Tuple[str, int]:
+    """Возвращает текст страницы каталога и число страниц.
+
+    Страница кэшируется по версии склада: пока товары не меняются,
+    повторный показ не перебирает каталог заново. Строится она по срезу
+    склада, так что покупки во время построения её не искажают.
+    """
+    def build() -> Tuple[str, int]:
+        with inventory.snapshot() as products:
+            pages = max(1, -(-len(products) // CATALOG_PAGE_SIZE))
+            start = page * CATALOG_PAGE_SIZE
+            fmt = _CATALOG_FORMATS[view]
+            lines = [fmt.format(p=p) for p in products.page(start, start + CATALOG_PAGE_SIZE)]
+        return "\n".join(lines) or "Каталог пуст.", pages
+    return inventory.cached(("catalog", view, page, CATALOG_PAGE_SIZE), build)
+
+
+def _show_catalog(view: str) -> None:
+    page = 0
+    while True:
+        text, pages = _catalog_page(view, page)
+        print(text)
+        if pages == 1:
+            return
+        action = input(f"Стр. {page + 1}/{pages}. Enter — дальше, p — назад, q — выход: ").strip().lower()
+        if action == "q":
+            return
+        if action == "p":
+            page = max(0, page - 1)
+        elif page + 1 < pages:
+            page += 1
+        else:
+            return
+
+
+def _show_orders(customer: Optional[str], status: Optional[str] = None) -> None:
+    """Показывает заказы (все или одного покупателя) страницами, новые первыми."""
+    cursor = None
+    while True:
+        page = orders.page(cursor, ORDERS_PAGE_SIZE, customer=customer, status=status)
+        if not page.orders:
+            print("Заказов нет.")
+            return
+        for o in page.orders:
+            items_str = ", ".join([f"{it.product_id} x{it.quantity}" for it in o.items])
+            if customer is None:
+                print(f"{o.id} | {o.customer_id} | {items_str} | {o.status}")
+            else:
+                print(f"- {o.created_at}: {items_str} | Статус: {o.status}")
+        if page.next_cursor is None:
+            return
+        if input("Enter — следующие, q — выход: ").strip().lower() == "q":
+            return
+        cursor = page.next_cursor
+
+
+def _date_bound(text: str) -> Optional[datetime]:
+    """Граница периода из ввода ГГГГ-ММ-ДД; пустой ввод — без границы.
+
+    Raises:
+        ValueError: если дата в неверном формате.
+    """
+    text = text.strip()
+    return datetime.fromisoformat(text) if text else None
+
+
+def _print_orders(found: List[Order]) -> None:
+    """Печатает список заказов в порядке, в котором он получен."""
+    if not found:
+        print("Заказов нет.")
+    for o in found:
+        items_str = ", ".join([f"{it.product_id} x{it.quantity}" for it in o.items])
+        print(f"{o.created_at} | {o.id} | {o.customer_id} | {items_str} | {o.status}")
+
+
+def place_order(cart: Cart, customer: Customer, method: str = "balance",
+                holds: Optional[StockHolds] = None) -> Order:
+    """Оформляет корзину через checkout и фиксирует результат в журнале.
+
+    Raises:
+        StoreError: как checkout().
+    """
+    order = checkout(cart, customer, inventory, method, holds)
+    try:
+        record_order(order)
+    except Exception:
+        # Заказ не зафиксирован: возвращаем деньги и товар, как checkout
+        # при ошибке оплаты.
+        customer.balance += order.total()
+        inventory.release_many({it.product_id: it.quantity for it in order.items})
+        raise
+    return order
+
+
+def record_order(order: Order) -> None:
+    """Фиксирует оформленный и оплаченный заказ: OrderStore, аналитика,
+    журнал (заказ и новый баланс покупателя).
+
+    Вызывается из place_order и конвейером заказов сервера. Журнал
+    сбрасывается на диск до записи в OrderStore: после сбоя заказ без
+    списанных остатков и баланса невозможен, а заказ, не успевший
+    попасть в файл заказов, восстанавливается из записи "order".
+
+    Если сброс журнала или запись заказа не удались, вызывающий
+    откатывает заказ (возвращает деньги и товар); в журнал тогда
+    дописываются отмена заказа и возвращённый баланс.
+    """
+    _log("order", order=order.to_dict())
+    customer = customers.find(order.customer_id)
+    if customer is not None:
+        pending_changes.customer(customer)
+        _log("balance", email=customer.email, balance=customer.balance)
+    try:
+        _sync_log()
+        orders.save(order)
+    except Exception:
+        _log("order_status", order_id=order.id, status="cancelled")
+        if customer is not None:
+            _log("balance", email=customer.email, balance=customer.balance + order.total())
+        raise
+    analytics.record(order)
+    pending_changes.order(order)
+
+
+def _place_order(cart: Cart, customer: Customer) -> None:
+    try:
+        order = place_order(cart, customer, holds=holds)
+    except StoreError as e:
+        print(f"Ошибка: {e}")
+        return
+    print(f"✅ Заказ оформлен на сумму {order.total()}₽. Номер: {order.id}")
+
+
+def _record_order(order: Order) -> None:
+    orders.save(order)
+    analytics.record(order)
+
+
+def _set_order_status(order_id: str, status: str) -> Optional[Order]:
+    order = orders.get(order_id)
+    if order is not None:
+        analytics.set_status(order, status)
+        orders.save(order)
+    return order
+
+
+def run_batch(path: str) -> BatchReport:
+    """Выполняет файл команд JSONL (см. utils.batch_commands).
+
+    Результаты команд пишутся в <path>.results.
+    """
+    with open(path, "r", encoding="utf-8") as src, \
+            open(path + ".results", "w", encoding="utf-8") as out:
+        return run_commands(src, write_results(out))
+
+
+def run_commands(source: TextIO, on_results: Optional[Callable[[List[CommandResult]], None]] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> BatchReport:
+    """Выполняет команды JSONL из source над загруженным магазином.
+
+    Команды не попадают в журнал построчно, поэтому после прогона
+    делается полный снимок через checkpoint журнала.
+    """
+    engine = BatchEngine(inventory, customers, suppliers, _set_order_status, _record_order,
+                         orders.link, batch_size=batch_size)
+    report = engine.run(source, on_results)
+    pending_changes.full = True
+    if journal is not None:
+        journal.checkpoint()
+    return report
+
+
+def _hold_cart(cart: Cart) -> None:
+    """Удерживает товар корзины на складе (или снимает удержание пустой)."""
+    if holds is not None:
+        holds.hold_cart(cart)
+
+
 def customer_menu(customer: Customer) -> None:
+    """Личный кабинет. Товар в корзине удерживается (см. StockHolds), пока
+    корзина не оформлена, не очищена, не истёк срок или покупатель не вышел."""
+    cart = Cart(owner_id=customer.email)
+    try:
+        _customer_menu(customer, cart)
+    finally:
+        cart.items.clear()
+        _hold_cart(cart)
+
+
+def _customer_menu(customer: Customer, cart: Cart) -> None:
     while True:
         print(f"\n=== Личный кабинет {customer.name} ({customer.email}) ===")
         print("1. Просмотреть каталог")
         print("2. Купить товар")
         print("3. Просмотреть мои заказы")
+        print("4. Поиск товара")
+        print("5. Добавить товар в корзину")
+        print("6. Корзина и оформление заказа")
         print("0. Выйти")
         choice = input("Выберите действие: ").strip()
 
         if choice == "1":
-            for p in inventory.products.values():
-                print(f"{p.id}: {p.name} ({p.category}) — {p.price}₽, в наличии {p.stock}")
+            _show_catalog("customer")
 
         elif choice == "2":
             pid = input("Введите ID товара: ").strip()
             qty = int(input("Количество: ").strip())
-            prod = find_product_by_id(pid)
-            if not prod:
-                print("Товар не найден.")
-                continue
-            if prod.stock < qty:
-                print("Недостаточно на складе.")
-                continue
-            total = prod.price * qty
-            if not customer.can_afford(total):
-                print("Недостаточно средств.")
-                continue
+            single = Cart(owner_id=customer.email)
             try:
-                inventory.reserve(prod.id, qty)
+                single.add(pid, qty)
             except StoreError as e:
                 print(f"Ошибка: {e}")
                 continue
-            order = Order(generate_id("o"), customer.email, [OrderItem(prod.id, qty, prod.price)])
-            orders.append(order)
-            customer.pay(total)
-            customer.add_order(order)
-            print(f"✅ Заказ оформлен на сумму {total}₽. Номер: {order.id}")
+            _place_order(single, customer)
 
         elif choice == "3":
             if not customer.orders:
                 print("У вас нет заказов.")
             else:
-                for o in customer.orders:
-                    items_str = ", ".join([f"{it.product_id} x{it.quantity}" for it in o.items])
-                    print(f"- {o.created_at}: {items_str} | Статус: {o.status}")
+                _show_orders(customer.email)
+
+        elif choice == "4":
+            query = input("Поиск: ").strip()
+            found = inventory.search(query)
+            if not found:
+                hints = inventory.suggest(query)
+                print("Ничего не найдено." + (f" Возможно: {', '.join(hints)}" if hints else ""))
+            for p in found:
+                print(f"{p.id}: {p.name} ({p.category}) — {p.price}₽, в наличии {p.stock}")
+
+        elif choice == "5":
+            pid = input("Введите ID товара: ").strip()
+            if not find_product_by_id(pid):
+                print("Товар не найден.")
+                continue
+            try:
+                qty = int(input("Количество: ").strip())
+                cart.add(pid, qty)
+            except StoreError as e:
+                print(f"Ошибка: {e}")
+                continue
+            try:
+                _hold_cart(cart)
+            except StoreError as e:
+                cart.remove(pid, qty)
+                print(f"Ошибка: {e}")
+                continue
+            print("✅ Добавлено в корзину." + (f" Товар отложен на {holds.ttl / 60:.0f} мин."
+                                              if holds is not None else ""))
+
+        elif choice == "6":
+            if not cart.items:
+                print("Корзина пуста.")
+                continue
+            for ci in cart.items.values():
+                p = find_product_by_id(ci.product_id)
+                price = f"{p.price}₽" if p else "нет в каталоге"
+                print(f"- {ci.product_id} x{ci.quantity} — {price}")
+            action = input("Оформить заказ (y), очистить корзину (c) или назад (Enter): ").strip().lower()
+            if action == "y":
+                _place_order(cart, customer)
+            elif action == "c":
+                cart.items.clear()
+                _hold_cart(cart)
+                print("Корзина очищена.")
 
         elif choice == "0":
             break
@@ -218,12 +764,19 @@ def manager_menu() -> None:
         print("5. Просмотреть заказы")
         print("6. Добавить поставщика")
         print("7. Заказать поставку товара")
+        print("8. Импортировать фид товаров (CSV/JSONL)")
+        print("9. Изменить статус заказа")
+        print("10. Отчёт о продажах")
+        print("11. Метрики производительности")
+        print("12. Выполнить пакет команд (JSONL)")
+        print("13. Товары с малым остатком")
+        print("14. Заказы за период")
+        print("15. Последние заказы")
         print("0. Выйти")
         choice = input("Выберите действие: ").strip()
 
         if choice == "1":
-            for p in inventory.products.values():
-                print(f"{p.id}: {p.name} ({p.category}) — {p.price}₽, {p.stock} шт.")
+            _show_catalog("manager")
 
         elif choice == "2":
             pid = input("ID: ").strip()
@@ -241,14 +794,18 @@ def manager_menu() -> None:
             if not prod:
                 print("Товар не найден.")
                 continue
-            prod.price = float(input("Новая цена: ").strip())
-            prod.stock = int(input("Новый остаток: ").strip())
+            try:
+                inventory.update_price(pid, float(input("Новая цена: ").strip()))
+                inventory.update_stock(pid, int(input("Новый остаток: ").strip()))
+            except StoreError as e:
+                print(f"Ошибка: {e}")
+                continue
             print("✅ Обновлено.")
 
         elif choice == "4":
             pid = input("ID товара: ").strip()
-            if pid in inventory.products:
-                del inventory.products[pid]
+            if inventory.find(pid) is not None:
+                inventory.remove_product(pid)
                 print("✅ Удалено.")
             else:
                 print("Не найдено.")
@@ -256,14 +813,16 @@ def manager_menu() -> None:
         elif choice == "5":
             if not orders:
                 print("Нет заказов.")
-            for o in orders:
-                items_str = ", ".join([f"{it.product_id} x{it.quantity}" for it in o.items])
-                print(f"{o.id} | {o.customer_id} | {items_str} | {o.status}")
+                continue
+            _show_orders(None, input("Фильтр по статусу (Enter — все): ").strip() or None)
 
         elif choice == "6":
             name = input("Название поставщика: ").strip()
             contact = input("Контакт: ").strip()
-            suppliers.append(Supplier(name, contact))
+            supplier = Supplier(name, contact)
+            suppliers.append(supplier)
+            pending_changes.supplier(supplier)
+            _log("add_supplier", name=name, contact=contact)
             print("✅ Поставщик добавлен.")
 
         elif choice == "7":
@@ -281,9 +840,97 @@ def manager_menu() -> None:
             if not prod:
                 print("Товар не найден.")
                 continue
-            supplier.supply_product(prod, qty)
+            supplier.supply_product(prod, qty, inventory)
             print(f"✅ Поставка от {supplier.name}: +{qty} шт. {prod.name}")
 
+        elif choice == "8":
+            path = input("Путь к файлу фида: ").strip()
+            try:
+                report = import_feed(inventory, path)
+            except StoreError as e:
+                print(f"Ошибка: {e}")
+                continue
+            # Импорт не пишется в журнал построчно — фиксируем его снимком.
+            if journal is not None:
+                journal.checkpoint()
+            print(f"✅ Импортировано {report.imported} (новых {report.added}, "
+                  f"обновлено {report.updated}), ошибок: {len(report.errors)}")
+            for err in report.errors[:10]:
+                print(f"  {err}")
+
+        elif choice == "9":
+            order = find_order_by_id(input("ID заказа: ").strip())
+            if not order:
+                print("Заказ не найден.")
+                continue
+            status = input(f"Новый статус (сейчас {order.status}): ").strip()
+            if not status:
+                continue
+            analytics.set_status(order, status)
+            _log("order_status", order_id=order.id, status=status)
+            _sync_log()
+            orders.save(order)
+            pending_changes.order(order)
+            print("✅ Статус обновлён.")
+
+        elif choice == "10":
+            t = analytics.total
+            print(f"Всего: {t.revenue:.2f}₽, заказов {t.orders}, единиц {t.units}")
+            print("Выручка по категориям:")
+            for cat, totals in analytics.top_categories(len(analytics.categories.totals)):
+                print(f"  {cat or 'без категории'}: {totals.revenue:.2f}₽ ({totals.units} шт.)")
+            print("Топ товаров:")
+            for pid, totals in analytics.top_products(5):
+                print(f"  {pid}: {totals.revenue:.2f}₽ ({totals.units} шт.)")
+            print("Топ покупателей:")
+            for email, totals in analytics.top_customers(5):
+                print(f"  {email}: {totals.revenue:.2f}₽, заказов {totals.orders}")
+            print("По дням (последние 7):")
+            for day, totals in list(analytics.daily())[-7:]:
+                print(f"  {day}: {totals.revenue:.2f}₽, заказов {totals.orders}")
+
+        elif choice == "11":
+            if not metrics.is_enabled():
+                if input("Сбор метрик выключен. Включить? (y/n): ").strip().lower() == "y":
+                    metrics.enable()
+                continue
+            for name, st in metrics.stats().items():
+                errors = ", ".join(f"{k}={v}" for k, v in st["errors"].items()) or "нет"
+                print(f"{name}: вызовов {st['calls']}, среднее {st['seconds_avg'] * 1000:.3f} мс, "
+                      f"макс {st['seconds_max'] * 1000:.3f} мс, ошибки: {errors}")
+            metrics.dump(METRICS_FILE)
+            print(f"Метрики в формате Prometheus записаны в {METRICS_FILE}")
+
+        elif choice == "12":
+            path = input("Файл команд: ").strip()
+            try:
+                report = run_batch(path)
+            except OSError as e:
+                print(f"Ошибка: {e}")
+                continue
+            print(f"✅ Команд {report.commands}: успешно {report.succeeded}, ошибок {report.failed}, "
+                  f"{report.ops_per_sec:.0f} оп/с. Результаты: {path}.results")
+
+        elif choice == "13":
+            threshold = int(input("Порог остатка: ").strip())
+            found = inventory.low_stock(threshold)
+            if not found:
+                print("Таких товаров нет.")
+            for p in found:
+                print(f"{p.id}: {p.name} — {p.stock} шт.")
+
+        elif choice == "14":
+            try:
+                start = _date_bound(input("С даты (ГГГГ-ММ-ДД, UTC; Enter — с начала): "))
+                end = _date_bound(input("По дату, не включая (Enter — до конца): "))
+            except ValueError:
+                print("Неверный формат даты.")
+                continue
+            _print_orders(orders.between(start, end))
+
+        elif choice == "15":
+            _print_orders(orders.latest(int(input("Сколько заказов: ").strip())))
+
         elif choice == "0":
             break
         else:
@@ -292,27 +939,41 @@ def manager_menu() -> None:
 
 # ---------------------- Основной цикл ----------------------
 def main() -> None:
+    global holds
     print("Выберите формат данных:")
     print("1. JSON")
     print("2. XML")
+    print("3. SQLite")
+    print("4. Бинарный снимок (быстрый запуск)")
     choice = input("Ваш выбор: ").strip()
     if choice == "2":
-        load_from_json()
+        load_from_xml()
+    elif choice == "3":
+        load_from_sqlite()
+    elif choice == "4":
+        load_from_binary()
     else:
         load_from_json()
+    replayed = open_journal()
+    if replayed:
+        print(f"Восстановлено изменений из журнала: {replayed}")
+    holds = StockHolds(inventory)
+    holds.start()
 
     if not customers:
         customers.extend([
             Customer("alice@example.com", "Alice", 1000.0),
             Customer("bob@example.com", "Bob", 500.0),
         ])
+        for customer in customers:
+            orders.link(customer)
 
     while True:
         print("\n=== Интернет-магазин электроники ===")
         print("1. Войти как менеджер")
         print("2. Войти как покупатель")
         print("0. Сохранить и выйти")
-        print("9. Выйти без сохранения")
+        print("9. Выйти без сохранения снимка (изменения останутся в журнале)")
         choice = input("Ваш выбор: ").strip()
 
         if choice == "1":
@@ -331,15 +992,39 @@ def main() -> None:
                     name = input("Имя: ").strip()
                     balance = float(input("Начальный баланс: ").strip())
                     new_cust = Customer(email, name, balance)
-                    customers.append(new_cust)
+                    try:
+                        customers.add(new_cust)
+                    except DuplicateCustomerError as e:
+                        print(f"Ошибка: {e}")
+                        continue
+                    orders.link(new_cust)
+                    pending_changes.customer(new_cust)
+                    _log("register", email=new_cust.email, name=new_cust.name,
+                         balance=new_cust.balance)
                     print("✅ Зарегистрирован.")
         elif choice == "0":
-            save_to_json()
-            save_to_xml()
+            holds.stop()
+            if store_file == JSON_FILE and DELTA_SAVES:
+                # Дельты сливаются с базой, XML пишется целиком один раз —
+                # до закрытия журнала, чтобы в XML попал его последний seq.
+                # Журнал XML-хранилища к новому data.xml не относится.
+                journal.checkpoint()
+                delta_store.wait()
+                delta_store.compact()
+                save_to_xml()
+                if os.path.exists(journal_file(XML_FILE)):
+                    os.remove(journal_file(XML_FILE))
+            close_journal(save=True)
+            orders.close()
+            if metrics.is_enabled():
+                metrics.dump(METRICS_FILE)
             print("✅ Данные сохранены. До свидания!")
             break
         elif choice == "9":
-            print("Выход без сохранения.")
+            holds.stop()
+            close_journal(save=False)
+            orders.close()
+            print("Выход без сохранения снимка.")
             break
         else:
             print("Неверный выбор.")
@@ -0,0 +1,344 @@
+"""HTTP/JSON API интернет-магазина для витрины.
+
+Работает поверх тех же данных, журнала и бизнес-логики, что и main.py.
+
+    GET  /products?category=&min_price=&max_price=&q=&offset=&limit=
+    GET  /products/{id}
+    GET  /categories
+    GET  /metrics          метрики в формате Prometheus (utils.metrics)
+    POST /login            {"email": "..."} -> {"token": "...", "customer": {...}}
+    GET  /me               (Authorization: Bearer <token>)
+    GET  /orders?cursor=&limit=&status=&since=&until=
+    POST /holds            {"items": {"product_id": qty}} -> удержание товара на TTL
+    PUT  /holds/{id}       {"items": {...}} — новый состав удержания, срок продлевается
+    DELETE /holds/{id}
+    POST /orders           {"items": {"product_id": qty}, "method": "balance", "hold_id": "..."}
+
+Ответы каталога кэшируются уже закодированными и живут, пока не
+изменится склад (Inventory.version).
+
+Всё, что может ждать диска, базы или журнала, выполняется вне цикла
+событий: чтения (сборка страницы каталога при промахе кэша, товар,
+заказы) — в пуле потоков, изменения (заказы, удержания) — в одном
+потоке-писателе, по очереди, как раньше на цикле. Поэтому запись
+снимка журналом или долгий запрос к базе не останавливают остальные
+соединения.
+
+Удержания (StockHolds) откладывают товар корзины на --hold-ttl секунд;
+заказ с hold_id получает удержанный товар, даже если свободный остаток
+уже раскуплен. Истёкшие удержания снимает фоновый поток.
+
+Заказы проходят асинхронный конвейер (clasess.order_pipeline): очередь
+с backpressure, резервирование, оплата через шлюз с ограничением
+параллельности, таймаутом и повторами, затем запись в журнал и
+OrderStore (main.record_order). --payment-latency подключает имитатор
+шлюза с заданной задержкой — для замеров под нагрузкой.
+
+Запуск:
+    python server.py --port 8080 --format json
+"""
+import argparse
+import asyncio
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar, Union
+import main
+from clasess.cart import Cart
+from clasess.customer import Customer
+from clasess.order_pipeline import OrderPipeline, OrderRequest
+from clasess.payment import PaymentGateway
+from clasess.payment_gateway import FakePaymentGateway
+from clasess.product import Product
+from clasess.stock_holds import DEFAULT_TTL, Hold, StockHolds
+from exceptions.store_exceptions import (InvalidQuantityError, OutOfStockError, PaymentError,
+                                         StoreError)
+from utils import metrics
+from utils.http_server import HttpError, Request, Response, Router, serve
+from utils.version_cache import VersionedCache
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+T = TypeVar("T")
+
+_LOADERS: Dict[str, Callable[[], None]] = {
+    "json": main.load_from_json,
+    "xml": main.load_from_xml,
+    "sqlite": main.load_from_sqlite,
+    "binary": main.load_from_binary,
+}
+
+
+def _customer_dict(c: Customer) -> Dict[str, Any]:
+    return {"email": c.email, "name": c.name, "balance": c.balance}
+
+
+def _int_arg(request: Request, name: str, default: int, lo: int = 0, hi: Optional[int] = None) -> int:
+    try:
+        value = int(request.query.get(name, default))
+    except ValueError:
+        raise HttpError(400, f"Параметр {name} должен быть целым числом")
+    if value < lo or (hi is not None and value > hi):
+        raise HttpError(400, f"Параметр {name} вне допустимого диапазона")
+    return value
+
+
+def _float_arg(request: Request, name: str) -> Optional[float]:
+    value = request.query.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise HttpError(400, f"Параметр {name} должен быть числом")
+
+
+class StoreApi:
+    """Маршруты API над глобальным состоянием main.py.
+
+    Args:
+        cache_size: сколько закодированных ответов каталога хранить.
+        hold_ttl: срок удержания товара, секунды.
+        gateway: платёжный шлюз конвейера заказов (None — без шлюза).
+    """
+
+    def __init__(self, cache_size: int = 1024, hold_ttl: float = DEFAULT_TTL,
+                 gateway: Optional[PaymentGateway] = None) -> None:
+        self.cache = VersionedCache(cache_size)
+        self.sessions: Dict[str, str] = {}  # токен -> e-mail
+        self.holds = StockHolds(main.inventory, hold_ttl)
+        self.holds.register_metrics()
+        # Изменения магазина идут в одном потоке: Customer.pay и запись
+        # заказа рассчитаны на последовательный вызов.
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="store-writer")
+        self.pipeline = OrderPipeline(main.inventory, gateway, on_order=main.record_order,
+                                      holds=self.holds, executor=self._writer,
+                                      max_results=10_000)
+        self.router = Router()
+        self.router.add("GET", "/products", self.list_products)
+        self.router.add("GET", "/products/{id}", self.get_product)
+        self.router.add("GET", "/categories", self.categories)
+        self.router.add("GET", "/metrics", lambda request: Response.text(metrics.to_prometheus()))
+        self.router.add("POST", "/login", self.login)
+        self.router.add("GET", "/me", self.me)
+        self.router.add("GET", "/orders", self.list_orders)
+        self.router.add("POST", "/orders", self.create_order)
+        self.router.add("POST", "/holds", self.create_hold)
+        self.router.add("PUT", "/holds/{id}", self.update_hold)
+        self.router.add("DELETE", "/holds/{id}", self.delete_hold)
+
+    def _cached(self, key: Any, build: Callable[[], Response]) -> Union[Response, Awaitable[Response]]:
+        """Ответ из кэша сразу, а при промахе — корутина, строящая его в потоке."""
+        version = main.inventory.version
+        hit = self.cache.get(key, version)
+        if hit is not None:
+            return hit
+        return asyncio.to_thread(self.cache.get_or_build, key, version, build)
+
+    def _write(self, fn: Callable[..., T], *args: Any) -> "asyncio.Future[T]":
+        """Выполняет изменение магазина в потоке-писателе."""
+        return asyncio.get_running_loop().run_in_executor(self._writer, fn, *args)
+
+    async def close(self) -> None:
+        """Дожидается заказов в конвейере и останавливает поток-писатель."""
+        await self.pipeline.close()
+        self._writer.shutdown()
+
+    # ---------------------- каталог ----------------------
+    def list_products(self, request: Request) -> Union[Response, Awaitable[Response]]:
+        key = ("products", tuple(sorted(request.query.items())))
+        return self._cached(key, lambda: self._build_products(request))
+
+    def _build_products(self, request: Request) -> Response:
+        offset = _int_arg(request, "offset", 0)
+        limit = _int_arg(request, "limit", DEFAULT_LIMIT, 1, MAX_LIMIT)
+        category = request.query.get("category")
+        min_price, max_price = _float_arg(request, "min_price"), _float_arg(request, "max_price")
+        query = request.query.get("q")
+        inv = main.inventory
+        total: Optional[int] = None
+        if query:
+            found: List[Product] = [p for p in inv.search(query, offset + limit)
+                                    if category is None or p.category == category]
+            page = found[offset:]
+        elif min_price is not None or max_price is not None:
+            found = inv.price_range(min_price, max_price, category)
+            total, page = len(found), found[offset:offset + limit]
+        elif category is not None:
+            found = inv.by_category(category)
+            total, page = len(found), found[offset:offset + limit]
+        else:
+            with inv.snapshot() as view:
+                total, page = len(view), view.page(offset, offset + limit)
+        return Response.json({"items": [p.to_dict() for p in page], "offset": offset,
+                              "limit": limit, "total": total})
+
+    def get_product(self, request: Request) -> Awaitable[Response]:
+        # Товар может читаться из базы или отображённого снимка.
+        return asyncio.to_thread(self._product, request.params["id"])
+
+    def _product(self, product_id: str) -> Response:
+        p = main.inventory.find(product_id)
+        if p is None:
+            raise HttpError(404, f"Продукт {product_id} не найден")
+        held = main.inventory.held(p.id)
+        return Response.json({**p.to_dict(), "held": held, "available": max(p.stock - held, 0)})
+
+    def categories(self, request: Request) -> Union[Response, Awaitable[Response]]:
+        return self._cached("categories", lambda: Response.json(
+            sorted(c for c in main.inventory.categories() if c is not None)))
+
+    # ---------------------- покупатели и заказы ----------------------
+    def _customer(self, request: Request) -> Customer:
+        auth = request.headers.get("authorization", "")
+        email = self.sessions.get(auth[7:]) if auth.startswith("Bearer ") else None
+        customer = main.find_customer_by_email(email) if email else None
+        if customer is None:
+            raise HttpError(401, "Требуется вход (POST /login)")
+        return customer
+
+    def login(self, request: Request) -> Response:
+        data = request.json()
+        email = data.get("email") if isinstance(data, dict) else None
+        customer = main.find_customer_by_email(email) if isinstance(email, str) else None
+        if customer is None:
+            raise HttpError(404, "Покупатель не найден")
+        token = secrets.token_hex(16)
+        self.sessions[token] = customer.email
+        return Response.json({"token": token, "customer": _customer_dict(customer)})
+
+    def me(self, request: Request) -> Response:
+        return Response.json(_customer_dict(self._customer(request)))
+
+    def list_orders(self, request: Request) -> Awaitable[Response]:
+        customer = self._customer(request)
+        limit = _int_arg(request, "limit", DEFAULT_LIMIT, 1, MAX_LIMIT)
+        # Страницы заказов читаются из файла OrderStore.
+        return asyncio.to_thread(self._orders_page, request, customer, limit)
+
+    def _orders_page(self, request: Request, customer: Customer, limit: int) -> Response:
+        try:
+            page = main.orders.page(request.query.get("cursor"), limit, customer=customer.email,
+                                    status=request.query.get("status"),
+                                    start=request.query.get("since"), end=request.query.get("until"))
+        except StoreError as e:
+            raise HttpError(400, str(e))
+        return Response.json({"items": [o.to_dict() for o in page.orders],
+                              "next_cursor": page.next_cursor})
+
+    def _cart(self, customer: Customer, data: Any) -> Cart:
+        items = data.get("items") if isinstance(data, dict) else None
+        if not isinstance(items, dict) or not items:
+            raise HttpError(400, "Нужно поле items: {product_id: количество}")
+        cart = Cart(owner_id=customer.email)
+        try:
+            for pid, qty in items.items():
+                cart.add(str(pid), int(qty))
+        except (InvalidQuantityError, ValueError, TypeError) as e:
+            raise HttpError(400, str(e))
+        return cart
+
+    def create_order(self, request: Request) -> Awaitable[Response]:
+        customer = self._customer(request)
+        data = request.json()
+        cart = self._cart(customer, data)
+        hold_id = data.get("hold_id")
+        if hold_id is not None:
+            hold_id = self._hold(customer, str(hold_id)).id
+        items = {pid: ci.quantity for pid, ci in cart.items.items()}
+        return self._submit(OrderRequest(customer, items, str(data.get("method", "balance")),
+                                         hold_id=hold_id))
+
+    async def _submit(self, order_request: OrderRequest) -> Response:
+        result = await (await self.pipeline.submit(order_request))
+        if result.ok:
+            return Response.json(result.order.to_dict(), 201)  # type: ignore[union-attr]
+        e = result.error
+        if isinstance(e, OutOfStockError):
+            raise HttpError(409, str(e))
+        if isinstance(e, PaymentError):
+            raise HttpError(402, str(e))
+        raise HttpError(400, str(e))
+
+    # ---------------------- удержания ----------------------
+    def _hold(self, customer: Customer, hold_id: str) -> Hold:
+        hold = self.holds.get(hold_id)
+        if hold is None or hold.owner != customer.email:
+            raise HttpError(404, f"Удержание {hold_id} не найдено или истекло")
+        return hold
+
+    def _hold_dict(self, hold: Hold) -> Dict[str, Any]:
+        return {"id": hold.id, "items": hold.items,
+                "expires_in": round(max(hold.expires_at - self.holds.clock(), 0.0), 3)}
+
+    def _apply_hold(self, customer: Customer, cart: Cart) -> Hold:
+        try:
+            return self.holds.hold_cart(cart)  # type: ignore[return-value]  # корзина не пуста
+        except OutOfStockError as e:
+            raise HttpError(409, str(e))
+        except StoreError as e:
+            raise HttpError(400, str(e))
+
+    def create_hold(self, request: Request) -> Awaitable[Response]:
+        customer = self._customer(request)
+        cart = self._cart(customer, request.json())
+        return self._write(lambda: Response.json(self._hold_dict(self._apply_hold(customer, cart)), 201))
+
+    def update_hold(self, request: Request) -> Awaitable[Response]:
+        customer = self._customer(request)
+        cart = self._cart(customer, request.json())
+        cart.hold_id = self._hold(customer, request.params["id"]).id
+        return self._write(lambda: Response.json(self._hold_dict(self._apply_hold(customer, cart))))
+
+    def delete_hold(self, request: Request) -> Awaitable[Response]:
+        customer = self._customer(request)
+        hold_id = self._hold(customer, request.params["id"]).id
+
+        def release() -> Response:
+            self.holds.release(hold_id)
+            return Response.json({"released": hold_id})
+        return self._write(release)
+
+
+async def run(host: str, port: int, hold_ttl: float = DEFAULT_TTL,
+              gateway: Optional[PaymentGateway] = None) -> None:
+    api = StoreApi(hold_ttl=hold_ttl, gateway=gateway)
+    api.holds.start()
+    await api.pipeline.start()
+    try:
+        server = await serve(api.router, host, port)
+        print(f"Сервер слушает http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+    finally:
+        await api.close()
+        api.holds.stop()
+
+
+def cli() -> None:
+    parser = argparse.ArgumentParser(description="HTTP API интернет-магазина")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--format", choices=sorted(_LOADERS), default="json",
+                        help="откуда загрузить данные (как в меню main.py)")
+    parser.add_argument("--hold-ttl", type=float, default=DEFAULT_TTL,
+                        help="срок удержания товара корзиной, секунды")
+    parser.add_argument("--payment-latency", type=float, default=0.0,
+                        help="задержка имитатора платёжного шлюза, секунды (0 — без шлюза)")
+    args = parser.parse_args()
+
+    gateway = FakePaymentGateway(args.payment_latency, args.payment_latency / 4) \
+        if args.payment_latency > 0 else None
+    _LOADERS[args.format]()
+    main.open_journal()
+    try:
+        asyncio.run(run(args.host, args.port, args.hold_ttl, gateway))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        main.close_journal(save=True)
+        main.orders.close()
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,305 @@
+"""Пакетное выполнение команд магазина без интерактивного меню.
+
+Команды читаются из JSON Lines, по одной на строку. Формат совпадает с
+записями журнала (utils.journal), поэтому тем же движком можно
+проигрывать сохранённые журналы. Кроме операций журнала поддерживаются
+purchase (оформление заказа через checkout) и supply (поставка от
+поставщика):
+
+    {"op": "add_product", "product": {"id": "p1", "name": "...", "price": 10, "stock": 5}}
+    {"op": "set_price", "id": "p1", "price": 12.5}
+    {"op": "set_stock", "id": "p1", "stock": 7}
+    {"op": "register", "email": "a@b.c", "name": "A", "balance": 100}
+    {"op": "purchase", "email": "a@b.c", "items": {"p1": 2}, "method": "balance"}
+    {"op": "supply", "supplier": "ACME", "product_id": "p1", "qty": 10}
+
+Необязательное поле "ref" возвращается в результате команды как есть.
+Строки читаются и выполняются пачками по batch_size, результаты
+пишутся тоже пачками. Ошибка одной команды не прерывает выполнение.
+
+Запуск из командной строки:
+    python -m utils.batch_commands commands.jsonl --results results.jsonl
+
+CLI работает с тем же хранилищем, что и приложение (main.JSON_FILE): снимок
+с дельтами, файл заказов и журнал; после прогона делается снимок через
+checkpoint журнала.
+"""
+import argparse
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+from exceptions.store_exceptions import StoreError
+from clasess.cart import Cart
+from clasess.checkout import checkout
+from clasess.customer import Customer
+from clasess.customer_registry import CustomerRegistry
+from clasess.inventory import Inventory
+from clasess.order import Order
+from clasess.product import Product
+from clasess.supplier import Supplier
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+@dataclass
+class CommandResult:
+    """Итог одной команды; line — номер строки во входном потоке."""
+    line: int
+    op: Optional[str]
+    ok: bool
+    ref: Any = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {"line": self.line, "op": self.op, "ok": self.ok}
+        if self.ref is not None:
+            data["ref"] = self.ref
+        if self.result is not None:
+            data["result"] = self.result
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+@dataclass
+class BatchReport:
+    """Итог прогона: счётчики по операциям и пропускная способность."""
+    commands: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    by_op: Dict[str, int] = field(default_factory=dict)
+    errors_by_op: Dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+
+    @property
+    def ops_per_sec(self) -> float:
+        return self.commands / self.seconds if self.seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"commands": self.commands, "succeeded": self.succeeded, "failed": self.failed,
+                "by_op": self.by_op, "errors_by_op": self.errors_by_op,
+                "seconds": round(self.seconds, 3), "ops_per_sec": round(self.ops_per_sec, 1)}
+
+
+class BatchEngine:
+    """Выполняет команды над складом, покупателями, поставщиками и заказами.
+
+    Изменения склада не пишутся в журнал: после прогона нужен полный
+    снимок (как после Inventory.merge_products).
+
+    Args:
+        inventory: склад.
+        customers: реестр покупателей.
+        suppliers: список поставщиков (новые дописываются в него).
+        set_order_status: меняет статус заказа по id и возвращает заказ
+            (None, если заказа нет) — для команды order_status.
+        on_order: вызывается для каждого нового заказа.
+        on_customer: вызывается для каждого нового покупателя.
+        batch_size: сколько строк читать и выполнять за раз.
+    """
+
+    def __init__(self, inventory: Inventory, customers: CustomerRegistry,
+                 suppliers: List[Supplier],
+                 set_order_status: Callable[[str, str], Optional[Order]] = lambda order_id, status: None,
+                 on_order: Callable[[Order], None] = lambda order: None,
+                 on_customer: Callable[[Customer], None] = lambda customer: None,
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        self.inventory = inventory
+        self.customers = customers
+        self.suppliers = suppliers
+        self.set_order_status = set_order_status
+        self.on_order = on_order
+        self.on_customer = on_customer
+        self.batch_size = batch_size
+        self._suppliers_by_name = {s.name: s for s in suppliers}
+        inv = inventory
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]] = {
+            "add_product": lambda c: inv.add_product(Product.from_dict(c["product"])),
+            "remove_product": lambda c: {"removed": inv.remove_product(c["id"]).id},
+            "set_stock": lambda c: inv.update_stock(c["id"], int(c["stock"])),
+            "set_price": lambda c: inv.update_price(c["id"], float(c["price"])),
+            "reserve": lambda c: inv.reserve(c["id"], int(c["qty"])),
+            "release": lambda c: inv.release(c["id"], int(c["qty"])),
+            "reserve_many": lambda c: {"prices": inv.reserve_many(c["items"])},
+            "release_many": lambda c: inv.release_many(c["items"]),
+            "register": self._register,
+            "balance": self._balance,
+            "purchase": self._purchase,
+            "order": self._order,
+            "order_status": self._order_status,
+            "add_supplier": self._add_supplier,
+            "supply": self._supply,
+        }
+
+    # ---------------------- операции ----------------------
+    def _customer(self, email: str) -> Customer:
+        customer = self.customers.find(email)
+        if customer is None:
+            raise StoreError(f"Покупатель {email} не найден")
+        return customer
+
+    def _register(self, cmd: Dict[str, Any]) -> None:
+        customer = Customer(cmd["email"], cmd["name"], float(cmd.get("balance", 0.0)))
+        self.customers.add(customer)
+        self.on_customer(customer)
+
+    def _balance(self, cmd: Dict[str, Any]) -> None:
+        self._customer(cmd["email"]).balance = float(cmd["balance"])
+
+    def _purchase(self, cmd: Dict[str, Any]) -> Dict[str, Any]:
+        customer = self._customer(cmd["email"])
+        cart = Cart(owner_id=customer.email)
+        for pid, qty in cmd["items"].items():
+            cart.add(pid, int(qty))
+        order = checkout(cart, customer, self.inventory, cmd.get("method", "balance"))
+        self.on_order(order)
+        return {"order_id": order.id, "total": order.total()}
+
+    def _order(self, cmd: Dict[str, Any]) -> None:
+        order = Order.from_dict(cmd["order"])
+        customer = self.customers.find(order.customer_id)
+        if customer is not None:
+            customer.add_order(order)
+        self.on_order(order)
+
+    def _order_status(self, cmd: Dict[str, Any]) -> None:
+        if self.set_order_status(cmd["order_id"], cmd["status"]) is None:
+            raise StoreError(f"Заказ {cmd['order_id']} не найден")
+
+    def _add_supplier(self, cmd: Dict[str, Any]) -> None:
+        supplier = Supplier(cmd["name"], cmd["contact"])
+        self.suppliers.append(supplier)
+        self._suppliers_by_name[supplier.name] = supplier
+
+    def _supply(self, cmd: Dict[str, Any]) -> None:
+        supplier = self._suppliers_by_name.get(cmd["supplier"])
+        if supplier is None:
+            raise StoreError(f"Поставщик {cmd['supplier']} не найден")
+        product = self.inventory.find(cmd["product_id"])
+        if product is None:
+            raise StoreError(f"Продукт {cmd['product_id']} не найден")
+        supplier.supply_product(product, int(cmd["qty"]), self.inventory)
+
+    # ---------------------- выполнение ----------------------
+    def execute(self, cmd: Dict[str, Any], line: int = 0) -> CommandResult:
+        """Выполняет одну команду; ошибки возвращаются в результате."""
+        op = cmd.get("op") if isinstance(cmd, dict) else None
+        ref = cmd.get("ref") if isinstance(cmd, dict) else None
+        handler = self._handlers.get(op)
+        if handler is None:
+            return CommandResult(line, op, False, ref, error=f"Неизвестная операция: {op}")
+        try:
+            return CommandResult(line, op, True, ref, handler(cmd))
+        except KeyError as e:
+            return CommandResult(line, op, False, ref, error=f"нет поля {e}")
+        except (StoreError, ValueError, TypeError, AttributeError) as e:
+            return CommandResult(line, op, False, ref, error=str(e))
+
+    def run(self, lines: Iterable[str],
+            on_results: Optional[Callable[[List[CommandResult]], None]] = None) -> BatchReport:
+        """Выполняет команды из строк JSON Lines пачками по batch_size.
+
+        Args:
+            lines: строки входного потока (пустые пропускаются).
+            on_results: получает результаты каждой пачки.
+        """
+        report = BatchReport()
+        t0 = time.perf_counter()
+        journal, self.inventory.journal = self.inventory.journal, None
+        try:
+            numbered: Iterator = enumerate(lines, 1)
+            while True:
+                batch = list(islice(numbered, self.batch_size))
+                if not batch:
+                    break
+                results = []
+                for n, text in batch:
+                    if not text.strip():
+                        continue
+                    try:
+                        cmd = json.loads(text)
+                    except ValueError as e:
+                        results.append(CommandResult(n, None, False, error=f"некорректный JSON: {e}"))
+                        continue
+                    results.append(self.execute(cmd, n))
+                for r in results:
+                    op = r.op or "?"
+                    report.by_op[op] = report.by_op.get(op, 0) + 1
+                    if r.ok:
+                        report.succeeded += 1
+                    else:
+                        report.failed += 1
+                        report.errors_by_op[op] = report.errors_by_op.get(op, 0) + 1
+                report.commands += len(results)
+                if on_results is not None:
+                    on_results(results)
+        finally:
+            self.inventory.journal = journal
+        report.seconds = time.perf_counter() - t0
+        return report
+
+
+def write_results(out: TextIO) -> Callable[[List[CommandResult]], None]:
+    """Возвращает обработчик, пишущий результаты пачки в out одним вызовом."""
+    def write(results: List[CommandResult]) -> None:
+        if results:
+            out.write("\n".join(json.dumps(r.to_dict(), ensure_ascii=False) for r in results) + "\n")
+    return write
+
+
+def main() -> None:
+    # Приложение само импортирует этот модуль, поэтому подключается здесь.
+    import main as app
+
+    parser = argparse.ArgumentParser(description="Пакетное выполнение команд магазина (JSON Lines)")
+    parser.add_argument("commands", help="файл команд JSONL или - для stdin")
+    parser.add_argument("--results", help="куда писать результаты команд (JSONL)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="не сохранять снимок")
+    args = parser.parse_args()
+
+    # Магазин загружается так же, как при запуске приложения: снимок JSON с
+    # дельтами, файл заказов и повтор журнала поверх них.
+    app.load_from_json()
+    app.open_journal()
+    source = sys.stdin if args.commands == "-" else open(args.commands, "r", encoding="utf-8")
+    out = open(args.results, "w", encoding="utf-8") if args.results else None
+    on_results = write_results(out) if out else None
+    try:
+        if args.dry_run:
+            # Заказы не пишутся в файл заказов, снимок не сохраняется.
+            placed: Dict[str, Order] = {}
+
+            def on_order(order: Order) -> None:
+                placed[order.id] = order
+
+            def set_order_status(order_id: str, status: str) -> Optional[Order]:
+                order = placed.get(order_id) or app.orders.get(order_id)
+                if order is not None:
+                    order.status = status
+                return order
+
+            engine = BatchEngine(app.inventory, app.customers, app.suppliers, set_order_status,
+                                 on_order, batch_size=args.batch_size)
+            report = engine.run(source, on_results)
+        else:
+            report = app.run_commands(source, on_results, args.batch_size)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not None:
+            out.close()
+        app.close_journal(save=False)
+        app.orders.close()
+    print(f"Команд: {report.commands}, успешно: {report.succeeded}, ошибок: {report.failed}, "
+          f"{report.seconds:.2f} с, {report.ops_per_sec:.0f} оп/с", file=sys.stderr)
+    for op, count in sorted(report.by_op.items()):
+        print(f"  {op}: {count} (ошибок {report.errors_by_op.get(op, 0)})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
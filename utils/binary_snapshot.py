@@ -0,0 +1,280 @@
+"""Бинарный снимок магазина, открываемый через mmap.
+
+Структура файла (все числа little-endian):
+
+    заголовок   _HEADER: сигнатура, версия, число товаров, смещения разделов,
+                journal_seq;
+    товары      записи фиксированного размера _PRODUCT: ссылки на строки
+                (смещение, длина), price, stock;
+    индекс      хеш-таблица с открытой адресацией: crc32(id) -> номер
+                записи + 1 (0 — пустая ячейка), размер — степень двойки;
+    строки      все строки товаров в UTF-8 подряд;
+    остальное   покупатели, поставщики и заказы — JSON Lines с префиксом
+                раздела, в формате data.json.
+
+Открытие файла не разбирает товары: BinarySnapshot.get() находит запись
+по индексу за O(1) и декодирует только её.
+
+Снимок хранится поколениями: <path>.1, <path>.2, ..., а сам <path> — это
+текстовый указатель с номером текущего поколения. Новое поколение
+пишется рядом, затем атомарно заменяется указатель, поэтому при сбое
+остаётся прежний снимок, а отображённый в память файл никогда не
+перезаписывается и не переименовывается.
+"""
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from typing import Any, BinaryIO, Iterable, Iterator, Optional, Tuple
+from exceptions.store_exceptions import SerializationError
+from clasess.customer import Customer
+from clasess.order import Order
+from clasess.product import Product
+from clasess.supplier import Supplier
+from utils.metrics import instrument
+from utils.serializer import store_object, store_record
+
+MAGIC = b"STORESNP"
+FORMAT_VERSION = 1
+# сигнатура, версия, товаров, размер индекса, смещения: товары, индекс,
+# строки, прочие разделы, конец; journal_seq (-1 — нет)
+_HEADER = struct.Struct("<8sIIQQQQQQq")
+# id, name, description, category как (смещение, длина); price; stock
+_PRODUCT = struct.Struct("<QIQIQIQIdq")
+_SLOT = struct.Struct("<I")
+_NONE = 0xFFFFFFFF  # длина строки для category = None
+
+
+def _hash(key: bytes) -> int:
+    return zlib.crc32(key)
+
+
+class _StringTable:
+    """Строки товаров, сбрасываемые во временный файл по мере добавления."""
+
+    def __init__(self, spool: BinaryIO) -> None:
+        self.spool = spool
+        self.size = 0
+
+    def add(self, value: Optional[str]) -> Tuple[int, int]:
+        if value is None:
+            return 0, _NONE
+        data = value.encode("utf-8")
+        offset = self.size
+        self.spool.write(data)
+        self.size += len(data)
+        return offset, len(data)
+
+
+def _generation_path(filepath: str, generation: int) -> str:
+    return f"{filepath}.{generation}"
+
+
+def _current_generation(filepath: str) -> Optional[int]:
+    """Номер поколения, на которое указывает filepath, или None."""
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            return int(f.read().strip())
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        raise SerializationError(f"{filepath}: повреждён указатель снимка")
+
+
+def _remove_stale_generations(filepath: str, keep: int) -> None:
+    """Удаляет старые поколения снимка.
+
+    Поколение, ещё отображённое в память (Windows не даёт удалить такой
+    файл), остаётся и удаляется при одном из следующих сохранений.
+    """
+    directory = os.path.dirname(filepath) or "."
+    prefix = os.path.basename(filepath) + "."
+    for name in os.listdir(directory):
+        suffix = name[len(prefix):]
+        if name.startswith(prefix) and suffix.isdigit() and int(suffix) != keep:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+@instrument("binary_snapshot.save", path_arg="filepath", io="write")
+def save_binary_snapshot(filepath: str, products: Iterable[Product], customers: Iterable[Customer],
+                         suppliers: Iterable[Supplier], orders: Iterable[Order],
+                         journal_seq: Optional[int] = None) -> None:
+    """Сохраняет магазин в новое поколение бинарного снимка.
+
+    Данные пишутся в файл <filepath>.<N+1> потоково: записи товаров сразу
+    в файл, строки — во временный файл, который затем дописывается после
+    индекса. Сам filepath — маленький указатель на текущее поколение,
+    он заменяется атомарно (os.replace). Отображённый в память файл
+    прежнего поколения при этом не переименовывается и не перезаписывается,
+    поэтому products можно читать из открытого снимка, а замена работает
+    и на Windows.
+
+    Raises:
+        SerializationError: если файл не удалось записать.
+    """
+    generation = (_current_generation(filepath) or 0) + 1
+    path = _generation_path(filepath, generation)
+    pointer_tmp = filepath + ".tmp"
+    try:
+        with open(path, "wb") as f, tempfile.TemporaryFile() as spool:
+            strings = _StringTable(spool)
+            hashes = array("I")
+            f.seek(_HEADER.size)
+            for p in products:
+                id_ref = strings.add(p.id)
+                f.write(_PRODUCT.pack(*id_ref, *strings.add(p.name), *strings.add(p.description),
+                                      *strings.add(p.category), float(p.price), int(p.stock)))
+                hashes.append(_hash(p.id.encode("utf-8")))
+            count = len(hashes)
+            slots = 1
+            while slots < 2 * count:
+                slots *= 2
+            table = array("I", bytes(_SLOT.size * slots))
+            mask = slots - 1
+            for n, h in enumerate(hashes):
+                i = h & mask
+                while table[i]:
+                    i = (i + 1) & mask
+                table[i] = n + 1
+            del hashes
+            if sys.byteorder != "little":
+                table.byteswap()
+            index_at = f.tell()
+            table.tofile(f)
+            del table
+            strings_at = f.tell()
+            spool.seek(0)
+            shutil.copyfileobj(spool, f)
+            rest_at = f.tell()
+            for section, objs in (("customers", customers), ("suppliers", suppliers), ("orders", orders)):
+                for obj in objs:
+                    f.write(json.dumps([section, store_record(section, obj)],
+                                       ensure_ascii=False).encode("utf-8"))
+                    f.write(b"\n")
+            end = f.tell()
+            f.seek(0)
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, count, slots, _HEADER.size, index_at,
+                                 strings_at, rest_at, end, -1 if journal_seq is None else journal_seq))
+            f.flush()
+            os.fsync(f.fileno())
+        with open(pointer_tmp, "w", encoding="utf-8") as f:
+            f.write(f"{generation}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pointer_tmp, filepath)
+    except OSError as e:
+        if os.path.exists(path):
+            os.remove(path)
+        raise SerializationError(str(e))
+    finally:
+        if os.path.exists(pointer_tmp):
+            os.remove(pointer_tmp)
+    _remove_stale_generations(filepath, generation)
+
+
+class BinarySnapshot:
+    """Открытый только для чтения бинарный снимок.
+
+    Raises:
+        FileNotFoundError: если файла нет.
+        SerializationError: если файл не является снимком или повреждён.
+    """
+
+    def __init__(self, filepath: str) -> None:
+        self.filepath = filepath
+        generation = _current_generation(filepath)
+        if generation is None:
+            raise FileNotFoundError(filepath)
+        path = _generation_path(filepath, generation)
+        with open(path, "rb") as f:
+            try:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # пустой файл
+                raise SerializationError(f"{path}: пустой файл снимка")
+        if len(self._mm) < _HEADER.size:
+            raise SerializationError(f"{path}: усечённый заголовок снимка")
+        (magic, version, self._count, self._slots, self._products_at, self._index_at,
+         self._strings_at, self._rest_at, end, seq) = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise SerializationError(f"{path}: неизвестный формат снимка")
+        if end != len(self._mm):
+            raise SerializationError(f"{path}: размер файла не совпадает с заголовком")
+        self.journal_seq: Optional[int] = None if seq < 0 else seq
+
+    def _str(self, offset: int, length: int) -> Optional[str]:
+        if length == _NONE:
+            return None
+        start = self._strings_at + offset
+        return self._mm[start:start + length].decode("utf-8")
+
+    def _decode(self, n: int) -> Product:
+        (id_off, id_len, name_off, name_len, desc_off, desc_len, cat_off, cat_len,
+         price, stock) = _PRODUCT.unpack_from(self._mm, self._products_at + n * _PRODUCT.size)
+        return Product(self._str(id_off, id_len), self._str(name_off, name_len),
+                       self._str(desc_off, desc_len), price, stock, self._str(cat_off, cat_len))
+
+    def _id_matches(self, n: int, key: bytes) -> bool:
+        off, length = struct.unpack_from("<QI", self._mm, self._products_at + n * _PRODUCT.size)
+        start = self._strings_at + off
+        return length == len(key) and self._mm[start:start + length] == key
+
+    def get(self, product_id: str) -> Optional[Product]:
+        """Декодирует товар по id или возвращает None; O(1) в среднем."""
+        if not self._count:
+            return None
+        key = product_id.encode("utf-8")
+        mask = self._slots - 1
+        i = _hash(key) & mask
+        while True:
+            (slot,) = _SLOT.unpack_from(self._mm, self._index_at + i * _SLOT.size)
+            if not slot:
+                return None
+            if self._id_matches(slot - 1, key):
+                return self._decode(slot - 1)
+            i = (i + 1) & mask
+
+    def __contains__(self, product_id: object) -> bool:
+        return isinstance(product_id, str) and self.get(product_id) is not None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def iter_products(self) -> Iterator[Product]:
+        """Декодирует все товары в порядке записи."""
+        for n in range(self._count):
+            yield self._decode(n)
+
+    def iter_store(self) -> Iterator[Tuple[str, Any]]:
+        """Пары (раздел, объект), как у iter_store_json; товары идут первыми."""
+        for p in self.iter_products():
+            yield "inventory", p
+        yield from self.iter_others()
+
+    def iter_others(self, sections: Iterable[str] = ("customers", "suppliers", "orders")
+                    ) -> Iterator[Tuple[str, Any]]:
+        """Как iter_store(), но без товаров — их можно читать лениво через get().
+
+        Строки незапрошенных разделов пропускаются без разбора JSON.
+        """
+        prefixes = tuple(f'["{name}"'.encode("utf-8") for name in sections)
+        pos = self._rest_at
+        end = len(self._mm)
+        while pos < end:
+            nl = self._mm.find(b"\n", pos, end)
+            if self._mm[pos:pos + 16].startswith(prefixes):
+                section, item = json.loads(self._mm[pos:nl])
+                yield section, store_object(section, item)
+            pos = nl + 1
+        if self.journal_seq is not None:
+            yield "journal_seq", self.journal_seq
+
+    def close(self) -> None:
+        self._mm.close()
@@ -0,0 +1,292 @@
+"""Дельта-сохранения JSON-снимка магазина.
+
+Вместо перезаписи всего data.json рядом с ним пишутся небольшие файлы
+data.json.delta.000001, data.json.delta.000002, ... — только изменённые
+записи. Формат дельты — JSON Lines: первая строка {"journal_seq": N},
+затем {"section": ..., "record": {...}} для новой или изменённой записи
+и {"section": "inventory", "deleted": id} для удалённого товара.
+
+При чтении базовый файл и дельты сливаются на лету (последняя запись
+с тем же ключом побеждает), а compact() в фоне переносит дельты в
+базовый файл и удаляет их.
+"""
+import glob
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from exceptions.store_exceptions import SerializationError
+from clasess.customer import Customer
+from clasess.order import Order
+from clasess.product import Product
+from clasess.supplier import Supplier
+from utils.metrics import instrument
+from utils.serializer import (STORE_SECTIONS, iter_store_json, save_store_json, store_key,
+                              store_object, store_record)
+
+DELTA_SUFFIX = ".delta."
+
+
+@dataclass
+class ChangeSet:
+    """Изменения магазина с момента последнего сохранения.
+
+    full=True означает, что изменения не отслеживались поштучно (массовый
+    импорт, перезагрузка) и нужен полный снимок.
+    """
+    products: Dict[str, Optional[Product]] = field(default_factory=dict)  # None — удалён
+    customers: Dict[str, Customer] = field(default_factory=dict)
+    suppliers: Dict[str, Supplier] = field(default_factory=dict)
+    orders: Dict[str, Order] = field(default_factory=dict)
+    full: bool = False
+
+    def customer(self, c: Customer) -> None:
+        self.customers[store_key("customers", c)] = c
+
+    def supplier(self, s: Supplier) -> None:
+        self.suppliers[s.name] = s
+
+    def order(self, o: Order) -> None:
+        self.orders[o.id] = o
+
+    def update(self, other: "ChangeSet") -> None:
+        """Добавляет изменения other (более новые побеждают)."""
+        self.products.update(other.products)
+        self.customers.update(other.customers)
+        self.suppliers.update(other.suppliers)
+        self.orders.update(other.orders)
+        self.full = self.full or other.full
+
+    def __len__(self) -> int:
+        return len(self.products) + len(self.customers) + len(self.suppliers) + len(self.orders)
+
+
+def _delta_number(path: str) -> int:
+    return int(path.rsplit(".", 1)[1])
+
+
+def _split_sections(records: Iterator[Tuple[str, Any]]) -> Dict[str, Iterator[Any]]:
+    """Делит поток (раздел, объект) на итераторы объектов по разделам.
+
+    Разделы в потоке идут в порядке STORE_SECTIONS, поэтому итераторы
+    нужно дочитывать в том же порядке (как это делает save_store_json).
+    Пара journal_seq пропускается.
+    """
+    ahead: List[Tuple[str, Any]] = []  # запись, прочитанная наперёд
+
+    def section(name: str) -> Iterator[Any]:
+        while True:
+            if not ahead:
+                try:
+                    ahead.append(next(records))
+                except StopIteration:
+                    return
+            current, obj = ahead[0]
+            if current == "journal_seq":
+                ahead.clear()
+                continue
+            if current != name:
+                return
+            ahead.clear()
+            yield obj
+
+    return {name: section(name) for name in STORE_SECTIONS}
+
+
+class DeltaStore:
+    """Базовый JSON-снимок плюс цепочка дельта-файлов.
+
+    Args:
+        base_path: путь к базовому снимку (data.json).
+        compact_after: сколько дельт копить, прежде чем maybe_compact()
+            запустит фоновое слияние.
+    """
+
+    def __init__(self, base_path: str, compact_after: int = 16) -> None:
+        self.base_path = base_path
+        self.compact_after = compact_after
+        self._lock = threading.Lock()
+        # Растёт при каждой полной перезаписи базы: компактизация, начатая
+        # до неё, не должна затереть более новый снимок.
+        self._generation = 0
+        existing = self.deltas()
+        self._next = _delta_number(existing[-1]) + 1 if existing else 1
+        self._compactor: Optional[threading.Thread] = None
+
+    def deltas(self) -> List[str]:
+        """Пути дельта-файлов в порядке записи."""
+        return sorted(glob.glob(glob.escape(self.base_path) + DELTA_SUFFIX + "[0-9]*"),
+                      key=_delta_number)
+
+    # ---------------------- запись ----------------------
+    @instrument("delta_store.write")
+    def write(self, changes: ChangeSet, journal_seq: Optional[int] = None) -> Optional[str]:
+        """Записывает изменения в новый дельта-файл и возвращает его путь.
+
+        Пустой набор изменений файла не создаёт.
+        """
+        if not changes:
+            return None
+        lines = [json.dumps({"journal_seq": journal_seq})]
+        for pid, p in changes.products.items():
+            lines.append(json.dumps({"section": "inventory", "deleted": pid} if p is None else
+                                    {"section": "inventory", "record": p.to_dict()},
+                                    ensure_ascii=False))
+        for section, objs in (("customers", changes.customers), ("suppliers", changes.suppliers),
+                              ("orders", changes.orders)):
+            for obj in objs.values():
+                lines.append(json.dumps({"section": section, "record": store_record(section, obj)},
+                                        ensure_ascii=False))
+        with self._lock:
+            path = f"{self.base_path}{DELTA_SUFFIX}{self._next:06d}"
+            self._next += 1
+            tmp_path = path + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, path)
+            except OSError as e:
+                raise SerializationError(str(e))
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        return path
+
+    def save_full(self, products: Iterable[Product], customers: Iterable[Customer],
+                  suppliers: Iterable[Supplier], orders: Iterable[Order],
+                  journal_seq: Optional[int] = None) -> None:
+        """Перезаписывает базовый снимок целиком и удаляет все дельты."""
+        with self._lock:
+            self._generation += 1
+            paths = self.deltas()
+            save_store_json(self.base_path, products, customers, suppliers, orders, journal_seq)
+            for path in paths:
+                os.remove(path)
+
+    # ---------------------- чтение ----------------------
+    @staticmethod
+    def _read_deltas(paths: List[str]) -> Tuple[Dict[str, Dict[str, Any]], Optional[int]]:
+        overrides: Dict[str, Dict[str, Any]] = {name: {} for name in STORE_SECTIONS}
+        seq = None
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                if header.get("journal_seq") is not None:
+                    seq = header["journal_seq"]
+                for line in f:
+                    if not line.strip():
+                        continue
+                    rec = json.loads(line)
+                    section = rec["section"]
+                    if "deleted" in rec:
+                        overrides[section][rec["deleted"]] = None
+                    else:
+                        obj = store_object(section, rec["record"])
+                        key = store_key(section, obj)
+                        # Перемещаем ключ в конец: новые записи выдаются в порядке появления.
+                        overrides[section].pop(key, None)
+                        overrides[section][key] = obj
+        return overrides, seq
+
+    def _journal_seq(self, paths: List[str]) -> Optional[int]:
+        """journal_seq, который выдаст iter_store(paths=paths): из последней
+        дельты, где он есть, иначе из базового снимка."""
+        seq = None
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+            if header.get("journal_seq") is not None:
+                seq = header["journal_seq"]
+        if seq is None:
+            for _, seq in iter_store_json(self.base_path, ()):
+                break
+        return seq
+
+    def iter_store(self, sections: Iterable[str] = STORE_SECTIONS,
+                   paths: Optional[List[str]] = None) -> Iterator[Tuple[str, Any]]:
+        """Читает базовый снимок с наложенными дельтами.
+
+        Выдаёт те же пары (раздел, объект), что и iter_store_json; новые
+        записи из дельт идут в конце своего раздела, а ("journal_seq", N)
+        выдаётся последним.
+
+        Raises:
+            FileNotFoundError: если базового снимка нет.
+        """
+        sections = list(sections)
+        overrides, delta_seq = self._read_deltas(self.deltas() if paths is None else paths)
+        base_seq = None
+        pending = [name for name in STORE_SECTIONS if name in sections]
+
+        def leftovers(upto: Optional[str]) -> Iterator[Tuple[str, Any]]:
+            while pending and pending[0] != upto:
+                name = pending.pop(0)
+                for obj in overrides[name].values():
+                    if obj is not None:
+                        yield name, obj
+
+        for section, obj in iter_store_json(self.base_path, sections):
+            if section == "journal_seq":
+                base_seq = obj
+                continue
+            yield from leftovers(section)
+            key = store_key(section, obj)
+            if key in overrides[section]:
+                obj = overrides[section].pop(key)
+                if obj is None:
+                    continue
+            yield section, obj
+        yield from leftovers(None)
+        seq = delta_seq if delta_seq is not None else base_seq
+        if seq is not None:
+            yield "journal_seq", seq
+
+    # ---------------------- компактизация ----------------------
+    @instrument("delta_store.compact")
+    def compact(self) -> int:
+        """Переносит накопленные дельты в базовый снимок.
+
+        Дельты, записанные во время компактизации, остаются и будут
+        наложены при следующем чтении.
+
+        Returns:
+            Количество слитых дельта-файлов.
+        """
+        with self._lock:
+            paths = self.deltas()
+            generation = self._generation
+        if not paths:
+            return 0
+        # Слитый поток пишется в новый снимок по мере чтения базы: в памяти
+        # держатся только записи из дельт. Снимок пишется рядом, не блокируя
+        # запись дельт, и подменяет базу только если за это время она не
+        # была перезаписана целиком.
+        merged = _split_sections(self.iter_store(STORE_SECTIONS, paths))
+        staged = self.base_path + ".compact"
+        save_store_json(staged, merged["inventory"], merged["customers"],
+                        merged["suppliers"], merged["orders"], self._journal_seq(paths))
+        with self._lock:
+            if generation != self._generation:
+                os.remove(staged)
+                return 0
+            os.replace(staged, self.base_path)
+            for path in paths:
+                os.remove(path)
+        return len(paths)
+
+    def maybe_compact(self) -> None:
+        """Запускает compact() в фоновом потоке, если дельт накопилось много."""
+        if len(self.deltas()) < self.compact_after:
+            return
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, name="delta-compactor", daemon=True)
+        self._compactor.start()
+
+    def wait(self) -> None:
+        """Дожидается завершения фоновой компактизации."""
+        if self._compactor is not None:
+            self._compactor.join()
@@ -0,0 +1,276 @@
+"""Параллельный импорт больших фидов товаров (CSV / JSONL).
+
+Файл делится на куски по числу записей (в CSV поле в кавычках может
+занимать несколько строк — кусок никогда не рвёт запись), куски
+разбираются и проверяются в пуле процессов, а готовые товары одним
+вызовом Inventory.merge_products попадают на склад с единственной
+перестройкой индексов. Ошибки возвращаются построчно как FeedRowError.
+
+Запуск из командной строки:
+    python -m utils.feed_import feed.csv --inventory inventory.json
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+from exceptions.store_exceptions import FeedRowError, SerializationError
+from clasess.inventory import Inventory
+from clasess.product import Product
+from utils.serializer import load_inventory_json, save_inventory_json
+
+DEFAULT_CHUNK_LINES = 50000
+
+
+@dataclass
+class FeedReport:
+    """Итог импорта фида."""
+    rows: int = 0
+    imported: int = 0
+    added: int = 0
+    updated: int = 0
+    errors: List[FeedRowError] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+# (начальное смещение в байтах, конечное смещение, номер первой строки)
+_Chunk = Tuple[int, int, int]
+
+
+def detect_format(filepath: str) -> str:
+    """Определяет формат фида по расширению файла."""
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext == ".csv":
+        return "csv"
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    raise SerializationError(f"Неизвестный формат фида: {filepath}")
+
+
+def _record_lines(f: BinaryIO, first: bytes) -> int:
+    """Сколько строк файла занимает запись CSV, начинающаяся строкой first.
+
+    Строку без кавычек не разбирает. Иначе дочитывает из f строки, пока
+    csv.reader не соберёт запись: поле в кавычках может содержать
+    переводы строк.
+    """
+    if b'"' not in first:
+        return 1
+    lines = [first]
+
+    def source() -> Iterator[str]:
+        yield first.decode("utf-8", "replace")
+        while True:
+            line = f.readline()
+            if not line:
+                return
+            lines.append(line)
+            yield line.decode("utf-8", "replace")
+
+    try:
+        next(csv.reader(source()), None)
+    except csv.Error:
+        pass  # ошибку покажет разбор куска
+    return len(lines)
+
+
+def _split(filepath: str, chunk_lines: int, skip_records: int, fmt: str) -> List[_Chunk]:
+    """Делит файл на куски по chunk_lines записей.
+
+    Для JSONL запись — строка. Для CSV граница куска всегда проходит
+    между записями, даже если поле в кавычках занимает несколько строк.
+    """
+    chunks: List[_Chunk] = []
+    with open(filepath, "rb") as f:
+
+        def records() -> Iterator[int]:
+            while True:
+                line = f.readline()
+                if not line:
+                    return
+                yield _record_lines(f, line) if fmt == "csv" else 1
+
+        lines = records()
+        line_no = 1
+        for _ in range(skip_records):
+            line_no += next(lines, 0)
+        start = f.tell()
+        first = line_no
+        count = 0
+        for n in lines:
+            count += 1
+            line_no += n
+            if count == chunk_lines:
+                end = f.tell()
+                chunks.append((start, end, first))
+                start, first, count = end, line_no, 0
+        end = f.tell()
+        if end > start:
+            chunks.append((start, end, first))
+    return chunks
+
+
+def _csv_rows(text: str, line_no: int,
+              errors: List[Tuple[int, str]]) -> Iterator[Tuple[int, List[str]]]:
+    """Записи CSV куска с номером строки, на которой каждая начинается.
+
+    Ошибка разбора (например, незакрытая кавычка) попадает в errors и
+    завершает кусок.
+    """
+    reader = csv.reader(io.StringIO(text, newline=""))
+    start = line_no
+    try:
+        for row in reader:
+            yield start, row
+            start = line_no + reader.line_num
+    except csv.Error as e:
+        errors.append((start, str(e)))
+
+
+def validate_record(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Проверяет и приводит типы полей записи фида.
+
+    Raises:
+        ValueError: с описанием первой найденной проблемы.
+    """
+    pid = str(raw.get("id") or "").strip()
+    if not pid:
+        raise ValueError("пустой id")
+    name = str(raw.get("name") or "").strip()
+    if not name:
+        raise ValueError("пустое название")
+    try:
+        price = float(raw.get("price"))
+    except (TypeError, ValueError):
+        raise ValueError(f"некорректная цена {raw.get('price')!r}")
+    if not price >= 0:
+        raise ValueError(f"отрицательная цена {price}")
+    try:
+        stock = int(raw.get("stock"))
+    except (TypeError, ValueError):
+        raise ValueError(f"некорректный остаток {raw.get('stock')!r}")
+    if stock < 0:
+        raise ValueError(f"отрицательный остаток {stock}")
+    category = raw.get("category") or None
+    return {"id": pid, "name": name, "description": str(raw.get("description") or ""),
+            "price": price, "stock": stock, "category": category}
+
+
+def _parse_chunk(filepath: str, fmt: str, header: Optional[List[str]],
+                 chunk: _Chunk) -> Tuple[List[Dict[str, Any]], List[Tuple[int, str]]]:
+    """Разбирает кусок фида в процессе-обработчике.
+
+    Возвращает проверенные записи и список (номер строки, ошибка).
+    """
+    start, end, line_no = chunk
+    with open(filepath, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8")
+    records: List[Dict[str, Any]] = []
+    errors: List[Tuple[int, str]] = []
+    rows: Iterator[Tuple[int, Any]]
+    if fmt == "csv":
+        rows = _csv_rows(text, line_no, errors)
+    else:
+        # split("\n"), а не splitlines(): номера строк должны совпадать с readline().
+        lines = [ln[:-1] if ln.endswith("\r") else ln for ln in text.split("\n")]
+        if lines and lines[-1] == "":
+            lines.pop()
+        rows = enumerate(lines, line_no)
+    for n, row in rows:
+        try:
+            if fmt == "csv":
+                if not row:
+                    continue
+                if len(row) != len(header):
+                    raise ValueError(f"ожидалось {len(header)} полей, получено {len(row)}")
+                raw = dict(zip(header, row))
+            else:
+                if not row.strip():
+                    continue
+                raw = json.loads(row)
+                if not isinstance(raw, dict):
+                    raise ValueError("строка не является JSON-объектом")
+            records.append(validate_record(raw))
+        except ValueError as e:
+            errors.append((n, str(e)))
+    return records, errors
+
+
+def import_feed(inventory: Inventory, filepath: str, fmt: Optional[str] = None,
+                workers: Optional[int] = None, chunk_lines: int = DEFAULT_CHUNK_LINES) -> FeedReport:
+    """Импортирует фид товаров в inventory, используя все ядра.
+
+    Существующие товары с тем же id заменяются. Ошибочные строки
+    пропускаются и попадают в отчёт.
+
+    Args:
+        inventory: склад, в который добавляются товары.
+        filepath: путь к CSV (с заголовком) или JSONL-файлу.
+        fmt: "csv" или "jsonl"; по умолчанию определяется по расширению.
+        workers: число процессов (по умолчанию — число ядер).
+        chunk_lines: сколько записей отдавать процессу за раз.
+
+    Raises:
+        SerializationError: если файл не читается или заголовок CSV неверен.
+    """
+    t0 = time.perf_counter()
+    fmt = fmt or detect_format(filepath)
+    header: Optional[List[str]] = None
+    try:
+        if fmt == "csv":
+            with open(filepath, "r", encoding="utf-8", newline="") as f:
+                header = [h.strip() for h in next(csv.reader(f), [])]
+            missing = {"id", "name", "price", "stock"} - set(header)
+            if missing:
+                raise SerializationError(f"В заголовке CSV нет полей: {', '.join(sorted(missing))}")
+        chunks = _split(filepath, chunk_lines, 1 if fmt == "csv" else 0, fmt)
+    except OSError as e:
+        raise SerializationError(str(e))
+
+    report = FeedReport()
+    products: List[Product] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_parse_chunk, filepath, fmt, header, c) for c in chunks]
+        for fut in futures:
+            records, errors = fut.result()
+            report.rows += len(records) + len(errors)
+            report.errors.extend(FeedRowError(n, msg) for n, msg in errors)
+            products.extend(Product.from_dict(r) for r in records)
+
+    for p in products:
+        if p.id in inventory.products:
+            report.updated += 1
+        else:
+            report.added += 1
+    report.imported = inventory.merge_products(products)
+    report.seconds = time.perf_counter() - t0
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Импорт фида товаров в inventory.json")
+    parser.add_argument("feed", help="CSV или JSONL файл с товарами")
+    parser.add_argument("--inventory", default="inventory.json", help="файл склада (JSON)")
+    parser.add_argument("--format", choices=["csv", "jsonl"])
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--chunk-lines", type=int, default=DEFAULT_CHUNK_LINES)
+    parser.add_argument("--max-errors", type=int, default=20, help="сколько ошибок напечатать")
+    args = parser.parse_args()
+
+    inv = load_inventory_json(args.inventory) if os.path.exists(args.inventory) else Inventory()
+    report = import_feed(inv, args.feed, args.format, args.workers, args.chunk_lines)
+    save_inventory_json(inv, args.inventory)
+    print(f"Строк: {report.rows}, импортировано: {report.imported} "
+          f"(новых {report.added}, обновлено {report.updated}), "
+          f"ошибок: {len(report.errors)}, {report.seconds:.2f} с")
+    for err in report.errors[:args.max_errors]:
+        print(f"  {err}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
 """Вспомогательные функции проекта."""
-import uuid
+from utils.ids import default_generator
 
 def generate_id(prefix: str = "") -> str:
-    """Генерирует короткий уникальный идентификатор с необязательным префиксом.
+    """Генерирует уникальный идентификатор с необязательным префиксом.
+
+    Идентификаторы возрастают по времени создания (см. utils.ids), поэтому
+    строки с одним префиксом сортируются в порядке появления.
 
     Args:
         prefix: строковый префикс, например 'o' для orders
@@ -10,4 +13,4 @@ def generate_id(prefix: str = "") -> str:
     Returns:
         Строка идентификатора.
     """
-    return f"{prefix}{uuid.uuid4().hex[:8]}"
+    return default_generator.next(prefix)
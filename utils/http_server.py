@@ -0,0 +1,298 @@
+"""Минимальный HTTP/1.1-сервер на asyncio для JSON API.
+
+Сервер построен на asyncio.Protocol: все запросы, уже лежащие в буфере
+соединения, разбираются и обрабатываются подряд, а ответы уходят одной
+записью в сокет, поэтому конвейерные (pipelined) запросы не ждут
+друг друга. Соединения по умолчанию keep-alive (HTTP/1.1) и
+закрываются после keepalive_timeout секунд простоя.
+
+Обработчик возвращает Response или awaitable с ним. Быстрые ответы
+(из памяти, из кэша) отдаются синхронно, без создания задачи; работу,
+которая может блокировать (диск, база, журнал), обработчик выносит в
+поток и возвращает корутину. Пока она выполняется, следующие запросы
+соединения ждут в буфере — ответы уходят в порядке запросов, — а
+другие соединения обслуживаются. Response хранит уже закодированные
+заголовки и тело, так что готовый ответ можно кэшировать и отдавать
+повторно без сериализации.
+"""
+import asyncio
+import inspect
+import json
+import logging
+import re
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Pattern, Tuple, Union
+from urllib.parse import parse_qs, unquote, urlsplit
+
+logger = logging.getLogger(__name__)
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+
+
+class HttpError(Exception):
+    """Ошибка, превращаемая в JSON-ответ {"error": message} с кодом status."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: Dict[str, str]
+    headers: Dict[str, str]
+    body: bytes = b""
+    params: Dict[str, str] = field(default_factory=dict)
+
+    def json(self) -> Any:
+        """Тело запроса как JSON.
+
+        Raises:
+            HttpError: 400, если тело не является корректным JSON.
+        """
+        try:
+            return json.loads(self.body or b"null")
+        except ValueError as e:
+            raise HttpError(400, f"Некорректный JSON: {e}")
+
+
+@dataclass(slots=True)
+class Response:
+    """Готовый ответ: закодированная строка статуса с заголовками и тело.
+
+    head не содержит заголовка Connection и завершающей пустой строки —
+    их добавляет сервер, поэтому один объект годится для любых соединений.
+    """
+    head: bytes
+    body: bytes
+
+    @classmethod
+    def json(cls, data: Any, status: int = 200) -> "Response":
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        reason = HTTPStatus(status).phrase
+        head = (f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n").encode("ascii")
+        return cls(head, body)
+
+    @classmethod
+    def text(cls, text: str, status: int = 200, content_type: str = "text/plain; charset=utf-8"
+             ) -> "Response":
+        body = text.encode("utf-8")
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n").encode("ascii")
+        return cls(head, body)
+
+
+Handler = Callable[[Request], Union[Response, Awaitable[Response]]]
+
+
+class Router:
+    """Сопоставляет метод и путь обработчику.
+
+    Шаблон пути может содержать параметры: "/products/{id}" — значение
+    попадает в request.params["id"].
+    """
+
+    def __init__(self) -> None:
+        self._exact: Dict[Tuple[str, str], Handler] = {}
+        self._patterns: List[Tuple[str, Pattern[str], Handler]] = []
+
+    def add(self, method: str, path: str, handler: Handler) -> None:
+        if "{" not in path:
+            self._exact[(method, path)] = handler
+            return
+        regex = re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", path)
+        self._patterns.append((method, re.compile(f"^{regex}$"), handler))
+
+    def route(self, method: str, path: str) -> Callable[[Handler], Handler]:
+        def decorator(handler: Handler) -> Handler:
+            self.add(method, path, handler)
+            return handler
+        return decorator
+
+    def dispatch(self, request: Request) -> Union[Response, Awaitable[Response]]:
+        handler = self._exact.get((request.method, request.path))
+        if handler is None:
+            allowed = False
+            for method, pattern, h in self._patterns:
+                m = pattern.match(request.path)
+                if m is None:
+                    continue
+                if method != request.method:
+                    allowed = True
+                    continue
+                request.params = {k: unquote(v) for k, v in m.groupdict().items()}
+                handler = h
+                break
+            else:
+                allowed = allowed or any(path == request.path for _, path in self._exact)
+                raise HttpError(405 if allowed else 404,
+                                "Метод не поддерживается" if allowed else "Не найдено")
+        return handler(request)
+
+
+class _HttpProtocol(asyncio.Protocol):
+    def __init__(self, router: Router, keepalive_timeout: float) -> None:
+        self.router = router
+        self.keepalive_timeout = keepalive_timeout
+        self.transport: Optional[asyncio.Transport] = None
+        self._buffer = bytearray()
+        self._idle: Optional[asyncio.TimerHandle] = None
+        # Ожидаемый асинхронный ответ; пока он есть, запросы копятся в буфере.
+        self._pending: Optional[asyncio.Task] = None
+        self._write_paused = False
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore[assignment]
+        self._reset_idle()
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        if self._idle is not None:
+            self._idle.cancel()
+        if self._pending is not None:
+            self._pending.cancel()
+        self.transport = None
+
+    def _reset_idle(self) -> None:
+        if self._idle is not None:
+            self._idle.cancel()
+        loop = asyncio.get_running_loop()
+        self._idle = loop.call_later(self.keepalive_timeout, self._close)
+
+    def _close(self) -> None:
+        if self.transport is not None:
+            self.transport.close()
+
+    # Если клиент не читает ответы или ждёт асинхронного ответа, перестаём
+    # читать его запросы.
+    def _update_reading(self) -> None:
+        if self.transport is None:
+            return
+        if self._write_paused or self._pending is not None:
+            self.transport.pause_reading()
+        else:
+            self.transport.resume_reading()
+
+    def pause_writing(self) -> None:
+        self._write_paused = True
+        self._update_reading()
+
+    def resume_writing(self) -> None:
+        self._write_paused = False
+        self._update_reading()
+
+    def data_received(self, data: bytes) -> None:
+        self._buffer += data
+        self._reset_idle()
+        if self._pending is None:
+            self._process()
+
+    @staticmethod
+    def _error(request: Request, exc: Exception) -> Response:
+        if isinstance(exc, HttpError):
+            return Response.json({"error": exc.message}, exc.status)
+        logger.error("Ошибка обработки %s %s", request.method, request.path, exc_info=exc)
+        return Response.json({"error": "Внутренняя ошибка сервера"}, 500)
+
+    @staticmethod
+    def _frame(response: Response, keep_alive: bool) -> Tuple[bytes, bytes, bytes]:
+        return (response.head,
+                b"Connection: keep-alive\r\n\r\n" if keep_alive else b"Connection: close\r\n\r\n",
+                response.body)
+
+    def _process(self) -> None:
+        """Отвечает на запросы из буфера, пока не встретит асинхронный ответ."""
+        out: List[bytes] = []
+        keep_alive = True
+        while keep_alive:
+            parsed = self._next_request()
+            if parsed is None:
+                break
+            request, keep_alive = parsed
+            if isinstance(request, Response):
+                response = request
+            else:
+                try:
+                    response = self.router.dispatch(request)
+                except Exception as e:
+                    response = self._error(request, e)
+                if inspect.isawaitable(response):
+                    self._write(out)
+                    self._pending = asyncio.ensure_future(self._finish(request, response, keep_alive))
+                    self._update_reading()
+                    return
+            out += self._frame(response, keep_alive)
+        self._write(out)
+        if not keep_alive:
+            self._buffer.clear()
+            self._close()
+
+    async def _finish(self, request: Request, awaitable: Awaitable[Response], keep_alive: bool) -> None:
+        try:
+            response = await awaitable
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            response = self._error(request, e)
+        self._pending = None
+        if self.transport is None:
+            return
+        self._write(list(self._frame(response, keep_alive)))
+        self._reset_idle()
+        self._update_reading()
+        if keep_alive:
+            self._process()
+        else:
+            self._buffer.clear()
+            self._close()
+
+    def _write(self, out: List[bytes]) -> None:
+        if out and self.transport is not None:
+            self.transport.write(b"".join(out))
+
+    def _next_request(self) -> Optional[Tuple[Any, bool]]:
+        """Разбирает очередной полный запрос из буфера.
+
+        Возвращает (Request, keep_alive), (Response с ошибкой, False) или
+        None, если запрос ещё не пришёл целиком.
+        """
+        end = self._buffer.find(b"\r\n\r\n")
+        if end < 0:
+            if len(self._buffer) > MAX_HEADER_BYTES:
+                return Response.json({"error": "Слишком большие заголовки"}, 431), False
+            return None
+        try:
+            lines = bytes(self._buffer[:end]).decode("latin-1").split("\r\n")
+            method, target, version = lines[0].split(" ")
+            headers = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            return Response.json({"error": "Некорректный запрос"}, 400), False
+        if "chunked" in headers.get("transfer-encoding", ""):
+            return Response.json({"error": "chunked не поддерживается"}, 501), False
+        if length > MAX_BODY_BYTES:
+            return Response.json({"error": "Слишком большое тело запроса"}, 413), False
+        if len(self._buffer) < end + 4 + length:
+            return None
+        body = bytes(self._buffer[end + 4:end + 4 + length])
+        del self._buffer[:end + 4 + length]
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        url = urlsplit(target)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        return Request(method, unquote(url.path), query, headers, body), keep_alive
+
+
+async def serve(router: Router, host: str = "127.0.0.1", port: int = 8080,
+                keepalive_timeout: float = 15.0) -> asyncio.AbstractServer:
+    """Запускает сервер и возвращает его (останавливается через close())."""
+    loop = asyncio.get_running_loop()
+    return await loop.create_server(lambda: _HttpProtocol(router, keepalive_timeout), host, port)
@@ -0,0 +1,98 @@
+"""Монотонные сортируемые идентификаторы (в духе ULID/Snowflake).
+
+Идентификатор — 80 бит, записанные 16 символами base32 Крокфорда в
+нижнем регистре (алфавит упорядочен так же, как значения):
+
+    10 символов  время в миллисекундах от эпохи Unix (50 бит);
+     3 символа   номер узла (15 бит) — свой у каждого процесса;
+     3 символа   счётчик внутри миллисекунды (15 бит).
+
+Поэтому строки идентификаторов одного префикса сортируются по времени
+создания, а внутри процесса строго возрастают, даже если системные
+часы идут назад: время тогда берётся не меньше последнего выданного.
+Переполнение счётчика занимает следующую миллисекунду.
+"""
+import os
+import secrets
+import threading
+import time
+from typing import Optional
+
+ALPHABET = "0123456789abcdefghjkmnpqrstvwxyz"
+ID_LENGTH = 16
+NODE_BITS = 15
+SEQ_BITS = 15
+_SEQ_MAX = (1 << SEQ_BITS) - 1
+
+
+def _encode(value: int, width: int) -> str:
+    chars = []
+    for _ in range(width):
+        chars.append(ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+# Счётчик кодируется поиском в таблице, а не делением на каждом вызове.
+_SEQ_CHARS = [_encode(s, 3) for s in range(_SEQ_MAX + 1)]
+
+
+def _default_node() -> int:
+    """Номер узла из переменной STORE_NODE_ID или случайный."""
+    env = os.environ.get("STORE_NODE_ID")
+    if env:
+        return int(env) & ((1 << NODE_BITS) - 1)
+    return secrets.randbits(NODE_BITS)
+
+
+class IdGenerator:
+    """Потокобезопасный генератор монотонных идентификаторов.
+
+    Args:
+        node: номер узла (0..32767); по умолчанию — STORE_NODE_ID или
+            случайный. После fork дочерний процесс получает новый
+            случайный номер, если node не задан явно.
+    """
+
+    def __init__(self, node: Optional[int] = None) -> None:
+        if node is not None and not 0 <= node < (1 << NODE_BITS):
+            raise ValueError(f"Номер узла должен быть в диапазоне 0..{(1 << NODE_BITS) - 1}")
+        self._fixed_node = node is not None
+        self._lock = threading.Lock()
+        self._reset(node if node is not None else _default_node())
+
+    def _reset(self, node: int) -> None:
+        self.node = node
+        self._node_chars = _encode(node, 3)
+        self._last_ms = 0
+        self._seq = 0
+        self._head = ""  # время и узел для _last_ms, уже закодированные
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+        self._reset(self.node if self._fixed_node else secrets.randbits(NODE_BITS))
+
+    def _reserve(self) -> str:
+        """Выдаёт следующий идентификатор без префикса (под _lock)."""
+        now = time.time_ns() // 1_000_000
+        if now > self._last_ms:
+            self._last_ms, self._seq = now, 0
+            self._head = ""
+        else:
+            self._seq += 1
+            if self._seq > _SEQ_MAX:
+                self._last_ms, self._seq = self._last_ms + 1, 0
+                self._head = ""
+        if not self._head:
+            self._head = _encode(self._last_ms, 10) + self._node_chars
+        return self._head + _SEQ_CHARS[self._seq]
+
+    def next(self, prefix: str = "") -> str:
+        """Следующий идентификатор с префиксом."""
+        with self._lock:
+            return prefix + self._reserve()
+
+
+default_generator = IdGenerator()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=default_generator._after_fork)
@@ -0,0 +1,185 @@
+"""Журнал изменений (write-ahead log) магазина.
+
+Каждое изменение состояния записывается компактной JSON-строкой в
+append-only файл. Записи копятся в буфере и сбрасываются на диск с fsync
+пачками (group commit): при заполнении пачки, по таймеру или явным
+вызовом sync(). Каждая запись получает возрастающий номер seq; снимок
+хранит seq последней учтённой записи, поэтому при старте повторно
+применяются только более новые записи, а после снимка журнал обрезается.
+
+Снимок по порогу snapshot_every делает фоновый поток сброса, а не
+append(): запись, перешагнувшая порог, лишь будит этот поток.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from exceptions.store_exceptions import SerializationError
+
+logger = logging.getLogger(__name__)
+
+class Journal:
+    """Append-only журнал изменений с групповой фиксацией.
+
+    Args:
+        filepath: путь к файлу журнала.
+        batch_size: сколько записей копить до принудительного fsync.
+        sync_interval: максимальная задержка (сек) перед fsync записей.
+        snapshot_every: после стольких записей фоновый поток вызывает
+            on_snapshot (без фонового потока, при sync_interval <= 0, —
+            сама append()).
+        on_snapshot: функция, сохраняющая полный снимок состояния; после
+            неё журнал обрезается (compaction).
+    """
+
+    def __init__(self, filepath: str, batch_size: int = 64, sync_interval: float = 0.5,
+                 snapshot_every: int = 10000,
+                 on_snapshot: Optional[Callable[[], None]] = None) -> None:
+        self.filepath = filepath
+        self.batch_size = batch_size
+        self.sync_interval = sync_interval
+        self.snapshot_every = snapshot_every
+        self.on_snapshot = on_snapshot
+        self.seq = 0
+        self._since_snapshot = 0
+        self._pending: List[str] = []
+        self._lock = threading.RLock()
+        self._in_snapshot = False
+        self._checkpoint_due = False
+        self._f = None
+        self._closed = threading.Event()
+        self._wakeup = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    # ---------------------- чтение ----------------------
+    def replay(self, after_seq: int = 0) -> Iterator[Dict[str, Any]]:
+        """Выдаёт записи журнала с seq > after_seq в порядке записи.
+
+        Оборванная последняя строка (сбой посреди записи) отбрасывается
+        и отрезается от файла. Номер seq журнала продолжается с последней
+        прочитанной записи.
+        """
+        self.seq = max(self.seq, after_seq)
+        try:
+            f = open(self.filepath, "r+b")
+        except FileNotFoundError:
+            return
+        with f:
+            good_end = 0
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                try:
+                    rec = json.loads(raw)
+                except ValueError:
+                    break
+                good_end += len(raw)
+                self.seq = max(self.seq, rec["seq"])
+                if rec["seq"] > after_seq:
+                    self._since_snapshot += 1
+                    yield rec
+            f.seek(0, os.SEEK_END)
+            if f.tell() != good_end:
+                f.truncate(good_end)
+
+    # ---------------------- запись ----------------------
+    def open(self) -> None:
+        """Открывает файл на дозапись и запускает фоновый сброс буфера."""
+        with self._lock:
+            if self._f is None:
+                self._f = open(self.filepath, "a", encoding="utf-8")
+                self._closed.clear()
+            if self._flusher is None and self.sync_interval > 0:
+                self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            self._wakeup.wait(self.sync_interval)
+            self._wakeup.clear()
+            if self._closed.is_set():
+                return
+            try:
+                if self._checkpoint_due:
+                    self.checkpoint()
+                else:
+                    self.sync()
+            except Exception:
+                # Поток не должен умирать: запись повторится на следующем шаге.
+                logger.exception("Ошибка фонового сброса журнала %s", self.filepath)
+
+    def append(self, op: str, **fields: Any) -> int:
+        """Добавляет запись в журнал и возвращает её seq."""
+        with self._lock:
+            if self._f is None:
+                self.open()
+            self.seq += 1
+            rec = {"seq": self.seq, "op": op}
+            rec.update(fields)
+            self._pending.append(json.dumps(rec, ensure_ascii=False, separators=(",", ":")))
+            self._since_snapshot += 1
+            if len(self._pending) >= self.batch_size:
+                self.sync()
+            if (self.on_snapshot and not self._in_snapshot and not self._checkpoint_due
+                    and self._since_snapshot >= self.snapshot_every):
+                if self._flusher is not None:
+                    self._checkpoint_due = True
+                    self._wakeup.set()
+                else:
+                    self.checkpoint()
+            return self.seq
+
+    def sync(self) -> None:
+        """Сбрасывает накопленные записи на диск одним write + fsync."""
+        with self._lock:
+            if not self._pending or self._f is None:
+                return
+            try:
+                self._f.write("\n".join(self._pending) + "\n")
+                self._f.flush()
+                os.fsync(self._f.fileno())
+            except OSError as e:
+                raise SerializationError(f"Не удалось записать журнал: {e}")
+            self._pending.clear()
+
+    def checkpoint(self) -> None:
+        """Сохраняет снимок через on_snapshot и обрезает журнал."""
+        with self._lock:
+            self._in_snapshot = True
+            self._checkpoint_due = False
+            try:
+                self.sync()
+                if self.on_snapshot:
+                    self.on_snapshot()
+                self.compact()
+            finally:
+                self._in_snapshot = False
+
+    def compact(self) -> None:
+        """Очищает журнал: все записи уже учтены в сохранённом снимке."""
+        with self._lock:
+            self._pending.clear()
+            if self._f is not None:
+                self._f.truncate(0)
+                self._f.seek(0)
+            elif os.path.exists(self.filepath):
+                open(self.filepath, "w").close()
+            self._since_snapshot = 0
+
+    def close(self) -> None:
+        """Сбрасывает буфер, останавливает фоновый поток и закрывает файл."""
+        self._closed.set()
+        self._wakeup.set()
+        with self._lock:
+            self.sync()
+            if self._f is not None:
+                self._f.close()
+                self._f = None
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+
+    def __len__(self) -> int:
+        """Количество записей с момента последнего снимка."""
+        return self._since_snapshot
@@ -0,0 +1,144 @@
+"""Потоковое чтение больших JSON-файлов без загрузки всего документа в память.
+
+Файл читается блоками, а элементы нужных массивов декодируются по одному
+через json.JSONDecoder.raw_decode. Ненужные массивы пропускаются поэлементно,
+поэтому расход памяти ограничен размером одной записи и буфера чтения.
+"""
+import json
+from typing import IO, Any, Iterable, Iterator, Optional, Set, Tuple
+from exceptions.store_exceptions import SerializationError
+
+Path = Tuple[str, ...]
+
+_WHITESPACE = " \t\n\r"
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class _JsonStream:
+    """Буферизованный курсор по текстовому потоку JSON."""
+
+    def __init__(self, f: IO[str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        self._f = f
+        self._chunk_size = chunk_size
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self, size: Optional[int] = None) -> bool:
+        """Дочитывает очередной блок, отбрасывая уже разобранную часть буфера."""
+        if self._eof:
+            return False
+        chunk = self._f.read(size or self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Возвращает следующий значимый символ (или "" в конце файла)."""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        got = self.peek()
+        if got != ch:
+            raise SerializationError(f"Ожидался символ {ch!r}, получен {got!r}")
+        self._pos += 1
+
+    def decode(self) -> Any:
+        """Декодирует одно JSON-значение с текущей позиции.
+
+        Значение считается завершённым, только если за ним в буфере есть
+        ещё хотя бы один символ (или достигнут конец файла) — иначе число
+        вроде 12 на границе блока могло бы оказаться началом 1234.
+        """
+        self.peek()
+        size = self._chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self._eof:
+                    raise SerializationError(str(e))
+            # Запись не поместилась в буфер: читаем блоками всё большего размера.
+            self._fill(size)
+            size *= 2
+
+
+def _iter_value(stream: _JsonStream, path: Path, wanted: Set[Path],
+                prefixes: Set[Path]) -> Iterator[Tuple[Path, Any]]:
+    """Обходит значение по пути path, выдавая элементы массивов из wanted."""
+    ch = stream.peek()
+    if ch == "[" and (path in wanted or path in prefixes):
+        stream.expect("[")
+        if stream.peek() == "]":
+            stream.expect("]")
+            return
+        while True:
+            if path in wanted:
+                yield path, stream.decode()
+            else:
+                stream.decode()
+            if stream.peek() == ",":
+                stream.expect(",")
+                continue
+            stream.expect("]")
+            return
+    elif ch == "{" and path in prefixes:
+        stream.expect("{")
+        if stream.peek() == "}":
+            stream.expect("}")
+            return
+        while True:
+            key = stream.decode()
+            stream.expect(":")
+            yield from _iter_value(stream, path + (key,), wanted, prefixes)
+            if stream.peek() == ",":
+                stream.expect(",")
+                continue
+            stream.expect("}")
+            return
+    elif path in wanted:
+        yield path, stream.decode()
+    elif ch == "[":
+        # Ненужный массив пропускаем поэлементно, не собирая его целиком.
+        yield from _iter_value(stream, path, set(), {path})
+    else:
+        stream.decode()
+
+
+def iter_json_items(filepath: str, paths: Iterable[Path],
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[Path, Any]]:
+    """Лениво выдаёт элементы массивов JSON-документа по указанным путям.
+
+    Если по пути лежит не массив, а скалярное значение или объект,
+    выдаётся само это значение.
+
+    Args:
+        filepath: путь к JSON-файлу.
+        paths: пути к массивам, например ("inventory", "products") или ("orders",).
+        chunk_size: размер блока чтения в символах.
+
+    Yields:
+        Пары (путь, элемент) в порядке следования в файле.
+
+    Raises:
+        FileNotFoundError: если файла нет.
+        SerializationError: если документ повреждён.
+    """
+    wanted = {tuple(p) for p in paths}
+    prefixes = {p[:i] for p in wanted for i in range(len(p))}
+    with open(filepath, "r", encoding="utf-8") as f:
+        stream = _JsonStream(f, chunk_size)
+        yield from _iter_value(stream, (), wanted, prefixes)
@@ -0,0 +1,294 @@
+"""Необязательная инструментация горячих путей магазина.
+
+Декоратор instrument() считает вызовы, строит гистограмму задержек,
+считает ошибки по типу исключения и, для функций чтения/записи файлов,
+прочитанные и записанные байты. Пока сбор выключен, обёртка только
+проверяет один флаг и вызывает исходную функцию.
+
+Сбор включается вызовом enable() или переменной окружения
+STORE_METRICS=1. Данные доступны через stats(), to_prometheus() и dump().
+
+Кроме того, модули могут зарегистрировать gauge-метрики
+(register_gauge): их значения вычисляются только при выводе, поэтому
+ничего не стоят на горячих путях.
+"""
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Верхние границы корзин гистограммы задержек, секунды.
+BUCKETS: Tuple[float, ...] = (
+    1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0,
+)
+
+
+class _OpStats:
+    __slots__ = ("calls", "errors", "buckets", "total", "max", "bytes_read", "bytes_written")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors: Dict[str, int] = {}
+        self.buckets = [0] * (len(BUCKETS) + 1)  # последняя — +Inf
+        self.total = 0.0
+        self.max = 0.0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+
+class _Registry:
+    def __init__(self) -> None:
+        self.ops: Dict[str, _OpStats] = {}
+        self.lock = threading.Lock()
+
+    def _op(self, name: str) -> _OpStats:
+        op = self.ops.get(name)
+        if op is None:
+            op = self.ops.setdefault(name, _OpStats())
+        return op
+
+    def observe(self, name: str, seconds: float, error: Optional[BaseException] = None) -> None:
+        with self.lock:
+            op = self._op(name)
+            op.calls += 1
+            op.total += seconds
+            if seconds > op.max:
+                op.max = seconds
+            op.buckets[bisect_left(BUCKETS, seconds)] += 1
+            if error is not None:
+                kind = type(error).__name__
+                op.errors[kind] = op.errors.get(kind, 0) + 1
+
+    def add_bytes(self, name: str, read: int = 0, written: int = 0) -> None:
+        with self.lock:
+            op = self._op(name)
+            op.bytes_read += read
+            op.bytes_written += written
+
+
+_registry = _Registry()
+# Модульная переменная, а не атрибут: в выключенном состоянии обёртка
+# тратит на проверку одно чтение глобального имени.
+_enabled = os.environ.get("STORE_METRICS", "") not in ("", "0")
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    """Обнуляет все собранные данные."""
+    with _registry.lock:
+        _registry.ops.clear()
+
+
+def add_bytes(name: str, read: int = 0, written: int = 0) -> None:
+    """Учитывает байты, прочитанные или записанные операцией name."""
+    if _enabled:
+        _registry.add_bytes(name, read, written)
+
+
+# имя -> (описание, функция значений, имя метки)
+_gauges: Dict[str, Tuple[str, Callable[[], Dict[str, float]], str]] = {}
+
+
+def register_gauge(name: str, help_text: str, collect: Callable[[], Dict[str, float]],
+                   label: str = "") -> None:
+    """Регистрирует gauge-метрику (повторная регистрация заменяет прежнюю).
+
+    Args:
+        name: имя метрики Prometheus.
+        help_text: описание для строки # HELP.
+        collect: возвращает значения по значению метки; без метки —
+            словарь с единственным ключом "".
+        label: имя метки, например "product".
+    """
+    _gauges[name] = (help_text, collect, label)
+
+
+def unregister_gauge(name: str) -> None:
+    _gauges.pop(name, None)
+
+
+def gauges() -> Dict[str, Dict[str, float]]:
+    """Текущие значения всех gauge-метрик."""
+    return {name: dict(collect()) for name, (_, collect, _) in sorted(_gauges.items())}
+
+
+def _file_size(path: Any) -> int:
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError):
+        return 0
+
+
+def instrument(name: str, path_arg: Optional[str] = None, io: Optional[str] = None) -> Callable[[F], F]:
+    """Декоратор, собирающий метрики вызовов функции под именем name.
+
+    Args:
+        name: имя операции в метриках, например "inventory.reserve".
+        path_arg: имя параметра с путём к файлу; вместе с io включает
+            учёт байтов по размеру файла.
+        io: "read" — файл читается (размер берётся до вызова),
+            "write" — файл пишется (размер берётся после вызова).
+
+    Поддерживаются обычные функции, генераторы (время считается за всю
+    итерацию) и корутины.
+    """
+    def decorator(fn: F) -> F:
+        signature = inspect.signature(fn) if path_arg else None
+
+        def path_of(args: tuple, kwargs: dict) -> Any:
+            return signature.bind(*args, **kwargs).arguments.get(path_arg)
+
+        def before(args: tuple, kwargs: dict) -> None:
+            if io == "read":
+                _registry.add_bytes(name, read=_file_size(path_of(args, kwargs)))
+
+        def after(args: tuple, kwargs: dict) -> None:
+            if io == "write":
+                _registry.add_bytes(name, written=_file_size(path_of(args, kwargs)))
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await fn(*args, **kwargs)
+                before(args, kwargs)
+                t0 = time.perf_counter()
+                try:
+                    result = await fn(*args, **kwargs)
+                except BaseException as e:
+                    _registry.observe(name, time.perf_counter() - t0, e)
+                    raise
+                _registry.observe(name, time.perf_counter() - t0)
+                after(args, kwargs)
+                return result
+            return async_wrapper  # type: ignore[return-value]
+
+        if inspect.isgeneratorfunction(fn):
+            def timed(gen, args: tuple, kwargs: dict):
+                before(args, kwargs)
+                t0 = time.perf_counter()
+                try:
+                    yield from gen
+                except GeneratorExit:
+                    # Итерацию прервали досрочно — это не ошибка.
+                    _registry.observe(name, time.perf_counter() - t0)
+                    raise
+                except BaseException as e:
+                    _registry.observe(name, time.perf_counter() - t0, e)
+                    raise
+                _registry.observe(name, time.perf_counter() - t0)
+                after(args, kwargs)
+
+            @functools.wraps(fn)
+            def gen_wrapper(*args, **kwargs):
+                gen = fn(*args, **kwargs)
+                if not _enabled:
+                    return gen
+                return timed(gen, args, kwargs)
+            return gen_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            before(args, kwargs)
+            t0 = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                _registry.observe(name, time.perf_counter() - t0, e)
+                raise
+            _registry.observe(name, time.perf_counter() - t0)
+            after(args, kwargs)
+            return result
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+
+# ---------------------- вывод ----------------------
+def stats() -> Dict[str, Dict[str, Any]]:
+    """Снимок собранных метрик: операция -> показатели."""
+    result: Dict[str, Dict[str, Any]] = {}
+    with _registry.lock:
+        for name, op in sorted(_registry.ops.items()):
+            result[name] = {
+                "calls": op.calls,
+                "errors": dict(op.errors),
+                "seconds_total": op.total,
+                "seconds_avg": op.total / op.calls if op.calls else 0.0,
+                "seconds_max": op.max,
+                "histogram": {**{str(le): n for le, n in zip(BUCKETS, op.buckets)},
+                              "+Inf": op.buckets[-1]},
+                "bytes_read": op.bytes_read,
+                "bytes_written": op.bytes_written,
+            }
+    return result
+
+
+def to_prometheus() -> str:
+    """Метрики в текстовом формате Prometheus."""
+    lines: List[str] = [
+        "# HELP store_calls_total Number of calls per operation.",
+        "# TYPE store_calls_total counter",
+    ]
+    data = stats()
+    for name, s in data.items():
+        lines.append(f'store_calls_total{{op="{name}"}} {s["calls"]}')
+    lines += ["# HELP store_errors_total Failed calls per operation and exception type.",
+              "# TYPE store_errors_total counter"]
+    for name, s in data.items():
+        for kind, n in sorted(s["errors"].items()):
+            lines.append(f'store_errors_total{{op="{name}",type="{kind}"}} {n}')
+    lines += ["# HELP store_call_duration_seconds Call latency per operation.",
+              "# TYPE store_call_duration_seconds histogram"]
+    for name, s in data.items():
+        cumulative = 0
+        for le, n in s["histogram"].items():
+            cumulative += n
+            lines.append(f'store_call_duration_seconds_bucket{{op="{name}",le="{le}"}} {cumulative}')
+        lines.append(f'store_call_duration_seconds_sum{{op="{name}"}} {s["seconds_total"]}')
+        lines.append(f'store_call_duration_seconds_count{{op="{name}"}} {s["calls"]}')
+    lines += ["# HELP store_io_bytes_total Bytes read or written per operation.",
+              "# TYPE store_io_bytes_total counter"]
+    for name, s in data.items():
+        if s["bytes_read"]:
+            lines.append(f'store_io_bytes_total{{op="{name}",direction="read"}} {s["bytes_read"]}')
+        if s["bytes_written"]:
+            lines.append(f'store_io_bytes_total{{op="{name}",direction="write"}} {s["bytes_written"]}')
+    for name, (help_text, collect, label) in sorted(_gauges.items()):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        for key, value in sorted(collect().items()):
+            if label:
+                key = key.replace("\\", "\\\\").replace('"', '\\"')
+                lines.append(f'{name}{{{label}="{key}"}} {value}')
+            else:
+                lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def dump(filepath: str, fmt: str = "prometheus") -> None:
+    """Записывает метрики в файл: fmt = "prometheus" или "json"."""
+    with open(filepath, "w", encoding="utf-8") as f:
+        if fmt == "json":
+            json.dump(stats(), f, ensure_ascii=False, indent=2)
+        else:
+            f.write(to_prometheus())
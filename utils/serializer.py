@@ -1,69 +1,326 @@
-"""Сериализация и десериализация инвентаря в JSON и XML."""
+"""Сериализация и десериализация инвентаря и магазина в JSON и XML."""
+import io
 import json
-import xml.etree.ElementTree as ET
-from typing import Dict
+import os
+from datetime import datetime
+from typing import IO, Any, Dict, Iterable, Iterator, Optional, Tuple
 from exceptions.store_exceptions import SerializationError
 from clasess.inventory import Inventory
+from clasess.product import Product
+from clasess.customer import Customer
+from clasess.customer_registry import CustomerRegistry
+from clasess.supplier import Supplier
+from clasess.order import Order
+from clasess.order_item import OrderItem
+from utils.json_stream import iter_json_items
+from utils.metrics import instrument
+from utils.xml_stream import (XmlStreamWriter, iter_xml_elements, read_root_attrib, record,
+                              xml_stream_writer)
 
+def _write_atomic(filepath: str, data: bytes) -> None:
+    """Записывает data во временный файл и атомарно заменяет им filepath."""
+    tmp_path = filepath + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def inventory_json_bytes(inv: Inventory) -> bytes:
+    """JSON-представление склада; кэшируется до следующего изменения склада."""
+    return inv.cached("json", lambda: json.dumps(inv.to_dict(), ensure_ascii=False,
+                                                 indent=2).encode("utf-8"))
+
+@instrument("serializer.save_inventory_json", path_arg="filepath", io="write")
 def save_inventory_json(inv: Inventory, filepath: str) -> None:
     """Сохраняет Inventory в JSON файл."""
     try:
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(inv.to_dict(), f, ensure_ascii=False, indent=2)
+        _write_atomic(filepath, inventory_json_bytes(inv))
     except Exception as e:
         raise SerializationError(str(e))
 
+@instrument("serializer.load_inventory_json", path_arg="filepath", io="read")
 def load_inventory_json(filepath: str) -> Inventory:
-    """Загружает Inventory из JSON файл."""
+    """Загружает Inventory из JSON файл.
+
+    Товары читаются потоково и добавляются в Inventory по мере разбора,
+    без построения промежуточного словаря со всем документом.
+    """
+    inv = Inventory()
     try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        inv.load_products(item for _, item in iter_json_items(filepath, [("products",)]))
+    except SerializationError:
+        raise
     except Exception as e:
         raise SerializationError(str(e))
-    inv = Inventory()
-    inv.from_dict(data)
     return inv
 
+def inventory_xml_bytes(inv: Inventory) -> bytes:
+    """XML-представление склада; кэшируется до следующего изменения склада.
+
+    Как и Inventory.to_dict(), читает согласованный срез inv.snapshot().
+    """
+    def build() -> bytes:
+        buf = io.StringIO()
+        buf.write("<?xml version='1.0' encoding='utf-8'?>\n")
+        w = XmlStreamWriter(buf)
+        w.start("store")
+        w.start("products")
+        with inv.snapshot() as view:
+            for p in view:
+                w.element(record("product", [
+                    ("name", p.name), ("description", p.description),
+                    ("price", str(p.price)), ("stock", str(p.stock)),
+                    ("category", p.category or "")], {"id": p.id}))
+        w.end()
+        w.end()
+        return buf.getvalue().encode("utf-8")
+    return inv.cached("xml", build)
+
+@instrument("serializer.save_inventory_xml", path_arg="filepath", io="write")
 def save_inventory_xml(inv: Inventory, filepath: str) -> None:
-    """Сохраняет Inventory в XML файл."""
+    """Сохраняет Inventory в XML файл.
+
+    Содержимое берётся из кэша inventory_xml_bytes: если склад не менялся
+    с прошлого сохранения, документ заново не строится.
+    """
     try:
-        root = ET.Element("store")
-        products_el = ET.SubElement(root, "products")
-        for p in inv.products.values():
-            pe = ET.SubElement(products_el, "product", {"id": p.id})
-            for tag, val in [("name", p.name), ("description", p.description),
-                             ("price", str(p.price)), ("stock", str(p.stock)),
-                             ("category", p.category or "")]:
-                el = ET.SubElement(pe, tag)
-                el.text = val
-        tree = ET.ElementTree(root)
-        tree.write(filepath, encoding="utf-8", xml_declaration=True)
+        _write_atomic(filepath, inventory_xml_bytes(inv))
     except Exception as e:
         raise SerializationError(str(e))
 
+def _product_records_xml(filepath: str) -> Iterator[Dict[str, Any]]:
+    for prod_el in iter_xml_elements(filepath, ["product"]):
+        yield {
+            "id": prod_el.get("id"),
+            "name": prod_el.findtext("name") or "",
+            "description": prod_el.findtext("description") or "",
+            "price": float(prod_el.findtext("price") or 0.0),
+            "stock": int(prod_el.findtext("stock") or 0),
+            "category": prod_el.findtext("category") or None
+        }
+
+@instrument("serializer.load_inventory_xml", path_arg="filepath", io="read")
 def load_inventory_xml(filepath: str) -> Inventory:
-    """Загружает Inventory из XML файл."""
+    """Загружает Inventory из XML файл.
+
+    Документ разбирается через iterparse, и каждый <product> удаляется
+    из дерева сразу после добавления в Inventory.
+    """
+    inv = Inventory()
     try:
-        tree = ET.parse(filepath)
-        root = tree.getroot()
+        inv.load_products(_product_records_xml(filepath))
+    except SerializationError:
+        raise
     except Exception as e:
         raise SerializationError(str(e))
-    data = {"products": []}
-    for prod_el in root.findall("./products/product"):
-        pid = prod_el.get("id")
-        name = prod_el.findtext("name") or ""
-        description = prod_el.findtext("description") or ""
-        price = float(prod_el.findtext("price") or 0.0)
-        stock = int(prod_el.findtext("stock") or 0)
-        category = prod_el.findtext("category") or None
-        data["products"].append({
-            "id": pid,
-            "name": name,
-            "description": description,
-            "price": price,
-            "stock": stock,
-            "category": category
-        })
-    inv = Inventory()
-    inv.from_dict(data)
     return inv
+
+# ---------------------- полный снимок магазина ----------------------
+def _order_record(o: Order) -> Dict[str, Any]:
+    return {
+        "id": o.id,
+        "customer_id": o.customer_id,
+        "items": [
+            {"product_id": it.product_id, "quantity": it.quantity, "price": it.price}
+            for it in o.items
+        ],
+        "status": o.status,
+        "created_at": o.created_at
+    }
+
+def _write_json_array(f: IO[str], rows: Iterable[Dict[str, Any]], level: int) -> None:
+    """Пишет массив по одной записи в том же виде, что json.dump(indent=2)."""
+    pad = "  " * (level + 1)
+    first = True
+    for row in rows:
+        text = json.dumps(row, ensure_ascii=False, indent=2).replace("\n", "\n" + pad)
+        f.write(("[\n" if first else ",\n") + pad + text)
+        first = False
+    f.write("[]" if first else "\n" + "  " * level + "]")
+
+@instrument("serializer.save_store_json", path_arg="filepath", io="write")
+def save_store_json(filepath: str, products: Iterable[Product], customers: Iterable[Customer],
+                    suppliers: Iterable[Supplier], orders: Iterable[Order],
+                    journal_seq: Optional[int] = None) -> None:
+    """Сохраняет снимок магазина в JSON, записывая записи по одной.
+
+    Коллекции могут быть генераторами (например, курсорами базы) — целиком
+    в памяти документ не собирается. Запись идёт во временный файл, который
+    атомарно заменяет filepath.
+    """
+    tmp_path = filepath + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("{\n")
+            if journal_seq is not None:
+                f.write(f'  "journal_seq": {journal_seq},\n')
+            f.write('  "inventory": {\n    "products": ')
+            _write_json_array(f, (p.to_dict() for p in products), 2)
+            f.write('\n  },\n  "customers": ')
+            _write_json_array(f, (store_record("customers", c) for c in customers), 1)
+            f.write(',\n  "suppliers": ')
+            _write_json_array(f, (store_record("suppliers", s) for s in suppliers), 1)
+            f.write(',\n  "orders": ')
+            _write_json_array(f, (_order_record(o) for o in orders), 1)
+            f.write("\n}")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    except OSError as e:
+        raise SerializationError(str(e))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+@instrument("serializer.save_store_xml", path_arg="filepath", io="write")
+def save_store_xml(filepath: str, products: Iterable[Product], customers: Iterable[Customer],
+                   suppliers: Iterable[Supplier], orders: Iterable[Order],
+                   journal_seq: Optional[int] = None) -> None:
+    """Сохраняет снимок магазина в XML, записывая элементы в файл по одному."""
+    attrib = {"journal_seq": str(journal_seq)} if journal_seq is not None else None
+    try:
+        with xml_stream_writer(filepath, "StoreData", attrib) as w:
+            w.start("Inventory")
+            w.start("Products")
+            for p in products:
+                w.element(record("Product", [
+                    ("Name", p.name), ("Description", p.description),
+                    ("Price", str(p.price)), ("Stock", str(p.stock)),
+                    ("Category", p.category or "")], {"id": p.id}))
+            w.end()
+            w.end()
+
+            w.start("Customers")
+            for c in customers:
+                w.element(record("Customer", [
+                    ("Email", c.email), ("Name", c.name), ("Balance", str(c.balance))]))
+            w.end()
+
+            w.start("Suppliers")
+            for s in suppliers:
+                w.element(record("Supplier", [("Name", s.name), ("Contact", s.contact)]))
+            w.end()
+
+            w.start("Orders")
+            for o in orders:
+                w.element(record("Order", [
+                    ("Id", o.id), ("CustomerEmail", o.customer_id),
+                    ("Items", [record("Item", [
+                        ("ProductId", it.product_id), ("Quantity", str(it.quantity)),
+                        ("Price", str(it.price))]) for it in o.items]),
+                    ("Status", o.status), ("CreatedAt", o.created_at)]))
+            w.end()
+    except OSError as e:
+        raise SerializationError(str(e))
+
+STORE_SECTIONS = ("inventory", "customers", "suppliers", "orders")
+_JSON_SECTION_PATHS = {
+    "inventory": ("inventory", "products"),
+    "customers": ("customers",),
+    "suppliers": ("suppliers",),
+    "orders": ("orders",),
+}
+_XML_SECTION_TAGS = {
+    "inventory": "Product",
+    "customers": "Customer",
+    "suppliers": "Supplier",
+    "orders": "Order",
+}
+
+def _check_sections(sections: Iterable[str]) -> set:
+    sections = set(sections)
+    unknown = sections - set(STORE_SECTIONS)
+    if unknown:
+        raise ValueError(f"Неизвестные разделы: {', '.join(sorted(unknown))}")
+    return sections
+
+def order_from_dict(o: Dict[str, Any]) -> Order:
+    """Создаёт Order из словаря формата data.json."""
+    return Order.from_dict(o)
+
+def store_record(section: str, obj: Any) -> Dict[str, Any]:
+    """Словарь записи раздела в формате data.json."""
+    if section == "inventory":
+        return obj.to_dict()
+    if section == "customers":
+        return {"email": obj.email, "name": obj.name, "balance": obj.balance}
+    if section == "suppliers":
+        return {"name": obj.name, "contact": obj.contact}
+    return _order_record(obj)
+
+def store_object(section: str, item: Dict[str, Any]) -> Any:
+    """Объект раздела из словаря формата data.json (обратное store_record)."""
+    if section == "inventory":
+        return Product.from_dict(item)
+    if section == "customers":
+        return Customer(item["email"], item["name"], item.get("balance", 0.0))
+    if section == "suppliers":
+        return Supplier(item["name"], item["contact"])
+    return order_from_dict(item)
+
+def store_key(section: str, obj: Any) -> str:
+    """Ключ, по которому записи раздела отличаются друг от друга."""
+    if section == "customers":
+        return CustomerRegistry.normalize_email(obj.email)
+    if section == "suppliers":
+        return obj.name
+    return obj.id
+
+@instrument("serializer.iter_store_json", path_arg="filepath", io="read")
+def iter_store_json(filepath: str, sections: Iterable[str] = STORE_SECTIONS) -> Iterator[Tuple[str, Any]]:
+    """Потоково читает снимок магазина из JSON.
+
+    Yields:
+        Пары (раздел, объект): ("inventory", Product), ("customers", Customer),
+        ("suppliers", Supplier), ("orders", Order), а также
+        ("journal_seq", int), если снимок его содержит.
+    """
+    by_path = {_JSON_SECTION_PATHS[name]: name for name in _check_sections(sections)}
+    by_path[("journal_seq",)] = "journal_seq"
+    for path, item in iter_json_items(filepath, by_path):
+        section = by_path[path]
+        if section == "journal_seq":
+            yield section, item
+        else:
+            yield section, store_object(section, item)
+
+@instrument("serializer.iter_store_xml", path_arg="filepath", io="read")
+def iter_store_xml(filepath: str, sections: Iterable[str] = STORE_SECTIONS) -> Iterator[Tuple[str, Any]]:
+    """Потоково читает снимок магазина из XML (через iterparse).
+
+    Выдаёт те же пары (раздел, объект), что и iter_store_json.
+    """
+    by_tag = {_XML_SECTION_TAGS[name]: name for name in _check_sections(sections)}
+    seq = read_root_attrib(filepath).get("journal_seq")
+    if seq is not None:
+        yield "journal_seq", int(seq)
+    for el in iter_xml_elements(filepath, by_tag):
+        section = by_tag[el.tag]
+        if section == "inventory":
+            yield section, Product(
+                id=el.get("id"),
+                name=el.findtext("Name") or "",
+                description=el.findtext("Description") or "",
+                price=float(el.findtext("Price") or 0.0),
+                stock=int(el.findtext("Stock") or 0),
+                category=el.findtext("Category") or None)
+        elif section == "customers":
+            yield section, Customer(el.findtext("Email") or "", el.findtext("Name") or "",
+                                    float(el.findtext("Balance") or 0.0))
+        elif section == "suppliers":
+            yield section, Supplier(el.findtext("Name") or "", el.findtext("Contact") or "")
+        else:
+            items = [OrderItem(it.findtext("ProductId") or "", int(it.findtext("Quantity") or 0),
+                               float(it.findtext("Price") or 0.0))
+                     for it in el.iterfind("Items/Item")]
+            yield section, Order(
+                id=el.findtext("Id") or "",
+                customer_id=el.findtext("CustomerEmail") or "",
+                items=items,
+                status=el.findtext("Status") or "created",
+                created_at=el.findtext("CreatedAt") or datetime.utcnow().isoformat())
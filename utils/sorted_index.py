@@ -0,0 +1,112 @@
+"""Упорядоченный индекс пар (ключ, id) для диапазонных запросов."""
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+Entry = Tuple[Any, str]
+
+
+class SortedIndex:
+    """Отсортированный набор пар (ключ, id), разбитый на блоки.
+
+    Вставка и удаление стоят O(log n + load) вместо O(n) сдвига одного
+    большого списка, а выборка диапазона ключей — O(log n + k).
+    """
+
+    def __init__(self, load: int = 512) -> None:
+        self._load = load
+        self._buckets: List[List[Entry]] = []
+        self._maxes: List[Entry] = []
+        self._len = 0
+
+    def add(self, key: Any, item_id: str) -> None:
+        entry = (key, item_id)
+        if not self._buckets:
+            self._buckets.append([entry])
+            self._maxes.append(entry)
+            self._len = 1
+            return
+        i = bisect_left(self._maxes, entry)
+        if i == len(self._maxes):
+            i -= 1
+            self._buckets[i].append(entry)
+            self._maxes[i] = entry
+        else:
+            insort(self._buckets[i], entry)
+        self._len += 1
+        bucket = self._buckets[i]
+        if len(bucket) > 2 * self._load:
+            half = len(bucket) // 2
+            self._buckets[i:i + 1] = [bucket[:half], bucket[half:]]
+            self._maxes[i:i + 1] = [bucket[half - 1], bucket[-1]]
+
+    def discard(self, key: Any, item_id: str) -> None:
+        entry = (key, item_id)
+        i = bisect_left(self._maxes, entry)
+        if i == len(self._maxes):
+            return
+        bucket = self._buckets[i]
+        j = bisect_left(bucket, entry)
+        if j == len(bucket) or bucket[j] != entry:
+            return
+        del bucket[j]
+        self._len -= 1
+        if bucket:
+            self._maxes[i] = bucket[-1]
+        else:
+            del self._buckets[i]
+            del self._maxes[i]
+
+    def irange(self, lo: Optional[Any] = None, hi: Optional[Any] = None) -> Iterator[str]:
+        """Выдаёт id с ключами в диапазоне [lo, hi] по возрастанию ключа.
+
+        None в качестве границы означает отсутствие ограничения.
+        """
+        i = 0 if lo is None else bisect_left(self._maxes, (lo,))
+        for b in range(i, len(self._buckets)):
+            bucket = self._buckets[b]
+            start = 0 if lo is None or b != i else bisect_left(bucket, (lo,))
+            for j in range(start, len(bucket)):
+                key, item_id = bucket[j]
+                if hi is not None and key > hi:
+                    return
+                yield item_id
+
+    def iter_entries(self, after: Optional[Entry] = None, reverse: bool = False) -> Iterator[Entry]:
+        """Выдаёт пары (ключ, id), идущие строго после after.
+
+        При reverse=True обход идёт по убыванию, и «после» значит «меньше
+        after». after может быть неполным кортежем: (key,) стоит перед
+        всеми парами с этим ключом. Используется для курсорной пагинации.
+        """
+        if not self._buckets:
+            return
+        if not reverse:
+            b = 0 if after is None else bisect_right(self._maxes, after)
+            for i in range(b, len(self._buckets)):
+                bucket = self._buckets[i]
+                start = bisect_right(bucket, after) if after is not None and i == b else 0
+                for j in range(start, len(bucket)):
+                    yield bucket[j]
+            return
+        b = len(self._buckets) - 1 if after is None else min(bisect_left(self._maxes, after),
+                                                             len(self._buckets) - 1)
+        for i in range(b, -1, -1):
+            bucket = self._buckets[i]
+            end = bisect_left(bucket, after) if after is not None and i == b else len(bucket)
+            for j in range(end - 1, -1, -1):
+                yield bucket[j]
+
+    def rebuild(self, entries: Iterable[Entry]) -> None:
+        """Заменяет содержимое индекса парами (ключ, id) одной сортировкой."""
+        items = sorted(entries)
+        self._buckets = [items[i:i + self._load] for i in range(0, len(items), self._load)]
+        self._maxes = [b[-1] for b in self._buckets]
+        self._len = len(items)
+
+    def clear(self) -> None:
+        self._buckets.clear()
+        self._maxes.clear()
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
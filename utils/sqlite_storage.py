@@ -0,0 +1,494 @@
+"""Хранилище магазина на SQLite.
+
+Товары, покупатели, поставщики и заказы лежат в таблицах с индексами,
+поэтому запросы выполняются индексами базы, а не циклами Python, и
+объём магазина не ограничен оперативной памятью. Запись идёт пачками
+через executemany, чтение — лениво через fetchmany. Существующий
+data.json импортируется в пустую базу при первом запуске (import_json).
+
+Таблица товаров подключается к Inventory как ленивый источник
+(ProductTable, см. Inventory.attach_snapshot): товары читаются из базы
+по первому обращению, а запросы по цене, остатку и категории идут в
+индексы базы. Сохранение пишет в базу только изменения (save_changes).
+"""
+import sqlite3
+import threading
+from contextlib import contextmanager
+from itertools import groupby, islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from exceptions.store_exceptions import SerializationError
+from clasess.product import Product
+from clasess.customer import Customer
+from clasess.supplier import Supplier
+from clasess.order import Order
+from clasess.order_item import OrderItem
+from clasess.customer_registry import CustomerRegistry
+from utils.serializer import STORE_SECTIONS, iter_store_json
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS products (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    price REAL NOT NULL,
+    stock INTEGER NOT NULL CHECK (stock >= 0),
+    category TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_products_category_price ON products (category, price);
+CREATE INDEX IF NOT EXISTS idx_products_price ON products (price);
+CREATE INDEX IF NOT EXISTS idx_products_stock ON products (stock);
+CREATE TABLE IF NOT EXISTS customers (
+    email_key TEXT PRIMARY KEY,
+    email TEXT NOT NULL,
+    name TEXT NOT NULL,
+    balance REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS suppliers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    contact TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS orders (
+    id TEXT PRIMARY KEY,
+    customer_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_orders_customer ON orders (customer_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_orders_created ON orders (created_at);
+CREATE TABLE IF NOT EXISTS order_items (
+    order_id TEXT NOT NULL REFERENCES orders (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    product_id TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    price REAL NOT NULL,
+    PRIMARY KEY (order_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_order_items_product ON order_items (product_id);
+"""
+
+_PRODUCT_COLUMNS = "id, name, description, price, stock, category"
+_GET_PRODUCT = f"SELECT {_PRODUCT_COLUMNS} FROM products WHERE id = ?"
+_ALL_PRODUCTS = f"SELECT {_PRODUCT_COLUMNS} FROM products ORDER BY id"
+
+
+def _batches(rows: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    it = iter(rows)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+class SqliteStorage:
+    """Хранилище магазина в файле SQLite (режим WAL).
+
+    Args:
+        filepath: путь к файлу базы (":memory:" — база в памяти).
+        batch_size: размер пачки для массовой записи и ленивого чтения.
+    """
+
+    def __init__(self, filepath: str, batch_size: int = 1000) -> None:
+        self.filepath = filepath
+        self.batch_size = batch_size
+        self._depth = 0
+        # Соединение общее для потоков (сохранение идёт из фонового потока
+        # журнала), поэтому обращения к нему идут под _lock.
+        self._lock = threading.RLock()
+        # Свободные соединения для срезов чтения (reader()).
+        self._idle: List[sqlite3.Connection] = []
+        self._idle_lock = threading.Lock()
+        try:
+            self.conn = sqlite3.connect(filepath, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("PRAGMA foreign_keys=ON")
+            self.conn.executescript(SCHEMA)
+        except sqlite3.Error as e:
+            raise SerializationError(f"Не удалось открыть базу {filepath}: {e}")
+
+    def close(self) -> None:
+        with self._idle_lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+        self.conn.close()
+
+    def __enter__(self) -> "SqliteStorage":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # ---------------------- служебное ----------------------
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """Транзакция; вложенные вызовы входят во внешнюю транзакцию."""
+        with self._lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+            self._depth = 1
+            try:
+                with self.conn:
+                    yield
+            finally:
+                self._depth = 0
+
+    def _fetch_lazy(self, sql: str, params: Tuple = ()) -> Iterator[tuple]:
+        with self._lock:
+            cur = self.conn.execute(sql, params)
+        while True:
+            with self._lock:
+                rows = cur.fetchmany(self.batch_size)
+            if not rows:
+                return
+            yield from rows
+
+    def _fetchone(self, sql: str, params: Tuple = ()) -> Optional[tuple]:
+        with self._lock:
+            return self.conn.execute(sql, params).fetchone()
+
+    def get_meta(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        row = self._fetchone("SELECT value FROM meta WHERE key = ?", (key,))
+        return row[0] if row else default
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._transaction():
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    # ---------------------- товары ----------------------
+    def save_products(self, products: Iterable[Product]) -> None:
+        """Вставляет или обновляет товары пачками."""
+        sql = (f"INSERT OR REPLACE INTO products ({_PRODUCT_COLUMNS}) "
+               "VALUES (?, ?, ?, ?, ?, ?)")
+        rows = ((p.id, p.name, p.description, p.price, p.stock, p.category) for p in products)
+        with self._transaction():
+            for batch in _batches(rows, self.batch_size):
+                self.conn.executemany(sql, batch)
+
+    def delete_product(self, product_id: str) -> None:
+        with self._transaction():
+            self.conn.execute("DELETE FROM products WHERE id = ?", (product_id,))
+
+    def get_product(self, product_id: str) -> Optional[Product]:
+        row = self._fetchone(_GET_PRODUCT, (product_id,))
+        return Product(*row) if row else None
+
+    def iter_products(self) -> Iterator[Product]:
+        """Лениво выдаёт все товары в порядке id."""
+        for row in self._fetch_lazy(_ALL_PRODUCTS):
+            yield Product(*row)
+
+    def products_by_category(self, category: Optional[str]) -> Iterator[Product]:
+        """Товары категории по возрастанию цены (индекс category, price)."""
+        sql = (f"SELECT {_PRODUCT_COLUMNS} FROM products WHERE category IS ? "
+               "ORDER BY price, id")
+        for row in self._fetch_lazy(sql, (category,)):
+            yield Product(*row)
+
+    def products_in_price_range(self, min_price: Optional[float] = None,
+                                max_price: Optional[float] = None,
+                                category: Optional[str] = None) -> Iterator[Product]:
+        """Товары с ценой в [min_price, max_price] по возрастанию цены.
+
+        Пустая граница не ограничивает; category сужает выборку по индексу
+        (category, price).
+        """
+        where = ["price >= ?", "price <= ?"]
+        params: List[Any] = [float("-inf") if min_price is None else min_price,
+                             float("inf") if max_price is None else max_price]
+        if category is not None:
+            where.append("category = ?")
+            params.append(category)
+        sql = (f"SELECT {_PRODUCT_COLUMNS} FROM products WHERE {' AND '.join(where)} "
+               "ORDER BY price, id")
+        for row in self._fetch_lazy(sql, tuple(params)):
+            yield Product(*row)
+
+    def low_stock(self, threshold: int) -> Iterator[Product]:
+        """Товары с остатком <= threshold по возрастанию остатка."""
+        sql = (f"SELECT {_PRODUCT_COLUMNS} FROM products WHERE stock <= ? "
+               "ORDER BY stock, id")
+        for row in self._fetch_lazy(sql, (threshold,)):
+            yield Product(*row)
+
+    def categories(self) -> List[Optional[str]]:
+        """Категории, в которых есть товары (по индексу category, price)."""
+        return [row[0] for row in self._fetch_lazy("SELECT DISTINCT category FROM products")]
+
+    def products(self) -> "ProductTable":
+        """Таблица товаров как ленивый источник для Inventory.attach_snapshot."""
+        return ProductTable(self)
+
+    def reader(self) -> "SqliteReader":
+        """Открывает согласованный срез базы для чтения.
+
+        Срез — отдельное соединение с открытой читающей транзакцией: в
+        режиме WAL оно видит базу на момент открытия, не мешая записи.
+        Его нужно закрыть; соединение возвращается в пул.
+        """
+        with self._idle_lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = sqlite3.connect(self.filepath, check_same_thread=False)
+        conn.execute("BEGIN")
+        # Срез фиксируется первым чтением, а не BEGIN.
+        conn.execute("SELECT 1 FROM products LIMIT 1").fetchall()
+        return SqliteReader(self, conn)
+
+    def _return_reader(self, conn: sqlite3.Connection) -> None:
+        conn.rollback()
+        with self._idle_lock:
+            self._idle.append(conn)
+
+    # ---------------------- покупатели и поставщики ----------------------
+    def save_customers(self, customers: Iterable[Customer]) -> None:
+        sql = ("INSERT OR REPLACE INTO customers (email_key, email, name, balance) "
+               "VALUES (?, ?, ?, ?)")
+        rows = ((CustomerRegistry.normalize_email(c.email), c.email, c.name, c.balance)
+                for c in customers)
+        with self._transaction():
+            for batch in _batches(rows, self.batch_size):
+                self.conn.executemany(sql, batch)
+
+    def iter_customers(self) -> Iterator[Customer]:
+        for row in self._fetch_lazy("SELECT email, name, balance FROM customers ORDER BY rowid"):
+            yield Customer(*row)
+
+    def save_suppliers(self, suppliers: Iterable[Supplier]) -> None:
+        """Заменяет список поставщиков целиком."""
+        with self._transaction():
+            self.conn.execute("DELETE FROM suppliers")
+            self.conn.executemany("INSERT INTO suppliers (name, contact) VALUES (?, ?)",
+                                  ((s.name, s.contact) for s in suppliers))
+
+    def iter_suppliers(self) -> Iterator[Supplier]:
+        for row in self._fetch_lazy("SELECT name, contact FROM suppliers ORDER BY id"):
+            yield Supplier(*row)
+
+    # ---------------------- заказы ----------------------
+    def save_orders(self, orders: Iterable[Order]) -> None:
+        """Вставляет или обновляет заказы вместе с позициями пачками."""
+        with self._transaction():
+            for batch in _batches(orders, self.batch_size):
+                ids = [(o.id,) for o in batch]
+                self.conn.executemany("DELETE FROM order_items WHERE order_id = ?", ids)
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO orders (id, customer_id, status, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(o.id, o.customer_id, o.status, o.created_at) for o in batch])
+                self.conn.executemany(
+                    "INSERT INTO order_items (order_id, position, product_id, quantity, price) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(o.id, pos, it.product_id, it.quantity, it.price)
+                     for o in batch for pos, it in enumerate(o.items)])
+
+    def _orders_from_rows(self, rows: Iterable[tuple]) -> Iterator[Order]:
+        for batch in _batches(rows, self.batch_size):
+            items: Dict[str, List[OrderItem]] = {row[0]: [] for row in batch}
+            placeholders = ",".join("?" * len(items))
+            with self._lock:
+                found = self.conn.execute(
+                    "SELECT order_id, product_id, quantity, price FROM order_items "
+                    f"WHERE order_id IN ({placeholders}) ORDER BY order_id, position",
+                    list(items)).fetchall()
+            for order_id, product_id, quantity, price in found:
+                items[order_id].append(OrderItem(product_id, quantity, price))
+            for oid, customer_id, status, created_at in batch:
+                yield Order(id=oid, customer_id=customer_id, items=items[oid],
+                            status=status, created_at=created_at)
+
+    def get_order(self, order_id: str) -> Optional[Order]:
+        row = self._fetchone(
+            "SELECT id, customer_id, status, created_at FROM orders WHERE id = ?", (order_id,))
+        return next(self._orders_from_rows([row]), None) if row else None
+
+    def iter_orders(self) -> Iterator[Order]:
+        """Лениво выдаёт все заказы (позиции подгружаются пачками)."""
+        return self._orders_from_rows(self._fetch_lazy(
+            "SELECT id, customer_id, status, created_at FROM orders ORDER BY rowid"))
+
+    # ---------------------- весь магазин ----------------------
+    def iter_store(self, sections: Iterable[str] = STORE_SECTIONS) -> Iterator[Tuple[str, Any]]:
+        """Лениво выдаёт содержимое базы парами (раздел, объект) — в том же
+        формате, что utils.serializer.iter_store_json. Незапрошенные
+        разделы не читаются."""
+        readers = {
+            "inventory": self.iter_products,
+            "customers": self.iter_customers,
+            "suppliers": self.iter_suppliers,
+            "orders": self.iter_orders,
+        }
+        wanted = set(sections)
+        yield "journal_seq", self.journal_seq()
+        for section in STORE_SECTIONS:
+            if section in wanted:
+                for obj in readers[section]():
+                    yield section, obj
+
+    def save_store(self, products: Iterable[Product], customers: Iterable[Customer],
+                   suppliers: Iterable[Supplier], orders: Iterable[Order],
+                   journal_seq: int = 0) -> None:
+        """Полностью заменяет содержимое базы одной транзакцией.
+
+        Нужна, только когда изменения не отслеживались поштучно; обычное
+        сохранение — save_changes. Товары можно передавать из среза
+        reader() этой же базы: срез не видит незавершённую транзакцию.
+        """
+        with self._transaction():
+            for table in ("order_items", "orders", "products", "customers"):
+                self.conn.execute(f"DELETE FROM {table}")
+            self.save_products(products)
+            self.save_customers(customers)
+            self.save_suppliers(suppliers)
+            self.save_orders(orders)
+            self._mark_saved(journal_seq)
+
+    def save_changes(self, products: Dict[str, Optional[Product]], customers: Iterable[Customer],
+                     orders: Iterable[Order], suppliers: Optional[Iterable[Supplier]] = None,
+                     journal_seq: int = 0) -> None:
+        """Записывает изменения магазина одной транзакцией.
+
+        Время записи пропорционально числу изменений, а не размеру базы.
+
+        Args:
+            products: id -> изменённый товар или None для удалённого.
+            customers, orders: изменённые записи (вставляются или обновляются).
+            suppliers: если задан — новый список поставщиков целиком.
+            journal_seq: seq журнала, которому соответствует состояние.
+        """
+        with self._transaction():
+            self.conn.executemany("DELETE FROM products WHERE id = ?",
+                                  [(pid,) for pid, p in products.items() if p is None])
+            self.save_products(p for p in products.values() if p is not None)
+            self.save_customers(customers)
+            self.save_orders(orders)
+            if suppliers is not None:
+                self.save_suppliers(suppliers)
+            self._mark_saved(journal_seq)
+
+    def _mark_saved(self, journal_seq: int) -> None:
+        self.set_meta("journal_seq", str(journal_seq))
+        self.set_meta("initialized", "1")
+
+    @property
+    def initialized(self) -> bool:
+        """Было ли в базу хоть раз записано состояние магазина целиком.
+
+        Импорт и сохранение отмечают это в той же транзакции, поэтому
+        прерванный импорт оставляет базу неинициализированной.
+        """
+        return self.get_meta("initialized") is not None
+
+    # ---------------------- импорт / экспорт ----------------------
+    def _import(self, records: Iterator[Tuple[str, Any]]) -> None:
+        # Разделы идут в файле подряд, поэтому каждый сохраняется пачками
+        # прямо из потока, не накапливаясь в памяти.
+        savers = {
+            "inventory": self.save_products,
+            "customers": self.save_customers,
+            "suppliers": self.save_suppliers,
+            "orders": self.save_orders,
+        }
+        for section, group in groupby(records, key=lambda rec: rec[0]):
+            objs = (obj for _, obj in group)
+            if section == "journal_seq":
+                self.set_meta("journal_seq", str(next(objs)))
+            else:
+                savers[section](objs)
+
+    def import_records(self, records: Iterator[Tuple[str, Any]]) -> None:
+        """Импортирует поток пар (раздел, объект) одной транзакцией.
+
+        Если импорт прерван, база остаётся прежней и не помечается
+        инициализированной (см. initialized).
+        """
+        with self._transaction():
+            self.set_meta("journal_seq", "0")
+            self._import(records)
+            self.set_meta("initialized", "1")
+
+    def import_json(self, filepath: str) -> None:
+        """Потоково импортирует снимок data.json в базу."""
+        self.import_records(iter_store_json(filepath))
+
+    def journal_seq(self) -> int:
+        """seq последней записи журнала, учтённой в базе."""
+        return int(self.get_meta("journal_seq", "0"))
+
+
+class SqliteReader:
+    """Согласованный срез базы для чтения (см. SqliteStorage.reader)."""
+
+    def __init__(self, storage: SqliteStorage, conn: sqlite3.Connection) -> None:
+        self._storage = storage
+        self._conn: Optional[sqlite3.Connection] = conn
+
+    def get(self, product_id: str) -> Optional[Product]:
+        row = self._conn.execute(_GET_PRODUCT, (product_id,)).fetchone()
+        return Product(*row) if row else None
+
+    def iter_products(self) -> Iterator[Product]:
+        """Лениво выдаёт все товары среза в порядке id."""
+        cur = self._conn.execute(_ALL_PRODUCTS)
+        while True:
+            rows = cur.fetchmany(self._storage.batch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield Product(*row)
+
+    def close(self) -> None:
+        """Завершает срез; повторный вызов ничего не делает."""
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._storage._return_reader(conn)
+
+
+class ProductTable:
+    """Таблица товаров базы как источник товаров для Inventory.
+
+    Подключается через Inventory.attach_snapshot вместо бинарного снимка:
+    get() читает строку по первичному ключу, reader() даёт срезам склада
+    неизменную версию таблицы, а запросы по цене, остатку и категории
+    выполняются индексами базы. Базой владеет SqliteStorage, поэтому
+    close() её не закрывает.
+    """
+
+    def __init__(self, storage: SqliteStorage) -> None:
+        self.storage = storage
+
+    def get(self, product_id: str) -> Optional[Product]:
+        return self.storage.get_product(product_id)
+
+    def iter_products(self) -> Iterator[Product]:
+        return self.storage.iter_products()
+
+    def reader(self) -> SqliteReader:
+        return self.storage.reader()
+
+    def price_range(self, min_price: Optional[float], max_price: Optional[float],
+                    category: Optional[str]) -> Iterator[Product]:
+        return self.storage.products_in_price_range(min_price, max_price, category)
+
+    def low_stock(self, threshold: int) -> Iterator[Product]:
+        return self.storage.low_stock(threshold)
+
+    def by_category(self, category: Optional[str]) -> Iterator[Product]:
+        return self.storage.products_by_category(category)
+
+    def categories(self) -> List[Optional[str]]:
+        return self.storage.categories()
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,46 @@
+"""Набор блокировок с разбиением по ключу (lock striping)."""
+import threading
+from contextlib import contextmanager
+from typing import Hashable, Iterator, List
+
+
+class StripedLock:
+    """Фиксированный набор блокировок; ключ попадает в полосу по хешу.
+
+    Операции над разными ключами почти всегда берут разные блокировки и
+    выполняются параллельно, а память не растёт с числом ключей.
+    """
+
+    def __init__(self, stripes: int = 64) -> None:
+        self._locks: List[threading.Lock] = [threading.Lock() for _ in range(stripes)]
+
+    def _stripe(self, key: Hashable) -> int:
+        return hash(key) % len(self._locks)
+
+    def lock_for(self, key: Hashable) -> threading.Lock:
+        """Возвращает блокировку полосы, к которой относится key."""
+        return self._locks[self._stripe(key)]
+
+    @contextmanager
+    def locked(self, *keys: Hashable) -> Iterator[None]:
+        """Захватывает полосы всех ключей в порядке номеров полос.
+
+        Единый порядок захвата исключает взаимную блокировку, когда
+        несколько потоков одновременно берут пересекающиеся наборы ключей.
+        """
+        stripes = sorted({self._stripe(k) for k in keys})
+        acquired = []
+        try:
+            for i in stripes:
+                self._locks[i].acquire()
+                acquired.append(i)
+            yield
+        finally:
+            for i in reversed(acquired):
+                self._locks[i].release()
+
+    @contextmanager
+    def locked_all(self) -> Iterator[None]:
+        """Захватывает все полосы (для операций над всем набором ключей)."""
+        with self.locked(*range(len(self._locks))):
+            yield
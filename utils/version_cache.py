@@ -0,0 +1,66 @@
+"""LRU-кэш результатов, привязанных к версии данных."""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class VersionedCache:
+    """Кэш вида (версия, ключ) -> значение с вытеснением по LRU.
+
+    Значение считается действительным только для версии, при которой оно
+    построено. Как только приходит запись с более новой версией, записи
+    старых версий удаляются — устаревшие данные не занимают место до
+    вытеснения.
+    """
+
+    def __init__(self, maxsize: int = 64) -> None:
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Tuple[int, Hashable], Any]" = OrderedDict()
+        self._latest = -1
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, version: int) -> Optional[Any]:
+        """Значение для (version, key) или None, если его нет; не строит."""
+        full_key = (version, key)
+        with self._lock:
+            if full_key not in self._data:
+                return None
+            self._data.move_to_end(full_key)
+            self.hits += 1
+            return self._data[full_key]
+
+    def get_or_build(self, key: Hashable, version: int, build: Callable[[], T]) -> T:
+        """Возвращает значение для (version, key), при промахе строит его.
+
+        build() вызывается вне блокировки; при одновременном промахе
+        значение может быть построено дважды, но результат одинаков.
+        """
+        full_key = (version, key)
+        with self._lock:
+            if full_key in self._data:
+                self._data.move_to_end(full_key)
+                self.hits += 1
+                return self._data[full_key]
+            self.misses += 1
+        value = build()
+        with self._lock:
+            if version > self._latest:
+                self._latest = version
+                for k in [k for k in self._data if k[0] < version]:
+                    del self._data[k]
+            if version == self._latest:
+                self._data[full_key] = value
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
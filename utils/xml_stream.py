@@ -0,0 +1,143 @@
+"""Потоковое чтение и запись XML-снимков магазина.
+
+Чтение построено на ET.iterparse: каждая запись (<Product>, <Order>, ...)
+выдаётся сразу после разбора и затем удаляется из дерева. Запись идёт
+поэлементно прямо в файл, поэтому в памяти одновременно находится только
+одна запись, а не весь документ.
+"""
+import os
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from typing import IO, Dict, Iterable, Iterator, List, Optional
+from xml.sax.saxutils import quoteattr
+from exceptions.store_exceptions import SerializationError
+
+
+def iter_xml_elements(filepath: str, tags: Iterable[str]) -> Iterator[ET.Element]:
+    """Лениво выдаёт элементы с указанными тегами из XML-файла.
+
+    Выданный элемент полностью разобран (вместе с дочерними), но после
+    возврата управления очищается и удаляется из родителя — сохранять
+    ссылку на него нельзя, нужно сразу извлечь данные.
+
+    Raises:
+        FileNotFoundError: если файла нет.
+        SerializationError: если документ повреждён.
+    """
+    tags = set(tags)
+    stack: List[ET.Element] = []
+    depth_in_record = 0
+    try:
+        for event, elem in ET.iterparse(filepath, events=("start", "end")):
+            if event == "start":
+                if depth_in_record or elem.tag in tags:
+                    depth_in_record += 1
+                else:
+                    stack.append(elem)
+                continue
+            if depth_in_record:
+                depth_in_record -= 1
+                if depth_in_record:
+                    continue
+                yield elem
+                elem.clear()
+                if stack:
+                    stack[-1].remove(elem)
+            else:
+                stack.pop()
+                elem.clear()
+    except ET.ParseError as e:
+        raise SerializationError(str(e))
+
+
+class XmlStreamWriter:
+    """Инкрементальная запись XML с отступами в стиле ET.indent.
+
+    Контейнеры открываются и закрываются через start()/end(), а записи
+    добавляются через element() и сразу сериализуются в файл.
+    """
+
+    def __init__(self, f: IO[str], space: str = "  ") -> None:
+        self._f = f
+        self._space = space
+        self._open: List[str] = []
+        self._has_children: List[bool] = []
+
+    def _before_child(self) -> None:
+        if self._has_children and not self._has_children[-1]:
+            self._f.write(">")
+            self._has_children[-1] = True
+        if self._open:
+            self._f.write("\n" + self._space * len(self._open))
+
+    def start(self, tag: str, attrib: Optional[Dict[str, str]] = None) -> None:
+        """Открывает контейнерный элемент."""
+        self._before_child()
+        attrs = "".join(f" {k}={quoteattr(v)}" for k, v in (attrib or {}).items())
+        self._f.write(f"<{tag}{attrs}")
+        self._open.append(tag)
+        self._has_children.append(False)
+
+    def end(self) -> None:
+        """Закрывает последний открытый контейнер."""
+        tag = self._open.pop()
+        if self._has_children.pop():
+            self._f.write("\n" + self._space * len(self._open) + f"</{tag}>")
+        else:
+            self._f.write(" />")
+
+    def element(self, elem: ET.Element) -> None:
+        """Записывает готовую запись внутрь текущего контейнера."""
+        self._before_child()
+        ET.indent(elem, space=self._space, level=len(self._open))
+        elem.tail = None
+        self._f.write(ET.tostring(elem, encoding="unicode"))
+
+
+def record(tag: str, fields: Iterable, attrib: Optional[Dict[str, str]] = None) -> ET.Element:
+    """Собирает запись <tag><Field>value</Field>...</tag>.
+
+    Если value — список элементов, они становятся дочерними для <Field>.
+    """
+    el = ET.Element(tag, attrib or {})
+    for name, value in fields:
+        child = ET.SubElement(el, name)
+        if isinstance(value, list):
+            child.extend(value)
+        else:
+            child.text = value
+    return el
+
+
+def read_root_attrib(filepath: str) -> Dict[str, str]:
+    """Возвращает атрибуты корневого элемента, не разбирая остальной файл."""
+    try:
+        for _, elem in ET.iterparse(filepath, events=("start",)):
+            return dict(elem.attrib)
+    except ET.ParseError as e:
+        raise SerializationError(str(e))
+    return {}
+
+
+@contextmanager
+def xml_stream_writer(filepath: str, root_tag: str,
+                      attrib: Optional[Dict[str, str]] = None) -> Iterator[XmlStreamWriter]:
+    """Открывает файл и корневой элемент для потоковой записи.
+
+    Данные пишутся во временный файл, который атомарно заменяет filepath
+    только после успешного завершения — при сбое старый файл остаётся целым.
+    """
+    tmp_path = filepath + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("<?xml version='1.0' encoding='utf-8'?>\n")
+            writer = XmlStreamWriter(f)
+            writer.start(root_tag, attrib)
+            yield writer
+            writer.end()
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)